@@ -0,0 +1,196 @@
+"""
+Importación de cartolas bancarias (CSV) como pagos.
+
+El archivo se lee línea a línea (nunca completo en memoria): cada depósito se
+asocia a una Unidad del condominio por su identificador, los Pagos se crean
+en lotes de TAMANO_LOTE (services.crear_pagos) y cada lote se aplica a la deuda con
+UNA pasada FIFO para todas sus unidades (aplicar_pagos_fifo). Las líneas que
+no se pueden importar se informan a medida que aparecen, con su motivo.
+
+Columnas (la primera línea es el encabezado, separador ',' o ';'):
+    fecha       YYYY-MM-DD, DD/MM/YYYY o DD-MM-YYYY
+    monto       150000, 150.000 o 150.000,50 (se aceptan '$' y espacios)
+    unidad      código de la unidad ('DEPTO-101') o grupo + código ('Torre 1 DEPTO-101')
+    referencia  (opcional) N° de operación del banco; evita importar dos veces el mismo depósito
+    glosa       (opcional) texto del movimiento, queda como observación del pago
+"""
+import csv
+import re
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Pago, Unidad
+from .services import TAMANO_LOTE, aplicar_pagos_fifo, bloqueo_unidades, crear_pagos, unidades_del_condominio
+
+COLUMNAS_OBLIGATORIAS = ('fecha', 'monto', 'unidad')
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+# Marca de un identificador que corresponde a más de una unidad
+_AMBIGUO = object()
+
+
+class CartolaInvalida(ValueError):
+    """El archivo no tiene el formato esperado (no se importa nada)."""
+
+
+def normalizar_identificador(texto):
+    """'Depto 101', 'DEPTO-101' y 'depto101' se comparan igual."""
+    return re.sub(r'[^0-9A-Z]', '', (texto or '').upper())
+
+
+def indice_unidades(condominio):
+    """
+    {identificador normalizado: id_unidad} de las unidades del condominio.
+    Cada unidad se indexa por 'grupo + código' y, si el código no se repite
+    en otro grupo, también por el código solo.
+    """
+    indice = {}
+    for id_unidad, codigo, grupo in Unidad.objects.filter(
+        id_grupo__id_condominio=condominio
+    ).values_list('id_unidad', 'codigo', 'id_grupo__nombre'):
+        clave = normalizar_identificador(codigo)
+        indice[clave] = _AMBIGUO if clave in indice else id_unidad
+        indice[normalizar_identificador(f"{grupo} {codigo}")] = id_unidad
+    return indice
+
+
+def parsear_monto(texto):
+    """Monto de la cartola a Decimal, o None si no es un número."""
+    texto = re.sub(r'[\s$]', '', texto or '')
+    if ',' in texto:
+        # Formato chileno: '.' de miles y ',' decimal
+        texto = texto.replace('.', '').replace(',', '.')
+    elif texto.count('.') > 1 or re.fullmatch(r'-?\d{1,3}\.\d{3}', texto):
+        texto = texto.replace('.', '')
+    try:
+        monto = Decimal(texto).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+    # Pago.monto admite 12 dígitos con 2 decimales
+    return monto if monto.is_finite() and abs(monto) < 10 ** 10 else None
+
+
+def parsear_fecha(texto):
+    """Fecha de la cartola como datetime (mediodía, zona local), o None."""
+    for formato in FORMATOS_FECHA:
+        try:
+            fecha = datetime.strptime((texto or '').strip(), formato).date()
+        except ValueError:
+            continue
+        return timezone.make_aware(datetime.combine(fecha, time(12)))
+    return None
+
+
+def leer_filas(lineas, obligatorias=COLUMNAS_OBLIGATORIAS):
+    """
+    Genera (numero_linea, fila) con las columnas por nombre, detectando el
+    separador en el encabezado. Lanza CartolaInvalida si falta alguna de las
+    columnas 'obligatorias'.
+    """
+    lineas = iter(lineas)
+    encabezado = next(lineas, '')
+    separador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+
+    lector = csv.reader(chain([encabezado], lineas), delimiter=separador)
+    columnas = [columna.strip().lower() for columna in next(lector, [])]
+    faltantes = [columna for columna in obligatorias if columna not in columnas]
+    if faltantes:
+        raise CartolaInvalida(f"Faltan columnas en el encabezado: {', '.join(faltantes)}")
+
+    for fila in lector:
+        if not any(valor.strip() for valor in fila):
+            continue  # Líneas en blanco
+        yield lector.line_num, dict(zip(columnas, (valor.strip() for valor in fila)))
+
+
+def importar_cartola(condominio, lineas, metodo_pago, rechazada=None):
+    """
+    Importa los depósitos de 'lineas' (cualquier iterable de texto: archivo
+    abierto, upload envuelto en TextIOWrapper, lista) como Pagos de las
+    unidades del condominio y los aplica a la deuda.
+
+    'rechazada(numero_linea, fila, motivo)' se llama por cada línea que no se
+    importa. Todo ocurre en una transacción: si algo falla, no queda nada.
+
+    Devuelve un diccionario con el resumen de la importación.
+    """
+    indice = indice_unidades(condominio)
+    resumen = {
+        'leidas': 0, 'importadas': 0, 'rechazadas': 0,
+        'monto_importado': Decimal(0), 'monto_sin_aplicar': Decimal(0),
+    }
+
+    def rechazar(numero, fila, motivo):
+        resumen['rechazadas'] += 1
+        if rechazada:
+            rechazada(numero, fila, motivo)
+
+    def procesar_lote(lote):
+        # Depósitos ya importados antes (o repetidos dentro del lote)
+        referencias = {pago.ref_externa for _, _, pago in lote if pago.ref_externa}
+        existentes = set(Pago.objects.filter(
+            id_unidad__id_grupo__id_condominio=condominio,
+            ref_externa__in=referencias
+        ).values_list('ref_externa', flat=True)) if referencias else set()
+
+        pagos = []
+        for numero, fila, pago in lote:
+            if pago.ref_externa and pago.ref_externa in existentes:
+                rechazar(numero, fila, f"Referencia {pago.ref_externa} ya importada")
+                continue
+            if pago.ref_externa:
+                existentes.add(pago.ref_externa)
+            pagos.append(pago)
+
+        if not pagos:
+            return
+        crear_pagos(pagos)
+        sin_aplicar = aplicar_pagos_fifo(pagos)
+
+        resumen['importadas'] += len(pagos)
+        resumen['monto_importado'] += sum(pago.monto for pago in pagos)
+        resumen['monto_sin_aplicar'] += sum(sin_aplicar.values())
+
+    # Todos los lotes comparten la transacción: los bloqueos de unidad se toman
+    # antes de abrirla (ver services.bloqueo_unidades)
+    with bloqueo_unidades(unidades_del_condominio(condominio)), transaction.atomic():
+        lote = []
+        for numero, fila in leer_filas(lineas):
+            resumen['leidas'] += 1
+
+            id_unidad = indice.get(normalizar_identificador(fila.get('unidad')))
+            monto = parsear_monto(fila.get('monto'))
+            fecha = parsear_fecha(fila.get('fecha'))
+
+            if id_unidad is None:
+                rechazar(numero, fila, "Unidad no encontrada")
+            elif id_unidad is _AMBIGUO:
+                rechazar(numero, fila, "Código de unidad repetido en varios grupos: indique el grupo")
+            elif monto is None or monto <= 0:
+                rechazar(numero, fila, "Monto inválido o no es un depósito")
+            elif fecha is None:
+                rechazar(numero, fila, "Fecha inválida")
+            else:
+                lote.append((numero, fila, Pago(
+                    id_unidad_id=id_unidad,
+                    id_condominio=condominio,
+                    fecha_pago=fecha,
+                    monto=monto,
+                    id_metodo_pago=metodo_pago,
+                    tipo=Pago.TipoPago.NORMAL,
+                    ref_externa=fila.get('referencia', '')[:120] or None,
+                    observacion=(fila.get('glosa') or 'Importado desde cartola')[:300]
+                )))
+
+            if len(lote) >= TAMANO_LOTE:
+                procesar_lote(lote)
+                lote = []
+
+        if lote:
+            procesar_lote(lote)
+
+    return resumen
@@ -0,0 +1,173 @@
+"""
+Emisión masiva de comprobantes de pago (ComprobantePago).
+
+1. Se leen los pagos sin comprobante (con sus aplicaciones) en pocas consultas.
+2. Se reserva un bloque contiguo de folios por lote con un UPDATE atómico
+   sobre SecuenciaFolio: procesos concurrentes nunca obtienen el mismo folio.
+3. Los PDF se generan en un pool de procesos (pdf.renderizar_comprobantes) y
+   se guardan en un almacén direccionado por contenido (ruta = SHA-256).
+4. Los ComprobantePago se insertan con bulk_create.
+
+Si el render de un lote falla, sus folios quedan sin usar (hay saltos en la
+numeración, pero nunca folios repetidos). Lo mismo pasa cuando dos procesos
+emiten a la vez el mismo pago: se conserva el comprobante del primero y el
+folio del otro se salta (queda en el log como advertencia).
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ComprobantePago, PagoAplicacion, SaldoFavor, SecuenciaFolio
+from .pdf import renderizar_comprobantes
+from .services import TAMANO_LOTE
+
+logger = logging.getLogger(__name__)
+
+SECUENCIA_COMPROBANTES = 'comprobante_pago'
+PREFIJO_FOLIO = 'CP-'
+
+# Pagos que se leen, numeran y guardan por vuelta (acota la memoria)
+PAGOS_POR_LOTE = 2000
+
+# Comprobantes que renderiza cada tarea del pool (menos overhead de comunicación)
+COMPROBANTES_POR_TAREA = 100
+
+
+def formatear_folio(numero):
+    return f"{PREFIJO_FOLIO}{numero:010d}"
+
+
+def reservar_folios(cantidad, nombre=SECUENCIA_COMPROBANTES):
+    """
+    Reserva 'cantidad' números de folio contiguos y devuelve el range.
+
+    El UPDATE siguiente = siguiente + cantidad bloquea la fila (en SQLite, la
+    base) hasta el fin de la transacción, así que otro proceso que reserve al
+    mismo tiempo espera y obtiene el bloque siguiente.
+    """
+    if cantidad <= 0:
+        return range(0)
+
+    SecuenciaFolio.objects.get_or_create(nombre=nombre, defaults={'siguiente': _primer_folio_libre()})
+    with transaction.atomic():
+        SecuenciaFolio.objects.filter(nombre=nombre).update(siguiente=F('siguiente') + cantidad)
+        siguiente = SecuenciaFolio.objects.filter(nombre=nombre).values_list('siguiente', flat=True).get()
+    return range(siguiente - cantidad, siguiente)
+
+
+def _primer_folio_libre():
+    """Primer número después de los folios ya emitidos (al crear la secuencia)."""
+    ultimo = ComprobantePago.objects.filter(
+        folio__startswith=PREFIJO_FOLIO
+    ).order_by('-folio').values_list('folio', flat=True).first()
+    return int(ultimo[len(PREFIJO_FOLIO):]) + 1 if ultimo else 1
+
+
+def _formatear_monto(monto):
+    return f"{monto:,.0f}".replace(',', '.')
+
+
+def _datos_comprobantes(pagos, folios):
+    """Datos simples (picklables) de cada comprobante para el pool."""
+    ids = [pago['id_pago'] for pago in pagos]
+
+    aplicaciones = {}
+    for id_pago, periodo, monto in PagoAplicacion.objects.filter(id_pago__in=ids).order_by(
+        'id_cobro__periodo'
+    ).values_list('id_pago', 'id_cobro__periodo', 'monto_aplicado'):
+        aplicaciones.setdefault(id_pago, []).append((periodo, _formatear_monto(monto)))
+
+    saldos_favor = dict(SaldoFavor.objects.filter(id_pago__in=ids).values_list('id_pago', 'monto_original'))
+
+    return [
+        {
+            'id_pago': pago['id_pago'],
+            'folio': formatear_folio(folio),
+            'condominio': pago['id_unidad__id_grupo__id_condominio__nombre'] or '',
+            'unidad': pago['id_unidad__codigo'],
+            'fecha_pago': f"{timezone.localtime(pago['fecha_pago']):%d-%m-%Y}",
+            'metodo': pago['id_metodo_pago__nombre'],
+            'monto': _formatear_monto(pago['monto']),
+            'referencia': pago['ref_externa'],
+            'aplicaciones': aplicaciones.get(pago['id_pago'], []),
+            'saldo_favor': _formatear_monto(saldos_favor[pago['id_pago']]) if pago['id_pago'] in saldos_favor else None,
+        }
+        for pago, folio in zip(pagos, folios)
+    ]
+
+
+def emitir_comprobantes(pagos, procesos=None, directorio=None, al_avanzar=None):
+    """
+    Emite el comprobante de cada pago de 'pagos' (queryset) que aún no lo
+    tenga, en orden de fecha de pago. 'procesos' es el tamaño del pool
+    (1 = sin pool, todo en este proceso). 'al_avanzar(emitidos)' se llama
+    después de cada lote.
+
+    Devuelve la cantidad de comprobantes emitidos.
+    """
+    directorio = str(directorio or settings.COMPROBANTES_ROOT)
+    procesos = procesos or os.cpu_count() or 1
+
+    pendientes = pagos.filter(comprobantepago__isnull=True).order_by('fecha_pago', 'id_pago')
+    emitidos = 0
+
+    pool = ProcessPoolExecutor(max_workers=procesos) if procesos > 1 else None
+    try:
+        while True:
+            lote = list(pendientes.values(
+                'id_pago', 'monto', 'fecha_pago', 'ref_externa', 'id_unidad__codigo',
+                'id_unidad__id_grupo__id_condominio__nombre', 'id_metodo_pago__nombre'
+            )[:PAGOS_POR_LOTE])
+            if not lote:
+                return emitidos
+
+            folios = reservar_folios(len(lote))
+            datos = _datos_comprobantes(lote, folios)
+            tareas = [datos[i:i + COMPROBANTES_POR_TAREA] for i in range(0, len(datos), COMPROBANTES_POR_TAREA)]
+
+            if pool:
+                resultados = pool.map(renderizar_comprobantes, tareas, [directorio] * len(tareas))
+            else:
+                resultados = (renderizar_comprobantes(tarea, directorio) for tarea in tareas)
+            rutas = dict(ruta for resultado in resultados for ruta in resultado)
+
+            folio_por_pago = {dato['id_pago']: dato['folio'] for dato in datos}
+            # ignore_conflicts: si otro proceso emitió el mismo pago entre medio,
+            # se conserva el suyo (id_pago es único) y este folio queda sin usar
+            ComprobantePago.objects.bulk_create(
+                [
+                    ComprobantePago(
+                        id_pago_id=id_pago,
+                        folio=folio_por_pago[id_pago],
+                        url_pdf=f"{settings.COMPROBANTES_URL}{ruta.replace(os.sep, '/')}"
+                    )
+                    for id_pago, ruta in rutas.items()
+                ],
+                batch_size=TAMANO_LOTE,
+                ignore_conflicts=True
+            )
+
+            # Los folios del bloque son solo de este proceso: los que están en
+            # la tabla son los que se insertaron de verdad
+            insertados = ComprobantePago.objects.filter(
+                folio__gte=formatear_folio(folios[0]), folio__lte=formatear_folio(folios[-1])
+            )
+            emitidos_lote = insertados.count()
+            if emitidos_lote < len(datos):
+                usados = set(insertados.values_list('folio', flat=True))
+                logger.warning(
+                    "Folios sin usar (pago ya emitido por otro proceso o PDF no generado): %s",
+                    ', '.join(sorted(set(folio_por_pago.values()) - usados))
+                )
+
+            emitidos += emitidos_lote
+            if al_avanzar:
+                al_avanzar(emitidos)
+    finally:
+        if pool:
+            pool.shutdown()
@@ -0,0 +1,154 @@
+"""
+Conciliación de pagos contra archivos de liquidación (banco o pasarela).
+
+Los Pagos del rango de fechas se cargan UNA vez en índices hash:
+    - por referencia normalizada (Pago.ref_externa), y
+    - por (monto, fecha), para las líneas o pagos que vienen sin referencia.
+Luego el archivo se recorre línea a línea y cada línea se resuelve con
+búsquedas en esos índices (sin comparar cada línea contra cada pago), así que
+el costo es proporcional a la suma de ambos lados y no a su producto.
+
+Columnas del archivo (mismo formato de CSV que la cartola, ver cartola.py):
+    referencia  N° de operación / id de transacción (puede venir vacío)
+    monto       monto liquidado
+    fecha       fecha de la operación
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .cartola import leer_filas, parsear_fecha, parsear_monto
+from .models import Pago
+
+COLUMNAS_LIQUIDACION = ('referencia', 'monto', 'fecha')
+
+# Días de diferencia aceptados entre la fecha del archivo y la del pago
+# cuando se concilia sin referencia (fecha contable vs fecha valuta)
+TOLERANCIA_DIAS = 3
+
+# Categorías del resultado
+CONCILIADO = 'conciliado'
+MONTO_DISTINTO = 'monto_distinto'
+DUPLICADO = 'duplicado'
+FALTA_EN_SISTEMA = 'falta_en_sistema'
+FALTA_EN_ARCHIVO = 'falta_en_archivo'
+
+
+def normalizar_referencia(referencia):
+    """'000123', ' 123 ' y '1-23' se comparan igual (solo letras y dígitos, sin ceros a la izquierda)."""
+    return ''.join(caracter for caracter in (referencia or '').upper() if caracter.isalnum()).lstrip('0')
+
+
+def conciliar_pagos(condominio, lineas, desde, hasta, tolerancia_dias=TOLERANCIA_DIAS, diferencia=None):
+    """
+    Concilia el archivo de liquidación 'lineas' (iterable de texto) contra
+    los Pagos del condominio con fecha entre 'desde' y 'hasta' (fechas).
+
+    'diferencia(categoria, datos)' se llama por cada ítem que no concilia:
+        MONTO_DISTINTO    la referencia existe pero el monto no coincide
+        DUPLICADO         referencia repetida en el archivo o en varios pagos
+        FALTA_EN_SISTEMA  línea del archivo sin pago
+        FALTA_EN_ARCHIVO  pago del rango que no aparece en el archivo
+    Lanza CartolaInvalida si el archivo no tiene las columnas esperadas.
+
+    Devuelve {categoria: cantidad} más 'lineas' (leídas) y 'pagos' (del rango).
+    """
+    resultado = {
+        'lineas': 0, 'pagos': 0, CONCILIADO: 0, MONTO_DISTINTO: 0,
+        DUPLICADO: 0, FALTA_EN_SISTEMA: 0, FALTA_EN_ARCHIVO: 0,
+    }
+
+    def informar(categoria, datos):
+        resultado[categoria] += 1
+        if diferencia:
+            diferencia(categoria, datos)
+
+    # 1. Índices hash de los pagos del rango (una consulta)
+    por_referencia = {}
+    por_monto_fecha = {}
+    pagos = {}
+    for id_pago, id_unidad, codigo, monto, fecha_pago, ref_externa in Pago.objects.filter(
+        id_unidad__id_grupo__id_condominio=condominio,
+        # Rango sobre la columna (no sobre su fecha) para que pueda usar índices
+        fecha_pago__gte=timezone.make_aware(datetime.combine(desde, time.min)),
+        fecha_pago__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    ).values_list('id_pago', 'id_unidad', 'id_unidad__codigo', 'monto', 'fecha_pago', 'ref_externa'):
+        pago = {
+            'id_pago': id_pago, 'id_unidad': id_unidad, 'unidad': codigo, 'monto': monto,
+            'fecha': timezone.localtime(fecha_pago).date(), 'referencia': ref_externa,
+        }
+        pagos[id_pago] = pago
+        referencia = normalizar_referencia(ref_externa)
+        if referencia:
+            por_referencia.setdefault(referencia, []).append(pago)
+        else:
+            por_monto_fecha.setdefault((monto, pago['fecha']), []).append(pago)
+    resultado['pagos'] = len(pagos)
+
+    # Varios pagos con la misma referencia: se informan una vez y no se concilian
+    duplicados = set()
+    for coincidencias in por_referencia.values():
+        if len(coincidencias) > 1:
+            for pago in coincidencias:
+                duplicados.add(pago['id_pago'])
+                informar(DUPLICADO, {'origen': 'sistema', **pago})
+
+    # 2. Una pasada por el archivo
+    conciliados = set()
+    referencias_vistas = set()
+    for numero, fila in leer_filas(lineas, COLUMNAS_LIQUIDACION):
+        resultado['lineas'] += 1
+        monto = parsear_monto(fila['monto'])
+        fecha = parsear_fecha(fila['fecha'])
+        fecha = fecha.date() if fecha else None
+        linea = {'origen': 'archivo', 'linea': numero, **fila}
+        referencia = normalizar_referencia(fila['referencia'])
+
+        if referencia:
+            if referencia in referencias_vistas:
+                informar(DUPLICADO, linea)
+                continue
+            referencias_vistas.add(referencia)
+
+            coincidencias = por_referencia.get(referencia)
+            if not coincidencias:
+                informar(FALTA_EN_SISTEMA, linea)
+            elif len(coincidencias) > 1:
+                informar(DUPLICADO, linea)
+            elif coincidencias[0]['monto'] != monto:
+                conciliados.add(coincidencias[0]['id_pago'])
+                informar(MONTO_DISTINTO, {**linea, 'pago': coincidencias[0]})
+            else:
+                conciliados.add(coincidencias[0]['id_pago'])
+                resultado[CONCILIADO] += 1
+            continue
+
+        # Sin referencia: mismo monto y fecha dentro de la tolerancia
+        pago = _tomar_por_monto_fecha(por_monto_fecha, monto, fecha, tolerancia_dias) if fecha else None
+        if pago is None:
+            informar(FALTA_EN_SISTEMA, linea)
+        else:
+            conciliados.add(pago['id_pago'])
+            resultado[CONCILIADO] += 1
+
+    # 3. Pagos del rango que el archivo no trae
+    for id_pago, pago in pagos.items():
+        if id_pago not in conciliados and id_pago not in duplicados:
+            informar(FALTA_EN_ARCHIVO, {'origen': 'sistema', **pago})
+
+    return resultado
+
+
+def _tomar_por_monto_fecha(indice, monto, fecha, tolerancia_dias):
+    """
+    Saca del índice el primer pago sin referencia con el mismo monto y la
+    fecha más cercana (hasta 'tolerancia_dias' de diferencia), o None.
+    """
+    if monto is None:
+        return None
+    for dias in sorted(range(-tolerancia_dias, tolerancia_dias + 1), key=abs):
+        candidatos = indice.get((monto, fecha + timedelta(days=dias)))
+        if candidatos:
+            return candidatos.pop(0)
+    return None
+
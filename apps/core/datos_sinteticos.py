@@ -0,0 +1,120 @@
+"""
+Generador de datos sintéticos para pruebas de carga y benchmarks.
+
+Crea condominios completos (grupos, unidades con coef_prop que suma 1, gastos,
+cobros y pagos) de forma reproducible: con la misma semilla se obtienen los
+mismos datos. Lo usan 'manage.py seed_benchmark' y 'manage.py bench_cierre'.
+"""
+import random
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import CatMetodoPago, Condominio, Gasto, GastoCategoria, Grupo, Unidad
+from .prorrateo import normalizar_factores
+from .services import (
+    TAMANO_LOTE, VigenciaReglas, crear_regla_gasto_comun_default, generar_cierre_mensual, registrar_pago
+)
+
+CATEGORIAS_GASTO = ('Aseo', 'Mantención', 'Electricidad', 'Agua', 'Remuneraciones', 'Seguros')
+
+
+def periodos_consecutivos(cantidad, desde='202401'):
+    """Lista de 'cantidad' periodos YYYYMM consecutivos a partir de 'desde'."""
+    anio, mes = int(desde[:4]), int(desde[4:])
+    periodos = []
+    for _ in range(cantidad):
+        periodos.append(f"{anio:04d}{mes:02d}")
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return periodos
+
+
+def generar_condominio(nombre, grupos=2, unidades_por_grupo=50, periodos=('202401',),
+                       gastos_por_periodo=10, fraccion_pagos=0.5, cerrar=True, semilla=0):
+    """
+    Crea un condominio sintético y devuelve el objeto Condominio.
+
+    - Unidades con metros2 aleatorios; coef_prop proporcional a los m2 y
+      normalizado para que sume exactamente 1.
+    - 'gastos_por_periodo' gastos en cada periodo.
+    - Si cerrar=True, genera el cierre de cada periodo (Cobros) y registra
+      pagos para 'fraccion_pagos' de las unidades (pago total o parcial).
+    """
+    azar = random.Random(semilla)
+
+    condominio = Condominio.objects.create(nombre=nombre)
+
+    lista_grupos = Grupo.objects.bulk_create([
+        Grupo(id_condominio=condominio, nombre=f"Torre {i + 1}", tipo='Torre')
+        for i in range(grupos)
+    ])
+
+    # Unidades: primero los m2, luego coef_prop normalizado sobre el total
+    metros = [
+        Decimal(azar.randint(3500, 12000)) / 100
+        for _ in range(grupos * unidades_por_grupo)
+    ]
+    coeficientes = normalizar_factores(metros)
+
+    unidades = []
+    for i, grupo in enumerate(lista_grupos):
+        for j in range(unidades_por_grupo):
+            indice = i * unidades_por_grupo + j
+            unidades.append(Unidad(
+                id_grupo=grupo,
+                codigo=f"DEPTO-{j + 1:04d}",
+                metros2=metros[indice],
+                coef_prop=coeficientes[indice]
+            ))
+    Unidad.objects.bulk_create(unidades, batch_size=TAMANO_LOTE)
+
+    # Gastos (bulk_create no llama a Gasto.save(): calculamos 'total' aquí)
+    categorias = [GastoCategoria.objects.get_or_create(nombre=nombre)[0] for nombre in CATEGORIAS_GASTO]
+    gastos = []
+    for periodo in periodos:
+        emision = date(int(periodo[:4]), int(periodo[4:]), 1)
+        for _ in range(gastos_por_periodo):
+            neto = Decimal(azar.randint(50_000, 5_000_000))
+            iva = (neto * Decimal('0.19')).quantize(Decimal(1))
+            gastos.append(Gasto(
+                id_condominio=condominio,
+                periodo=periodo,
+                id_gasto_categ=azar.choice(categorias),
+                fecha_emision=emision,
+                neto=neto,
+                iva=iva,
+                total=neto + iva,
+                descripcion=f"Gasto sintético {periodo}"
+            ))
+    Gasto.objects.bulk_create(gastos, batch_size=TAMANO_LOTE)
+
+    if not cerrar:
+        return condominio
+
+    metodo_pago, _ = CatMetodoPago.objects.get_or_create(
+        codigo='TRANSFERENCIA', defaults={'nombre': 'Transferencia'}
+    )
+
+    unidades = list(Unidad.objects.filter(id_grupo__id_condominio=condominio).order_by('id_unidad'))
+
+    # Regla base y vigencias cargadas una vez para todos los periodos
+    crear_regla_gasto_comun_default(condominio)
+    reglas = VigenciaReglas.del_condominio(condominio)
+
+    for periodo in periodos:
+        cobros = generar_cierre_mensual(condominio, periodo, reglas=reglas)
+        saldo_por_unidad = {cobro.id_unidad_id: cobro.saldo for cobro in cobros}
+
+        fecha_pago = timezone.make_aware(
+            datetime.combine(date(int(periodo[:4]), int(periodo[4:]), 20), time(12))
+        )
+        for unidad in azar.sample(unidades, int(len(unidades) * fraccion_pagos)):
+            saldo = saldo_por_unidad.get(unidad.id_unidad)
+            if not saldo:
+                continue
+            # Dos de cada tres pagan completo; el resto abona una parte
+            monto = saldo if azar.random() < 2 / 3 else (saldo / 2).quantize(Decimal(1))
+            registrar_pago(unidad, monto, metodo_pago, fecha_pago, observacion='Pago sintético')
+
+    return condominio
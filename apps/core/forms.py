@@ -60,7 +60,27 @@ class PagoForm(forms.ModelForm):
         if condominio_id:
             # Filter units by condominio
             from .models import Unidad
-            self.fields['id_unidad'].queryset = Unidad.objects.filter(id_grupo__id_condominio_id=condominio_id)
+            # select_related: la etiqueta de cada opción (Unidad.__str__) incluye el grupo
+            self.fields['id_unidad'].queryset = Unidad.objects.filter(
+                id_grupo__id_condominio_id=condominio_id
+            ).select_related('id_grupo')
+
+class CartolaForm(forms.Form):
+    archivo = forms.FileField(
+        label='Cartola (CSV)',
+        help_text='Columnas: fecha, monto, unidad y opcionalmente referencia y glosa.',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+    id_metodo_pago = forms.ModelChoiceField(
+        queryset=CatMetodoPago.objects.all(),
+        label='Método de Pago',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    codificacion = forms.ChoiceField(
+        choices=[('utf-8-sig', 'UTF-8'), ('latin-1', 'Latin-1 (Excel)')],
+        label='Codificación',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
 
 class TrabajadorForm(forms.ModelForm):
     class Meta:
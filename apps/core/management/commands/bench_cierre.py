@@ -0,0 +1,195 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.datos_sinteticos import generar_condominio, periodos_consecutivos
+from apps.core.models import CatMetodoPago, Unidad
+from apps.core.services import (
+    calcular_factores_prorrateo, crear_regla_gasto_comun_default, generar_cierre_mensual, registrar_pago
+)
+from apps.usuarios.models import Usuario
+
+# Unidades por grupo (torre) en los condominios del benchmark
+UNIDADES_POR_GRUPO = 100
+
+
+def _commit_actual():
+    """Hash corto del commit actual (o None si no es un repositorio git)."""
+    try:
+        salida = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5
+        )
+    except OSError:
+        return None
+    return salida.stdout.strip() or None
+
+
+def _medir(operacion, unidades, funcion, repeticiones=1):
+    """
+    Ejecuta funcion() 'repeticiones' veces y devuelve el tiempo total y la
+    cantidad de consultas SQL (también por repetición).
+    """
+    with CaptureQueriesContext(connection) as consultas:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        segundos = time.perf_counter() - inicio
+
+    return {
+        'operacion': operacion,
+        'unidades': unidades,
+        'repeticiones': repeticiones,
+        'segundos': round(segundos, 4),
+        'consultas': len(consultas),
+        'ms_por_repeticion': round(segundos * 1000 / repeticiones, 3),
+        'consultas_por_repeticion': round(len(consultas) / repeticiones, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de calcular_factores_prorrateo, generar_cierre_mensual, registrar_pago "
+        "y las vistas de listado a varias escalas. Usa una base de datos de prueba "
+        "temporal y guarda tiempos y cantidad de consultas en un JSON comparable entre commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos', type=int, nargs='+', default=[100, 1000, 10_000],
+            help="Cantidades de unidades por condominio a medir"
+        )
+        parser.add_argument('--pagos', type=int, default=50, help="Pagos a registrar por escala")
+        parser.add_argument('--semilla', type=int, default=0, help="Semilla del generador de datos")
+        parser.add_argument('--salida', default='benchmark.json', help="Archivo JSON de resultados")
+        parser.add_argument('--comparar', help="JSON de una corrida anterior para mostrar diferencias")
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    anterior = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {e}")
+
+        # Nunca medimos sobre la base real: creamos (y luego borramos) una de prueba
+        nombre_original = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            resultados = []
+            for cantidad in options['tamanos']:
+                self.stdout.write(f"Midiendo {cantidad} unidades...")
+                resultados.extend(self._medir_escala(cantidad, options['pagos'], options['semilla']))
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        reporte = {
+            'fecha': timezone.now().isoformat(),
+            'commit': _commit_actual(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'base_datos': connection.vendor,
+            'resultados': resultados,
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+
+        self._mostrar(resultados, anterior)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+    def _medir_escala(self, cantidad, cantidad_pagos, semilla):
+        grupos = max(1, cantidad // UNIDADES_POR_GRUPO)
+        periodo, periodo_siguiente = periodos_consecutivos(2)
+
+        condominio = generar_condominio(
+            nombre=f"Benchmark {cantidad}",
+            grupos=grupos,
+            unidades_por_grupo=max(1, cantidad // grupos),
+            periodos=(periodo, periodo_siguiente),
+            cerrar=False,
+            semilla=semilla
+        )
+        unidades = list(Unidad.objects.filter(id_grupo__id_condominio=condominio).order_by('id_unidad'))
+        total = len(unidades)
+
+        regla = crear_regla_gasto_comun_default(condominio)
+        resultados = [
+            _medir('calcular_factores_prorrateo', total, lambda: calcular_factores_prorrateo(regla)),
+            _medir('generar_cierre_mensual', total, lambda: generar_cierre_mensual(condominio, periodo)),
+            _medir(
+                'generar_cierre_mensual (incremental sin cambios)', total,
+                lambda: generar_cierre_mensual(condominio, periodo, incremental=True)
+            ),
+        ]
+
+        # Segundo periodo sin medir: así cada unidad tiene dos cobros para el FIFO
+        generar_cierre_mensual(condominio, periodo_siguiente)
+
+        metodo_pago, _ = CatMetodoPago.objects.get_or_create(
+            codigo='TRANSFERENCIA', defaults={'nombre': 'Transferencia'}
+        )
+        por_pagar = iter(unidades[:cantidad_pagos])
+        fecha_pago = timezone.now()
+        if cantidad_pagos:
+            resultados.append(_medir(
+                'registrar_pago', total,
+                # Cada pago cubre el primer cobro completo y parte del segundo
+                lambda: registrar_pago(next(por_pagar), 1_000_000, metodo_pago, fecha_pago),
+                repeticiones=min(cantidad_pagos, total)
+            ))
+
+        cliente = Client()
+        usuario, _ = Usuario.objects.get_or_create(
+            email='benchmark@example.com',
+            defaults={'rut_base': 11111111, 'rut_dv': '1', 'nombres': 'Benchmark', 'apellidos': 'Benchmark'}
+        )
+        cliente.force_login(usuario)
+
+        vistas = [
+            ('vista gastos_list', reverse('gastos_list', args=[condominio.id_condominio])),
+            ('vista cobros_list', reverse('cobros_list', args=[condominio.id_condominio, periodo])),
+            ('vista pagos_list', reverse('pagos_list', args=[condominio.id_condominio])),
+            ('vista cierre_mensual', f"{reverse('cierre_mensual', args=[condominio.id_condominio])}?periodo={periodo}"),
+        ]
+        for nombre, url in vistas:
+            resultados.append(_medir(nombre, total, lambda: self._get(cliente, url)))
+
+        return resultados
+
+    def _get(self, cliente, url):
+        respuesta = cliente.get(url)
+        if respuesta.status_code != 200:
+            raise CommandError(f"GET {url} respondió {respuesta.status_code}")
+
+    def _mostrar(self, resultados, anterior):
+        previos = {}
+        if anterior:
+            previos = {(r['operacion'], r['unidades']): r for r in anterior.get('resultados', [])}
+            self.stdout.write(f"Comparando con commit {anterior.get('commit') or '?'} ({anterior.get('fecha', '?')})")
+
+        self.stdout.write("")
+        self.stdout.write(f"{'operacion':<50} {'unidades':>8} {'ms/rep':>10} {'consultas/rep':>14}  {'vs anterior':<20}")
+        for r in resultados:
+            linea = (
+                f"{r['operacion']:<50} {r['unidades']:>8} "
+                f"{r['ms_por_repeticion']:>10.2f} {r['consultas_por_repeticion']:>14.2f}"
+            )
+            previo = previos.get((r['operacion'], r['unidades']))
+            if previo and previo['ms_por_repeticion']:
+                cambio = (r['ms_por_repeticion'] / previo['ms_por_repeticion'] - 1) * 100
+                consultas = r['consultas_por_repeticion'] - previo['consultas_por_repeticion']
+                linea += f"  {cambio:+.1f}% tiempo, {consultas:+.2f} consultas"
+            self.stdout.write(linea)
@@ -0,0 +1,59 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.core import prorrateo
+
+
+def _factores_aleatorios(cantidad, semilla):
+    """Factores con 6 decimales que suman aproximadamente 1 (como coef_prop)."""
+    azar = random.Random(semilla)
+    pesos = [azar.randint(1, 1000) for _ in range(cantidad)]
+    return prorrateo.normalizar_factores(pesos)
+
+
+def _distribuir_decimal(total, factores):
+    """Método anterior: Decimal por unidad y redondeo independiente (referencia)."""
+    return [round(total * factor, 0) for factor in factores]
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark del núcleo de prorrateo (distribuir_monto) a 100, 10k y 100k unidades."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos', type=int, nargs='+', default=[100, 10_000, 100_000],
+            help="Cantidades de unidades a medir"
+        )
+        parser.add_argument('--repeticiones', type=int, default=5, help="Repeticiones por medición (se informa la mejor)")
+
+    def handle(self, *args, **options):
+        total = Decimal('123456789')
+        repeticiones = options['repeticiones']
+
+        # Cada variante recibe (factores, pesos): 'pesos' son los factores ya
+        # convertidos a enteros, como los guarda la caché de factores del cierre
+        variantes = [('decimal (anterior)', lambda f, p: _distribuir_decimal(total, f))]
+        variantes.append(('enteros (python)', lambda f, p: prorrateo.distribuir_monto(total, f, usar_numpy=False)))
+        if prorrateo.np is not None:
+            variantes.append(('enteros (numpy)', lambda f, p: prorrateo.distribuir_monto(total, f, usar_numpy=True)))
+        variantes.append(('enteros (en caché)', lambda f, p: prorrateo.distribuir_monto(total, f, pesos=p)))
+        if prorrateo.np is None:
+            self.stdout.write("NumPy no está instalado: se omite la variante vectorizada.")
+
+        self.stdout.write(f"{'unidades':>10}  {'variante':<20}  {'mejor (ms)':>11}  {'suma - total':>12}")
+        for cantidad in options['tamanos']:
+            factores = _factores_aleatorios(cantidad, semilla=cantidad)
+            pesos = prorrateo.factores_a_pesos(factores)
+            for nombre, funcion in variantes:
+                mejor = None
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    partes = funcion(factores, pesos)
+                    duracion = time.perf_counter() - inicio
+                    mejor = duracion if mejor is None else min(mejor, duracion)
+
+                deriva = sum(partes, Decimal(0)) - total
+                self.stdout.write(f"{cantidad:>10}  {nombre:<20}  {mejor * 1000:>11.2f}  {deriva:>12}")
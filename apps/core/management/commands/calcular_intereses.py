@@ -0,0 +1,55 @@
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.core.models import Condominio
+from apps.core.services import TASA_INTERES_MENSUAL, calcular_intereses_mora, ejecutar_con_reintentos
+
+
+class Command(BaseCommand):
+    help = (
+        "Devenga el interés por mora de los cobros vencidos con saldo a una fecha de corte. "
+        "Se puede re-ejecutar para la misma fecha sin duplicar intereses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help="Fecha de corte YYYY-MM-DD (por defecto: hoy)")
+        parser.add_argument(
+            '--condominio', type=int, action='append', dest='condominios',
+            help="ID de condominio (se puede repetir). Por defecto: todos."
+        )
+        parser.add_argument(
+            '--tasa', default=str(TASA_INTERES_MENSUAL),
+            help=f"Tasa de interés mensual (por defecto {TASA_INTERES_MENSUAL} = {TASA_INTERES_MENSUAL * 100}%%)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            fecha_corte = date.fromisoformat(options['fecha']) if options['fecha'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("La fecha debe tener formato YYYY-MM-DD.")
+
+        try:
+            tasa = Decimal(options['tasa'])
+        except InvalidOperation:
+            raise CommandError("La tasa debe ser un número, ej: 0.015")
+        if tasa < 0:
+            raise CommandError("La tasa no puede ser negativa.")
+
+        condominios = Condominio.objects.order_by('id_condominio')
+        if options['condominios']:
+            condominios = condominios.filter(id_condominio__in=options['condominios'])
+
+        for condominio in condominios:
+            inicio = time.monotonic()
+            resultado, _ = ejecutar_con_reintentos(
+                lambda: calcular_intereses_mora(condominio, fecha_corte, tasa_mensual=tasa)
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"[{condominio.id_condominio}] {condominio.nombre}: {resultado['vencidos']} cobros vencidos, "
+                f"{resultado['actualizados']} actualizados, interés acumulado ${resultado['total_interes']:,.0f} "
+                f"({time.monotonic() - inicio:.2f}s)"
+            ))
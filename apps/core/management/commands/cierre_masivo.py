@@ -0,0 +1,130 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django import db
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import Condominio
+
+
+def _inicializar_worker():
+    """
+    Se ejecuta una vez en cada proceso del pool.
+    Con 'spawn' hay que inicializar Django; con 'fork' las conexiones heredadas
+    del proceso padre no se deben reutilizar, así que las cerramos.
+    """
+    import django
+    django.setup()
+    db.connections.close_all()
+
+
+def _cerrar_condominio(condominio_id, periodo, reintentos, espera_base):
+    """
+    Tarea del pool: ejecuta el cierre de UN condominio.
+    Reintenta con backoff exponencial si SQLite responde 'database is locked'.
+    Devuelve un diccionario con el resultado (nunca lanza excepción).
+    """
+    from apps.core.services import ejecutar_con_reintentos, generar_cierre_mensual
+
+    inicio = time.monotonic()
+    resultado = {'condominio_id': condominio_id, 'ok': False, 'cobros': 0, 'error': None, 'intentos': 1}
+
+    def cerrar():
+        condominio = Condominio.objects.get(pk=condominio_id)
+        return generar_cierre_mensual(condominio, periodo)
+
+    try:
+        cobros, resultado['intentos'] = ejecutar_con_reintentos(cerrar, reintentos, espera_base)
+        resultado['ok'] = True
+        resultado['cobros'] = len(cobros)
+    except Exception as e:
+        resultado['error'] = str(e)
+    finally:
+        db.connections.close_all()
+
+    resultado['segundos'] = time.monotonic() - inicio
+    return resultado
+
+
+class Command(BaseCommand):
+    help = "Genera el cierre mensual de varios condominios en paralelo (un condominio por proceso)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', required=True, help="Periodo a cerrar, formato YYYYMM")
+        parser.add_argument(
+            '--condominio', type=int, action='append', dest='condominios',
+            help="ID de condominio a cerrar (se puede repetir). Por defecto: todos."
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Cantidad de procesos en paralelo (por defecto: núcleos disponibles)"
+        )
+        parser.add_argument(
+            '--reintentos', type=int, default=5,
+            help="Reintentos por condominio si la base de datos está bloqueada"
+        )
+        parser.add_argument(
+            '--espera', type=float, default=0.2,
+            help="Espera base en segundos para el backoff exponencial"
+        )
+
+    def handle(self, *args, **options):
+        periodo = options['periodo']
+        if not re.fullmatch(r'\d{4}(0[1-9]|1[0-2])', periodo):
+            raise CommandError("El periodo debe tener formato YYYYMM (ej: 202511).")
+
+        condominios = Condominio.objects.order_by('id_condominio')
+        if options['condominios']:
+            condominios = condominios.filter(id_condominio__in=options['condominios'])
+        nombres = dict(condominios.values_list('id_condominio', 'nombre'))
+
+        if not nombres:
+            raise CommandError("No hay condominios para cerrar.")
+
+        workers = max(1, min(options['workers'], len(nombres)))
+        self.stdout.write(f"Cerrando {len(nombres)} condominio(s) para {periodo} con {workers} proceso(s)...")
+
+        # Los procesos hijos no deben heredar conexiones abiertas del padre
+        db.connections.close_all()
+
+        inicio = time.monotonic()
+        resultados = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+            futuros = [
+                pool.submit(_cerrar_condominio, condominio_id, periodo, options['reintentos'], options['espera'])
+                for condominio_id in nombres
+            ]
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                resultados.append(resultado)
+                self._mostrar_resultado(resultado, nombres)
+
+        total = time.monotonic() - inicio
+        exitosos = [r for r in resultados if r['ok']]
+        fallidos = [r for r in resultados if not r['ok']]
+        suma_tiempos = sum(r['segundos'] for r in resultados)
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"Resumen: {len(exitosos)} OK, {len(fallidos)} con error, "
+            f"{sum(r['cobros'] for r in exitosos)} cobros generados."
+        )
+        self.stdout.write(
+            f"Tiempo total: {total:.2f}s (suma de tiempos por condominio: {suma_tiempos:.2f}s)"
+        )
+
+        if fallidos:
+            raise CommandError(f"{len(fallidos)} condominio(s) no pudieron cerrarse.")
+
+    def _mostrar_resultado(self, resultado, nombres):
+        nombre = nombres.get(resultado['condominio_id'], '?')
+        linea = (
+            f"[{resultado['condominio_id']}] {nombre}: "
+            f"{resultado['segundos']:.2f}s, {resultado['intentos']} intento(s)"
+        )
+        if resultado['ok']:
+            self.stdout.write(self.style.SUCCESS(f"OK    {linea}, {resultado['cobros']} cobros"))
+        else:
+            self.stdout.write(self.style.ERROR(f"ERROR {linea}: {resultado['error']}"))
@@ -0,0 +1,103 @@
+import csv
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.cartola import CartolaInvalida
+from apps.core.conciliacion import (
+    CONCILIADO, DUPLICADO, FALTA_EN_ARCHIVO, FALTA_EN_SISTEMA, MONTO_DISTINTO, TOLERANCIA_DIAS, conciliar_pagos
+)
+from apps.core.models import Condominio
+
+
+class Command(BaseCommand):
+    help = (
+        "Concilia un archivo de liquidación (CSV con columnas referencia, monto y fecha) del banco "
+        "o la pasarela contra los pagos registrados de un condominio en un rango de fechas. "
+        "Informa conciliados, faltantes en cada lado, duplicados y diferencias de monto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del CSV de liquidación")
+        parser.add_argument('--condominio', type=int, required=True, help="ID del condominio")
+        parser.add_argument('--periodo', help="Mes a conciliar, formato YYYYMM (alternativa a --desde/--hasta)")
+        parser.add_argument('--desde', help="Fecha inicial YYYY-MM-DD")
+        parser.add_argument('--hasta', help="Fecha final YYYY-MM-DD (inclusive)")
+        parser.add_argument(
+            '--tolerancia', type=int, default=TOLERANCIA_DIAS,
+            help=f"Días de diferencia aceptados al conciliar sin referencia (por defecto {TOLERANCIA_DIAS})"
+        )
+        parser.add_argument('--codificacion', default='utf-8-sig', help="Codificación del archivo (ej: latin-1)")
+        parser.add_argument('--salida', help="CSV donde escribir las diferencias (por defecto se muestran en pantalla)")
+
+    def handle(self, *args, **options):
+        try:
+            condominio = Condominio.objects.get(pk=options['condominio'])
+        except Condominio.DoesNotExist:
+            raise CommandError(f"No existe el condominio {options['condominio']}.")
+
+        desde, hasta = self._rango(options)
+
+        salida = None
+        if options['salida']:
+            salida = open(options['salida'], 'w', newline='', encoding='utf-8')
+            escritor = csv.writer(salida)
+            escritor.writerow(['categoria', 'origen', 'linea', 'id_pago', 'unidad', 'referencia', 'monto', 'fecha', 'monto_sistema'])
+
+        def diferencia(categoria, datos):
+            pago = datos.get('pago', {})
+            if salida:
+                escritor.writerow([
+                    categoria, datos['origen'], datos.get('linea', ''), datos.get('id_pago', pago.get('id_pago', '')),
+                    datos.get('unidad', pago.get('unidad', '')), datos.get('referencia') or '',
+                    datos.get('monto', ''), datos.get('fecha', ''), pago.get('monto', '')
+                ])
+            else:
+                donde = f"línea {datos['linea']}" if 'linea' in datos else f"pago {datos['id_pago']}"
+                extra = f" (sistema: ${pago['monto']:,.0f})" if pago else ""
+                self.stdout.write(self.style.WARNING(
+                    f"{categoria}: {donde}, ref {datos.get('referencia') or '-'}, monto {datos.get('monto')}{extra}"
+                ))
+
+        inicio = time.monotonic()
+        try:
+            with open(options['archivo'], newline='', encoding=options['codificacion']) as archivo:
+                resultado = conciliar_pagos(
+                    condominio, archivo, desde, hasta,
+                    tolerancia_dias=options['tolerancia'], diferencia=diferencia
+                )
+        except OSError as e:
+            raise CommandError(f"No se pudo leer {options['archivo']}: {e}")
+        except (CartolaInvalida, UnicodeDecodeError) as e:
+            raise CommandError(f"Archivo inválido: {e}")
+        finally:
+            if salida:
+                salida.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{condominio.nombre} {desde} a {hasta}: {resultado['lineas']} líneas, {resultado['pagos']} pagos "
+            f"({time.monotonic() - inicio:.2f}s)\n"
+            f"  conciliados: {resultado[CONCILIADO]}\n"
+            f"  monto distinto: {resultado[MONTO_DISTINTO]}\n"
+            f"  duplicados: {resultado[DUPLICADO]}\n"
+            f"  en el archivo sin pago: {resultado[FALTA_EN_SISTEMA]}\n"
+            f"  pagos que no están en el archivo: {resultado[FALTA_EN_ARCHIVO]}"
+        ))
+
+    def _rango(self, options):
+        """(desde, hasta) desde --periodo o --desde/--hasta."""
+        if options['periodo']:
+            periodo = options['periodo']
+            if len(periodo) != 6 or not periodo.isdigit() or not 1 <= int(periodo[4:]) <= 12:
+                raise CommandError("El periodo debe tener formato YYYYMM.")
+            desde = date(int(periodo[:4]), int(periodo[4:]), 1)
+            hasta = (desde + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            return desde, hasta
+
+        if not (options['desde'] and options['hasta']):
+            raise CommandError("Indique --periodo o bien --desde y --hasta.")
+        try:
+            return date.fromisoformat(options['desde']), date.fromisoformat(options['hasta'])
+        except ValueError:
+            raise CommandError("Las fechas deben tener formato YYYY-MM-DD.")
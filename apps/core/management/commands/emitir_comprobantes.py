@@ -0,0 +1,75 @@
+import os
+import time
+from datetime import date, datetime, time as hora, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.core.comprobantes import emitir_comprobantes
+from apps.core.models import Pago
+
+
+class Command(BaseCommand):
+    help = (
+        "Emite en lote los comprobantes de pago (PDF con folio) de los pagos que aún no lo tienen. "
+        "Los PDF se generan en paralelo (un pool de procesos) y se guardan en COMPROBANTES_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--condominio', type=int, action='append', dest='condominios',
+            help="ID de condominio (se puede repetir). Por defecto: todos."
+        )
+        parser.add_argument('--periodo', help="Solo pagos del mes YYYYMM (alternativa a --desde/--hasta)")
+        parser.add_argument('--desde', help="Solo pagos desde la fecha YYYY-MM-DD")
+        parser.add_argument('--hasta', help="Solo pagos hasta la fecha YYYY-MM-DD (inclusive)")
+        parser.add_argument(
+            '--procesos', type=int, default=os.cpu_count() or 1,
+            help="Procesos que generan los PDF (por defecto: núcleos disponibles)"
+        )
+
+    def handle(self, *args, **options):
+        if options['procesos'] < 1:
+            raise CommandError("--procesos debe ser al menos 1.")
+
+        pagos = Pago.objects.all()
+        if options['condominios']:
+            pagos = pagos.filter(id_unidad__id_grupo__id_condominio__in=options['condominios'])
+
+        desde, hasta = self._rango(options)
+        # Rango sobre la columna (no sobre su fecha) para que pueda usar índices
+        if desde:
+            pagos = pagos.filter(fecha_pago__gte=timezone.make_aware(datetime.combine(desde, hora.min)))
+        if hasta:
+            pagos = pagos.filter(
+                fecha_pago__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), hora.min))
+            )
+
+        inicio = time.monotonic()
+
+        def al_avanzar(emitidos):
+            self.stdout.write(f"  {emitidos} comprobantes ({time.monotonic() - inicio:.1f}s)")
+
+        emitidos = emitir_comprobantes(pagos, procesos=options['procesos'], al_avanzar=al_avanzar)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{emitidos} comprobantes emitidos con {options['procesos']} procesos en {time.monotonic() - inicio:.2f}s."
+        ))
+
+    def _rango(self, options):
+        """(desde, hasta) desde --periodo o --desde/--hasta (cualquiera puede ser None)."""
+        if options['periodo']:
+            periodo = options['periodo']
+            if len(periodo) != 6 or not periodo.isdigit() or not 1 <= int(periodo[4:]) <= 12:
+                raise CommandError("El periodo debe tener formato YYYYMM.")
+            desde = date(int(periodo[:4]), int(periodo[4:]), 1)
+            hasta = (desde + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            return desde, hasta
+
+        try:
+            return (
+                date.fromisoformat(options['desde']) if options['desde'] else None,
+                date.fromisoformat(options['hasta']) if options['hasta'] else None,
+            )
+        except ValueError:
+            raise CommandError("Las fechas deben tener formato YYYY-MM-DD.")
@@ -0,0 +1,71 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.cartola import CartolaInvalida, importar_cartola
+from apps.core.models import CatMetodoPago, Condominio
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa una cartola bancaria (CSV con columnas fecha, monto, unidad y opcionalmente "
+        "referencia y glosa) como pagos del condominio y los aplica a la deuda (FIFO). "
+        "El archivo se procesa línea a línea; las líneas no importadas se informan con su motivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del CSV de la cartola")
+        parser.add_argument('--condominio', type=int, required=True, help="ID del condominio")
+        parser.add_argument(
+            '--metodo', default='TRANSFERENCIA',
+            help="Código del método de pago a asignar (por defecto: TRANSFERENCIA)"
+        )
+        parser.add_argument('--codificacion', default='utf-8-sig', help="Codificación del archivo (ej: latin-1)")
+        parser.add_argument(
+            '--rechazadas',
+            help="CSV donde escribir las líneas no importadas (por defecto se muestran en pantalla)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            condominio = Condominio.objects.get(pk=options['condominio'])
+        except Condominio.DoesNotExist:
+            raise CommandError(f"No existe el condominio {options['condominio']}.")
+
+        metodo_pago = CatMetodoPago.objects.filter(codigo=options['metodo']).first()
+        if metodo_pago is None:
+            raise CommandError(f"No existe el método de pago '{options['metodo']}'.")
+
+        salida_rechazadas = None
+        if options['rechazadas']:
+            salida_rechazadas = open(options['rechazadas'], 'w', newline='', encoding='utf-8')
+            escritor = csv.writer(salida_rechazadas)
+            escritor.writerow(['linea', 'motivo', 'fecha', 'monto', 'unidad', 'referencia', 'glosa'])
+
+        def rechazada(numero, fila, motivo):
+            if salida_rechazadas:
+                escritor.writerow([
+                    numero, motivo,
+                    *(fila.get(columna, '') for columna in ('fecha', 'monto', 'unidad', 'referencia', 'glosa'))
+                ])
+            else:
+                self.stdout.write(self.style.WARNING(f"Línea {numero}: {motivo} ({fila.get('unidad', '')})"))
+
+        inicio = time.monotonic()
+        try:
+            with open(options['archivo'], newline='', encoding=options['codificacion']) as archivo:
+                resumen = importar_cartola(condominio, archivo, metodo_pago, rechazada=rechazada)
+        except OSError as e:
+            raise CommandError(f"No se pudo leer {options['archivo']}: {e}")
+        except (CartolaInvalida, UnicodeDecodeError) as e:
+            raise CommandError(f"Cartola inválida: {e}")
+        finally:
+            if salida_rechazadas:
+                salida_rechazadas.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{condominio.nombre}: {resumen['leidas']} líneas, {resumen['importadas']} pagos importados "
+            f"(${resumen['monto_importado']:,.0f}, ${resumen['monto_sin_aplicar']:,.0f} sin aplicar), "
+            f"{resumen['rechazadas']} rechazadas ({time.monotonic() - inicio:.2f}s)"
+        ))
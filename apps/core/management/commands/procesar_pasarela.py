@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.pasarela import procesar_continuamente
+
+
+class Command(BaseCommand):
+    help = (
+        "Aplicador en lote de las transacciones aprobadas recibidas por el webhook de pasarelas: "
+        "crea los Pagos y los aplica a la deuda (FIFO) por lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help="Procesa las transacciones pendientes y termina (en vez de quedar esperando)"
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=1.0,
+            help="Segundos de espera entre consultas cuando no hay transacciones"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Aplicador de pasarela iniciado. Ctrl+C para detener.")
+        try:
+            total = procesar_continuamente(
+                una_vez=options['una_vez'],
+                intervalo=options['intervalo'],
+                al_procesar=lambda cantidad: self.stdout.write(f"{cantidad} transacción(es) procesadas")
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Aplicador detenido.")
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Transacciones procesadas: {total}"))
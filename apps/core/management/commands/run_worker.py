@@ -0,0 +1,46 @@
+import signal
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.core.models import TareaCierre
+from apps.core.tareas import procesar_cola
+
+
+class Command(BaseCommand):
+    help = "Worker que ejecuta en segundo plano las tareas de cierre mensual encoladas desde la web."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help="Procesa las tareas pendientes y termina (en vez de quedar esperando)"
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2.0,
+            help="Segundos de espera entre consultas cuando no hay tareas"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Worker de cierres iniciado. Ctrl+C para detener.")
+        # SIGTERM (kill, systemd, docker stop) como salida normal: así la tarea
+        # en curso vuelve a la cola antes de terminar (ver ejecutar_tarea)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            ejecutadas = procesar_cola(
+                una_vez=options['una_vez'],
+                intervalo=options['intervalo'],
+                al_terminar=self._mostrar_resultado
+            )
+        except (KeyboardInterrupt, SystemExit):
+            self.stdout.write("Worker detenido.")
+            return
+
+        self.stdout.write(f"Tareas ejecutadas: {ejecutadas}")
+
+    def _mostrar_resultado(self, tarea):
+        duracion = (tarea.terminado_at - tarea.iniciado_at).total_seconds()
+        linea = f"[Tarea {tarea.id_tarea}] Condominio {tarea.id_condominio_id}, {tarea.periodo} ({duracion:.2f}s): {tarea.mensaje}"
+        if tarea.estado == TareaCierre.EstadoTarea.COMPLETADA:
+            self.stdout.write(self.style.SUCCESS(linea))
+        else:
+            self.stdout.write(self.style.ERROR(linea))
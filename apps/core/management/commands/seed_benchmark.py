@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.datos_sinteticos import generar_condominio, periodos_consecutivos
+from apps.core.models import Condominio
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera condominios sintéticos (grupos, unidades, gastos, cobros y pagos) "
+        "para pruebas de carga. Con la misma --semilla se obtienen los mismos datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--condominios', type=int, default=1, help="Cantidad de condominios a crear")
+        parser.add_argument('--grupos', type=int, default=2, help="Grupos (torres) por condominio")
+        parser.add_argument('--unidades', type=int, default=50, help="Unidades por grupo")
+        parser.add_argument('--periodos', type=int, default=3, help="Cantidad de periodos con gastos")
+        parser.add_argument('--desde', default='202401', help="Primer periodo, formato YYYYMM")
+        parser.add_argument('--gastos', type=int, default=10, help="Gastos por periodo")
+        parser.add_argument(
+            '--fraccion-pagos', type=float, default=0.5,
+            help="Fracción de unidades que paga cada periodo (0 a 1)"
+        )
+        parser.add_argument(
+            '--sin-cierre', action='store_true',
+            help="Solo crea estructura y gastos (sin cobros ni pagos)"
+        )
+        parser.add_argument('--semilla', type=int, default=0, help="Semilla del generador aleatorio")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['fraccion_pagos'] <= 1:
+            raise CommandError("--fraccion-pagos debe estar entre 0 y 1.")
+        if options['grupos'] < 1 or options['unidades'] < 1:
+            raise CommandError("Se necesita al menos un grupo y una unidad por grupo.")
+
+        periodos = periodos_consecutivos(options['periodos'], options['desde'])
+        nombres = [f"Condominio Benchmark {options['semilla']}-{i + 1}" for i in range(options['condominios'])]
+
+        existentes = list(Condominio.objects.filter(nombre__in=nombres).values_list('nombre', flat=True))
+        if existentes:
+            raise CommandError(
+                f"Ya existen condominios con estos datos ({', '.join(existentes)}). Usa otra --semilla."
+            )
+
+        for i, nombre in enumerate(nombres):
+            inicio = time.monotonic()
+            condominio = generar_condominio(
+                nombre=nombre,
+                grupos=options['grupos'],
+                unidades_por_grupo=options['unidades'],
+                periodos=periodos,
+                gastos_por_periodo=options['gastos'],
+                fraccion_pagos=options['fraccion_pagos'],
+                cerrar=not options['sin_cierre'],
+                semilla=options['semilla'] + i
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"[{condominio.id_condominio}] {condominio.nombre}: "
+                f"{options['grupos'] * options['unidades']} unidades, {len(periodos)} periodo(s) "
+                f"({time.monotonic() - inicio:.2f}s)"
+            ))
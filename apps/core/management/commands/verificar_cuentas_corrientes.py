@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.models import Condominio
+from apps.core.services import reconstruir_cuentas_corrientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye desde cero la cuenta corriente (deuda, periodo impago más antiguo y último pago) "
+        "de cada unidad a partir de Cobro y Pago, y reporta las filas que estaban desfasadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--condominio', type=int, action='append', dest='condominios',
+            help="ID de condominio (se puede repetir). Por defecto: todos."
+        )
+        parser.add_argument(
+            '--solo-reportar', action='store_true',
+            help="Informa las diferencias sin corregir la tabla"
+        )
+        parser.add_argument(
+            '--detalle', type=int, default=10,
+            help="Diferencias a mostrar por condominio (por defecto 10)"
+        )
+
+    def handle(self, *args, **options):
+        condominios = Condominio.objects.order_by('id_condominio')
+        if options['condominios']:
+            condominios = condominios.filter(id_condominio__in=options['condominios'])
+
+        total_diferencias = 0
+        for condominio in condominios:
+            inicio = time.monotonic()
+            with transaction.atomic():
+                diferencias = reconstruir_cuentas_corrientes(condominio, guardar=not options['solo_reportar'])
+            total_diferencias += len(diferencias)
+
+            estilo = self.style.WARNING if diferencias else self.style.SUCCESS
+            self.stdout.write(estilo(
+                f"[{condominio.id_condominio}] {condominio.nombre}: {len(diferencias)} cuenta(s) con diferencias "
+                f"({time.monotonic() - inicio:.2f}s)"
+            ))
+            for id_unidad, antes, despues in diferencias[:options['detalle']]:
+                if antes is None:
+                    self.stdout.write(f"    Unidad {id_unidad}: sin fila -> saldo ${despues['saldo']:,.0f}")
+                    continue
+                cambios = ", ".join(
+                    f"{campo}: {antes[campo]} -> {despues[campo]}"
+                    for campo in despues if antes[campo] != despues[campo]
+                )
+                self.stdout.write(f"    Unidad {id_unidad}: {cambios}")
+
+        if options['solo_reportar']:
+            self.stdout.write(f"{total_diferencias} diferencia(s) encontradas (sin corregir).")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{total_diferencias} diferencia(s) corregidas."))
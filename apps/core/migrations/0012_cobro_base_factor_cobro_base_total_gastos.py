@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_trabajador_trabajadorcontrato_remuneracion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cobro",
+            name="base_factor",
+            field=models.DecimalField(
+                blank=True,
+                db_comment="Factor de prorrateo de la unidad usado en el cálculo del cobro",
+                decimal_places=6,
+                max_digits=12,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="cobro",
+            name="base_total_gastos",
+            field=models.DecimalField(
+                blank=True,
+                db_comment="Total de gastos del periodo usado en el cálculo del cobro",
+                decimal_places=2,
+                max_digits=14,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_cobro_base_factor_cobro_base_total_gastos"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TareaCierre",
+            fields=[
+                ("id_tarea", models.AutoField(primary_key=True, serialize=False)),
+                ("periodo", models.CharField(max_length=6)),
+                (
+                    "incremental",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Re-cierre: solo se escriben las unidades cuyo monto cambió",
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("en_proceso", "En Proceso"),
+                            ("completada", "Completada"),
+                            ("error", "Error"),
+                        ],
+                        default="pendiente",
+                        max_length=20,
+                    ),
+                ),
+                ("fase", models.CharField(blank=True, max_length=40, null=True)),
+                ("unidades_total", models.PositiveIntegerField(default=0)),
+                ("unidades_procesadas", models.PositiveIntegerField(default=0)),
+                ("mensaje", models.CharField(blank=True, max_length=500, null=True)),
+                ("creado_at", models.DateTimeField(auto_now_add=True)),
+                ("iniciado_at", models.DateTimeField(blank=True, null=True)),
+                ("terminado_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "id_condominio",
+                    models.ForeignKey(
+                        db_column="id_condominio",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="core.condominio",
+                    ),
+                ),
+                (
+                    "solicitado_por",
+                    models.ForeignKey(
+                        blank=True,
+                        db_column="solicitado_por",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tarea de Cierre",
+                "verbose_name_plural": "Tareas de Cierre",
+                "db_table": "tarea_cierre",
+                "indexes": [
+                    models.Index(fields=["estado", "creado_at"], name="ix_tarea_estado")
+                ],
+            },
+        ),
+    ]
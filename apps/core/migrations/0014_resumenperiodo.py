@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_tareacierre"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumenPeriodo",
+            fields=[
+                ("id_resumen", models.AutoField(primary_key=True, serialize=False)),
+                ("periodo", models.CharField(max_length=6)),
+                (
+                    "total_gastos",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "total_cobrado",
+                    models.DecimalField(
+                        db_comment="Suma de total_cargos de los cobros mensuales del periodo",
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                    ),
+                ),
+                ("cantidad_cobros", models.PositiveIntegerField(default=0)),
+                (
+                    "total_pagado",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "saldo_pendiente",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("actualizado_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id_condominio",
+                    models.ForeignKey(
+                        db_column="id_condominio",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="core.condominio",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Resumen de Periodo",
+                "verbose_name_plural": "Resúmenes de Periodo",
+                "db_table": "resumen_periodo",
+                "unique_together": {("id_condominio", "periodo")},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_resumenperiodo"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prorrateoregla",
+            name="huella_factores",
+            field=models.CharField(
+                blank=True,
+                db_comment="Huella de regla y unidades con que se calcularon los factores (NULL = desactualizados)",
+                editable=False,
+                max_length=60,
+                null=True,
+            ),
+        ),
+    ]
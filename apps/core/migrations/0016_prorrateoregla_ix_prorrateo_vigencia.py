@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_prorrateoregla_huella_factores"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="prorrateoregla",
+            index=models.Index(
+                fields=["id_condominio", "id_concepto_cargo", "tipo", "vigente_desde"],
+                name="ix_prorrateo_vigencia",
+            ),
+        ),
+    ]
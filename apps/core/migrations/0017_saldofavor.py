@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_prorrateoregla_ix_prorrateo_vigencia"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SaldoFavor",
+            fields=[
+                ("id_saldo_favor", models.AutoField(primary_key=True, serialize=False)),
+                (
+                    "monto_original",
+                    models.DecimalField(decimal_places=2, max_digits=12),
+                ),
+                (
+                    "monto_disponible",
+                    models.DecimalField(
+                        db_comment="Lo que queda por aplicar; 0 cuando ya se consumió completo",
+                        decimal_places=2,
+                        max_digits=12,
+                    ),
+                ),
+                ("creado_at", models.DateTimeField(auto_now_add=True)),
+                ("actualizado_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id_pago",
+                    models.OneToOneField(
+                        db_column="id_pago",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="saldo_favor",
+                        to="core.pago",
+                    ),
+                ),
+                (
+                    "id_unidad",
+                    models.ForeignKey(
+                        db_column="id_unidad",
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        to="core.unidad",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Saldo a Favor",
+                "verbose_name_plural": "Saldos a Favor",
+                "db_table": "saldo_favor",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("monto_disponible__gt", 0)),
+                        fields=["id_unidad"],
+                        name="ix_saldo_favor_disponible",
+                    )
+                ],
+            },
+        ),
+    ]
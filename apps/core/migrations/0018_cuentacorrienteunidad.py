@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_saldofavor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CuentaCorrienteUnidad",
+            fields=[
+                (
+                    "id_unidad",
+                    models.OneToOneField(
+                        db_column="id_unidad",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="cuenta_corriente",
+                        serialize=False,
+                        to="core.unidad",
+                    ),
+                ),
+                (
+                    "saldo",
+                    models.DecimalField(
+                        db_comment="Suma de Cobro.saldo de la unidad (deuda total)",
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                    ),
+                ),
+                (
+                    "periodo_mas_antiguo",
+                    models.CharField(
+                        blank=True,
+                        db_comment="Periodo del cobro con saldo más antiguo (null si está al día)",
+                        max_length=6,
+                        null=True,
+                    ),
+                ),
+                ("ultimo_pago_at", models.DateTimeField(blank=True, null=True)),
+                ("actualizado_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Cuenta Corriente de Unidad",
+                "verbose_name_plural": "Cuentas Corrientes de Unidades",
+                "db_table": "cuenta_corriente_unidad",
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_cuentacorrienteunidad"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pasarelatx",
+            name="id_tx_externa",
+            field=models.CharField(
+                blank=True,
+                db_comment="ID de la transacción en la pasarela (único por pasarela)",
+                max_length=120,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="pasarelatx",
+            name="id_unidad",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="id_unidad",
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                to="core.unidad",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pasarelatx",
+            name="mensaje",
+            field=models.CharField(blank=True, max_length=300, null=True),
+        ),
+        migrations.AddField(
+            model_name="pasarelatx",
+            name="monto",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=12, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="pasarelatx",
+            name="procesado_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_comment="Cuándo se generó el Pago (o se descartó la transacción)",
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pasarelatx",
+            name="id_pago",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="id_pago",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="core.pago",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pasarelatx",
+            index=models.Index(
+                condition=models.Q(("procesado_at__isnull", True)),
+                fields=["id_estado_tx", "id_pasarela_tx"],
+                name="ix_pasarela_tx_pendiente",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="pasarelatx",
+            constraint=models.UniqueConstraint(
+                fields=("id_pasarela", "id_tx_externa"), name="uq_pasarela_tx_externa"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_pasarelatx_webhook"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SecuenciaFolio",
+            fields=[
+                (
+                    "nombre",
+                    models.CharField(max_length=40, primary_key=True, serialize=False),
+                ),
+                (
+                    "siguiente",
+                    models.BigIntegerField(
+                        db_comment="Próximo número de folio a entregar", default=1
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Secuencia de Folios",
+                "verbose_name_plural": "Secuencias de Folios",
+                "db_table": "secuencia_folio",
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_secuenciafolio"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cobro",
+            index=models.Index(
+                fields=["periodo", "id_unidad"], name="ix_cobro_periodo_unidad"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gasto",
+            index=models.Index(
+                fields=["id_condominio", "-fecha_emision", "-id_gasto"],
+                name="ix_gasto_emision",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pago",
+            index=models.Index(
+                fields=["-fecha_pago", "-id_pago"], name="ix_pago_fecha"
+            ),
+        ),
+    ]
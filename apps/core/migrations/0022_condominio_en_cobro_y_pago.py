@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_condominio(apps, schema_editor):
+    """Copia en cobros y pagos existentes el condominio de su unidad."""
+    Unidad = apps.get_model("core", "Unidad")
+    condominio = Subquery(
+        Unidad.objects.filter(pk=OuterRef("id_unidad")).values("id_grupo__id_condominio")[:1]
+    )
+    for nombre in ("Cobro", "Pago"):
+        apps.get_model("core", nombre).objects.update(id_condominio=condominio)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_indices_listados"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="cobro",
+            name="ix_cobro_periodo_unidad",
+        ),
+        migrations.RemoveIndex(
+            model_name="pago",
+            name="ix_pago_fecha",
+        ),
+        migrations.AddField(
+            model_name="cobro",
+            name="id_condominio",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="id_condominio",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="core.condominio",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pago",
+            name="id_condominio",
+            field=models.ForeignKey(
+                blank=True,
+                db_column="id_condominio",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="core.condominio",
+            ),
+        ),
+        migrations.RunPython(copiar_condominio, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="cobro",
+            index=models.Index(
+                fields=["id_condominio", "periodo", "id_unidad", "id_cobro"],
+                name="ix_cobro_condominio_periodo",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pago",
+            index=models.Index(
+                fields=["id_condominio", "-fecha_pago", "-id_pago"],
+                name="ix_pago_condominio_fecha",
+            ),
+        ),
+    ]
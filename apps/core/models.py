@@ -273,6 +273,7 @@ class Unidad(models.Model):
             return f"Unidad ID: {self.id_unidad}"
     class Meta:
         db_table = 'unidad'
+        # El índice único (id_grupo, codigo) también sirve a los listados por unidad
         unique_together = ('id_grupo', 'codigo')
         verbose_name = 'Unidad (Depto/Casa)'
         verbose_name_plural = 'Unidades (Deptos/Casas)'
@@ -524,6 +525,8 @@ class Gasto(models.Model):
         indexes = [
             # Índice para búsquedas rápidas por condominio y periodo (Dashboards)
             models.Index(fields=['id_condominio', 'periodo'], name='ix_gasto_periodo'),
+            # Listado paginado por clave: (fecha_emision, id_gasto) desc dentro del condominio
+            models.Index(fields=['id_condominio', '-fecha_emision', '-id_gasto'], name='ix_gasto_emision'),
         ]
 
 # --- FIN: Modelos de Gastos ---
@@ -580,6 +583,16 @@ class ProrrateoRegla(models.Model):
     vigente_hasta = models.DateField(null=True, blank=True)
     descripcion = models.CharField(max_length=300, null=True, blank=True)
 
+    # Versión de los factores guardados: huella de los parámetros de la regla y
+    # de las unidades con que se calcularon. Se borra (NULL) al cambiar una
+    # Unidad o Grupo del condominio, y entonces los factores se recalculan.
+    huella_factores = models.CharField(
+        max_length=60,
+        null=True, blank=True,
+        editable=False,
+        db_comment="Huella de regla y unidades con que se calcularon los factores (NULL = desactualizados)"
+    )
+
     def __str__(self):
         return f"Regla {self.tipo} - {self.criterio} ({self.vigente_desde})"
 
@@ -588,6 +601,13 @@ class ProrrateoRegla(models.Model):
         verbose_name = 'Regla de Prorrateo'
         verbose_name_plural = 'Reglas de Prorrateo'
         unique_together = ('id_condominio', 'id_concepto_cargo', 'vigente_desde', 'tipo')
+        indexes = [
+            # Búsqueda de la regla vigente: igualdad en las 3 primeras columnas y rango en la fecha
+            models.Index(
+                fields=['id_condominio', 'id_concepto_cargo', 'tipo', 'vigente_desde'],
+                name='ix_prorrateo_vigencia'
+            ),
+        ]
 
 class ProrrateoFactorUnidad(models.Model):
     """
@@ -698,6 +718,12 @@ class CargoIndividual(models.Model):
     class Meta:
         db_table = 'cargo_individual'
 
+def condominio_de_unidad(id_unidad):
+    """ID del condominio de la unidad (None si no tiene grupo)."""
+    if id_unidad is None:
+        return None
+    return Unidad.objects.filter(pk=id_unidad).values_list('id_grupo__id_condominio_id', flat=True).first()
+
 class Cobro(models.Model):
     """
     [MAPEO: Tabla 'cobro']
@@ -710,6 +736,15 @@ class Cobro(models.Model):
         on_delete=models.RESTRICT,
         db_column='id_unidad'
     )
+    # Copia del condominio de la unidad (unidad -> grupo -> condominio), para
+    # que el listado de un condominio use su propio índice. NULL si la unidad
+    # no tiene grupo. La fija save() o quien inserte en bloque.
+    id_condominio = models.ForeignKey(
+        Condominio,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        db_column='id_condominio'
+    )
     periodo = models.CharField(max_length=6)
     emitido_at = models.DateTimeField(auto_now_add=True)
 
@@ -744,9 +779,34 @@ class Cobro(models.Model):
     saldo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     observacion = models.CharField(max_length=300, null=True, blank=True)
 
+    # Datos con los que el cierre calculó 'total_cargos' (la regla queda en id_prorrateo).
+    # Permiten saber desde qué insumos se generó el cobro al re-cerrar el periodo.
+    base_total_gastos = models.DecimalField(
+        max_digits=14, decimal_places=2,
+        null=True, blank=True,
+        db_comment="Total de gastos del periodo usado en el cálculo del cobro"
+    )
+    base_factor = models.DecimalField(
+        max_digits=12, decimal_places=6,
+        null=True, blank=True,
+        db_comment="Factor de prorrateo de la unidad usado en el cálculo del cobro"
+    )
+
+    def save(self, *args, **kwargs):
+        if self.id_condominio_id is None:
+            self.id_condominio_id = condominio_de_unidad(self.id_unidad_id)
+        super().save(*args, **kwargs)
+
     class Meta:
         db_table = 'cobro'
         unique_together = ('id_unidad', 'periodo', 'tipo')
+        indexes = [
+            # Cobros de un condominio y periodo (listado paginado por unidad)
+            models.Index(
+                fields=['id_condominio', 'periodo', 'id_unidad', 'id_cobro'],
+                name='ix_cobro_condominio_periodo'
+            ),
+        ]
 
 class CobroDetalle(models.Model):
     """
@@ -793,6 +853,131 @@ class CobroDetalle(models.Model):
     class Meta:
         db_table = 'cobro_detalle'
 
+class ResumenPeriodo(models.Model):
+    """
+    [NUEVA TABLA]
+    Totales de un condominio en un periodo (gastos, cobros y pagos).
+    Se mantiene al día cada vez que cambian Gasto, Cobro o PagoAplicacion,
+    así la página de cierre y los dashboards leen una sola fila.
+    """
+    id_resumen = models.AutoField(primary_key=True)
+    id_condominio = models.ForeignKey(
+        Condominio,
+        on_delete=models.CASCADE,
+        db_column='id_condominio'
+    )
+    periodo = models.CharField(max_length=6)
+
+    total_gastos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_cobrado = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0,
+        db_comment="Suma de total_cargos de los cobros mensuales del periodo"
+    )
+    cantidad_cobros = models.PositiveIntegerField(default=0)
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    saldo_pendiente = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    actualizado_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Resumen {self.periodo} - Condominio {self.id_condominio_id}"
+
+    class Meta:
+        db_table = 'resumen_periodo'
+        unique_together = ('id_condominio', 'periodo')
+        verbose_name = 'Resumen de Periodo'
+        verbose_name_plural = 'Resúmenes de Periodo'
+
+class CuentaCorrienteUnidad(models.Model):
+    """
+    [NUEVA TABLA]
+    Estado de cuenta al día de cada unidad: deuda total, periodo impago más
+    antiguo y fecha del último pago. Se actualiza en la misma transacción que
+    el cierre, los pagos y los intereses, así consultar la deuda de una unidad
+    (o de todo un condominio) es leer una fila, sin sumar cobros.
+    'manage.py verificar_cuentas_corrientes' la reconstruye y reporta diferencias.
+    """
+    id_unidad = models.OneToOneField(
+        Unidad,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column='id_unidad',
+        related_name='cuenta_corriente'
+    )
+    saldo = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0,
+        db_comment="Suma de Cobro.saldo de la unidad (deuda total)"
+    )
+    periodo_mas_antiguo = models.CharField(
+        max_length=6, null=True, blank=True,
+        db_comment="Periodo del cobro con saldo más antiguo (null si está al día)"
+    )
+    ultimo_pago_at = models.DateTimeField(null=True, blank=True)
+    actualizado_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cuenta U.{self.id_unidad_id} - ${self.saldo}"
+
+    class Meta:
+        db_table = 'cuenta_corriente_unidad'
+        verbose_name = 'Cuenta Corriente de Unidad'
+        verbose_name_plural = 'Cuentas Corrientes de Unidades'
+
+class TareaCierre(models.Model):
+    """
+    [NUEVA TABLA]
+    Cola de cierres mensuales que se ejecutan en segundo plano
+    (proceso 'manage.py run_worker'), para no bloquear la petición web.
+    """
+    id_tarea = models.AutoField(primary_key=True)
+    id_condominio = models.ForeignKey(
+        Condominio,
+        on_delete=models.CASCADE,
+        db_column='id_condominio'
+    )
+    periodo = models.CharField(max_length=6)
+    incremental = models.BooleanField(
+        default=False,
+        help_text="Re-cierre: solo se escriben las unidades cuyo monto cambió"
+    )
+
+    class EstadoTarea(models.TextChoices):
+        PENDIENTE = 'pendiente', 'Pendiente'
+        EN_PROCESO = 'en_proceso', 'En Proceso'
+        COMPLETADA = 'completada', 'Completada'
+        ERROR = 'error', 'Error'
+
+    estado = models.CharField(
+        max_length=20,
+        choices=EstadoTarea.choices,
+        default=EstadoTarea.PENDIENTE
+    )
+    fase = models.CharField(max_length=40, null=True, blank=True)
+    unidades_total = models.PositiveIntegerField(default=0)
+    unidades_procesadas = models.PositiveIntegerField(default=0)
+    mensaje = models.CharField(max_length=500, null=True, blank=True)
+
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        db_column='solicitado_por'
+    )
+    creado_at = models.DateTimeField(auto_now_add=True)
+    iniciado_at = models.DateTimeField(null=True, blank=True)
+    terminado_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Tarea {self.id_tarea} - Cierre {self.periodo} ({self.estado})"
+
+    class Meta:
+        db_table = 'tarea_cierre'
+        verbose_name = 'Tarea de Cierre'
+        verbose_name_plural = 'Tareas de Cierre'
+        indexes = [
+            # El worker busca la tarea pendiente más antigua
+            models.Index(fields=['estado', 'creado_at'], name='ix_tarea_estado'),
+        ]
+
 # --- FIN: Modelos de Cobro ---
 
 
@@ -858,6 +1043,13 @@ class Pago(models.Model):
         on_delete=models.RESTRICT,
         db_column='id_unidad'
     )
+    # Copia del condominio de la unidad, como en Cobro.id_condominio
+    id_condominio = models.ForeignKey(
+        Condominio,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        db_column='id_condominio'
+    )
     fecha_pago = models.DateTimeField()
     periodo = models.CharField(max_length=6, null=True, blank=True)
 
@@ -883,6 +1075,11 @@ class Pago(models.Model):
     ref_externa = models.CharField(max_length=120, null=True, blank=True)
     observacion = models.CharField(max_length=300, null=True, blank=True)
 
+    def save(self, *args, **kwargs):
+        if self.id_condominio_id is None:
+            self.id_condominio_id = condominio_de_unidad(self.id_unidad_id)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Pago {self.id_pago} - U.{self.id_unidad.codigo} - ${self.monto}"
 
@@ -891,6 +1088,11 @@ class Pago(models.Model):
         indexes = [
             models.Index(fields=['id_unidad', 'periodo'], name='ix_pago_unidad_periodo'),
             models.Index(fields=['id_unidad', 'fecha_pago'], name='ix_pago_unidad_fecha'),
+            # Listado paginado por clave de un condominio: (fecha_pago, id_pago) desc
+            models.Index(
+                fields=['id_condominio', '-fecha_pago', '-id_pago'],
+                name='ix_pago_condominio_fecha'
+            ),
         ]
 
 class ComprobantePago(models.Model):
@@ -911,6 +1113,27 @@ class ComprobantePago(models.Model):
     class Meta:
         db_table = 'comprobante_pago'
 
+class SecuenciaFolio(models.Model):
+    """
+    [NUEVA TABLA]
+    Contador de folios por tipo de documento (ej: 'comprobante_pago').
+    Los folios se reservan por bloques contiguos con un UPDATE atómico
+    (ver comprobantes.reservar_folios): dos procesos nunca obtienen el mismo.
+    """
+    nombre = models.CharField(max_length=40, primary_key=True)
+    siguiente = models.BigIntegerField(
+        default=1,
+        db_comment="Próximo número de folio a entregar"
+    )
+
+    def __str__(self):
+        return f"{self.nombre}: {self.siguiente}"
+
+    class Meta:
+        db_table = 'secuencia_folio'
+        verbose_name = 'Secuencia de Folios'
+        verbose_name_plural = 'Secuencias de Folios'
+
 class PagoAplicacion(models.Model):
     """
     [MAPEO: Tabla 'pago_aplicacion']
@@ -935,15 +1158,61 @@ class PagoAplicacion(models.Model):
         db_table = 'pago_aplicacion'
         unique_together = ('id_pago', 'id_cobro')
 
+class SaldoFavor(models.Model):
+    """
+    [NUEVA TABLA]
+    Saldo a favor de una unidad: la parte de un pago que no alcanzó a
+    aplicarse porque la unidad no tenía deuda. Se consume (con PagoAplicacion
+    del mismo pago) al emitir los cobros del siguiente cierre.
+    """
+    id_saldo_favor = models.AutoField(primary_key=True)
+    id_unidad = models.ForeignKey(
+        Unidad,
+        on_delete=models.RESTRICT,
+        db_column='id_unidad'
+    )
+    id_pago = models.OneToOneField(
+        Pago,
+        on_delete=models.CASCADE,
+        db_column='id_pago',
+        related_name='saldo_favor'
+    )
+    monto_original = models.DecimalField(max_digits=12, decimal_places=2)
+    monto_disponible = models.DecimalField(
+        max_digits=12, decimal_places=2,
+        db_comment="Lo que queda por aplicar; 0 cuando ya se consumió completo"
+    )
+    creado_at = models.DateTimeField(auto_now_add=True)
+    actualizado_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Saldo a favor U.{self.id_unidad_id} - ${self.monto_disponible}"
+
+    class Meta:
+        db_table = 'saldo_favor'
+        verbose_name = 'Saldo a Favor'
+        verbose_name_plural = 'Saldos a Favor'
+        indexes = [
+            # El cierre busca solo las unidades con saldo por consumir
+            models.Index(
+                fields=['id_unidad'], name='ix_saldo_favor_disponible',
+                condition=models.Q(monto_disponible__gt=0)
+            ),
+        ]
+
 class PasarelaTx(models.Model):
     """
     [MAPEO: Tabla 'pasarela_tx']
     Detalle técnico de la transacción con pasarela de pagos.
+    Cada notificación (webhook) de la pasarela se guarda aquí tal como llegó;
+    el Pago se crea después, en lote (ver pasarela.py). 'id_pago' queda vacío
+    hasta entonces.
     """
     id_pasarela_tx = models.AutoField(primary_key=True)
     id_pago = models.ForeignKey(
         Pago,
         on_delete=models.CASCADE,
+        null=True, blank=True,
         db_column='id_pago'
     )
     id_pasarela = models.ForeignKey(
@@ -956,12 +1225,39 @@ class PasarelaTx(models.Model):
         on_delete=models.RESTRICT,
         db_column='id_estado_tx'
     )
+    id_tx_externa = models.CharField(
+        max_length=120, null=True, blank=True,
+        db_comment="ID de la transacción en la pasarela (único por pasarela)"
+    )
+    id_unidad = models.ForeignKey(
+        Unidad,
+        on_delete=models.RESTRICT,
+        null=True, blank=True,
+        db_column='id_unidad'
+    )
+    monto = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     payload_json = models.JSONField(null=True, blank=True)
+    procesado_at = models.DateTimeField(
+        null=True, blank=True,
+        db_comment="Cuándo se generó el Pago (o se descartó la transacción)"
+    )
+    mensaje = models.CharField(max_length=300, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'pasarela_tx'
+        constraints = [
+            # Las pasarelas reintentan sus notificaciones: una fila por transacción
+            models.UniqueConstraint(fields=['id_pasarela', 'id_tx_externa'], name='uq_pasarela_tx_externa'),
+        ]
+        indexes = [
+            # El aplicador en lote busca las transacciones aún sin procesar
+            models.Index(
+                fields=['id_estado_tx', 'id_pasarela_tx'], name='ix_pasarela_tx_pendiente',
+                condition=models.Q(procesado_at__isnull=True)
+            ),
+        ]
 
 # --- FIN: Modelos de Pagos ---
 
@@ -0,0 +1,171 @@
+"""
+Paginación por clave (keyset / seek) para los listados largos.
+
+En vez de OFFSET (que obliga a la base a recorrer y descartar todas las filas
+anteriores), cada página se pide "después de" o "antes de" la última fila
+vista: WHERE (fecha, id) < (fecha_cursor, id_cursor) ORDER BY fecha, id LIMIT n.
+Con un índice sobre las columnas del orden, la página 1000 cuesta lo mismo
+que la primera.
+
+El cursor es la clave de orden de la fila límite, en JSON y base64 (apto
+para la URL). Un cursor inválido o manipulado solo lleva a la primera página.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+TAMANO_PAGINA = 50
+
+
+class Pagina:
+    """
+    Filas de una página más los cursores para la siguiente y la anterior
+    (None si no hay). Se itera como la lista de filas.
+    """
+
+    def __init__(self, objetos, siguiente=None, anterior=None):
+        self.objetos = objetos
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+    @property
+    def hay_otras_paginas(self):
+        return bool(self.siguiente or self.anterior)
+
+
+def _campo(modelo, ruta):
+    """Campo del modelo para una ruta 'fk__campo'."""
+    partes = ruta.split('__')
+    for parte in partes[:-1]:
+        modelo = modelo._meta.get_field(parte).related_model
+    return modelo._meta.get_field(partes[-1])
+
+
+def _valor(objeto, ruta):
+    for parte in ruta.split('__'):
+        objeto = getattr(objeto, parte)
+        if objeto is None:
+            return None
+    return getattr(objeto, 'pk', objeto)
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    return valor.isoformat() if hasattr(valor, 'isoformat') else str(valor)
+
+
+def codificar_cursor(objeto, orden):
+    """Cursor con la clave de orden de 'objeto'."""
+    valores = [_texto(_valor(objeto, clave.lstrip('-'))) for clave in orden]
+    texto = json.dumps(valores, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, campos):
+    """Valores de la clave (ya convertidos al tipo de cada campo) o None si el cursor no es válido."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        valores = json.loads(texto)
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            return None
+        return [None if valor is None else campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        return None
+
+
+def _despues_de(orden, campos, valores, nulo_mayor, invertir=False):
+    """
+    Condición "la fila va después de la clave 'valores'" en el orden dado
+    (o antes, con invertir=True). Los NULL se ordenan como lo hace la base:
+    mayores que todo (nulo_mayor, PostgreSQL) o menores (SQLite, MySQL).
+    """
+    condicion = Q(pk__in=[])  # falso
+    iguales = Q()
+    for clave, campo, valor in zip(orden, campos, valores):
+        ruta, descendente = clave.lstrip('-'), clave.startswith('-')
+        # ¿Los NULL de esta columna quedan al final en el sentido del recorrido?
+        nulos_al_final = (nulo_mayor != descendente) != invertir
+
+        if valor is None:
+            # Si los NULL van al principio, todo valor no nulo va después
+            if not nulos_al_final:
+                condicion |= iguales & Q(**{f'{ruta}__isnull': False})
+            iguales &= Q(**{f'{ruta}__isnull': True})
+            continue
+
+        operador = 'lt' if descendente != invertir else 'gt'
+        siguiente = Q(**{f'{ruta}__{operador}': valor})
+        if campo.null and nulos_al_final:
+            siguiente |= Q(**{f'{ruta}__isnull': True})
+        condicion |= iguales & siguiente
+        iguales &= Q(**{ruta: valor})
+
+    # Cota redundante sobre la primera columna: deja que la base use el
+    # índice como rango (WHERE fecha <= x AND (...)) en vez de filtrar todo
+    ruta, primero = orden[0].lstrip('-'), valores[0]
+    if primero is not None and not campos[0].null:
+        operador = 'lte' if orden[0].startswith('-') != invertir else 'gte'
+        condicion = Q(**{f'{ruta}__{operador}': primero}) & condicion
+    return condicion
+
+
+def _ordenamiento(orden, invertir=False):
+    # Sin NULLS FIRST/LAST explícito: así el ORDER BY coincide con el de los índices
+    return [
+        clave.lstrip('-') if clave.startswith('-') == invertir else '-' + clave.lstrip('-')
+        for clave in orden
+    ]
+
+
+def paginar_por_clave(queryset, orden, parametros, tamano=TAMANO_PAGINA):
+    """
+    Página de 'queryset' según el cursor de 'parametros' (request.GET):
+    '?despues=<cursor>' o '?antes=<cursor>'; sin cursor, la primera página.
+
+    'orden' son las columnas del listado ('-' = descendente); la última debe
+    ser única (la pk) para que el orden sea total y ninguna fila se repita
+    ni se pierda entre páginas.
+    """
+    campos = [_campo(queryset.model, clave.lstrip('-')) for clave in orden]
+    nulo_mayor = connections[queryset.db].features.nulls_order_largest
+    despues = decodificar_cursor(parametros['despues'], campos) if parametros.get('despues') else None
+    antes = decodificar_cursor(parametros['antes'], campos) if parametros.get('antes') and despues is None else None
+
+    if antes is not None:
+        filas = list(
+            queryset.filter(_despues_de(orden, campos, antes, nulo_mayor, invertir=True))
+            .order_by(*_ordenamiento(orden, invertir=True))[:tamano + 1]
+        )
+        hay_mas = len(filas) > tamano
+        objetos = filas[:tamano][::-1]
+        if not objetos:
+            return Pagina([])
+        return Pagina(
+            objetos,
+            siguiente=codificar_cursor(objetos[-1], orden),
+            anterior=codificar_cursor(objetos[0], orden) if hay_mas else None
+        )
+
+    if despues is not None:
+        queryset = queryset.filter(_despues_de(orden, campos, despues, nulo_mayor))
+    filas = list(queryset.order_by(*_ordenamiento(orden))[:tamano + 1])
+    objetos = filas[:tamano]
+    return Pagina(
+        objetos,
+        siguiente=codificar_cursor(objetos[-1], orden) if len(filas) > tamano else None,
+        anterior=codificar_cursor(objetos[0], orden) if despues is not None and objetos else None
+    )
@@ -0,0 +1,210 @@
+"""
+Notificaciones (webhooks) de pasarelas de pago y su aplicación en lote.
+
+1. La vista del webhook verifica la firma, guarda la notificación en
+   PasarelaTx (una fila por transacción: el índice único
+   (id_pasarela, id_tx_externa) descarta los reintentos) y responde de
+   inmediato, sin crear el Pago.
+2. 'manage.py procesar_pasarela' toma las transacciones APROBADAS sin
+   procesar en lotes de TAMANO_LOTE: crea los Pagos en bloque (crear_pagos,
+   que asegura la PK de cada uno para enlazarlo con su PasarelaTx) y los aplica a la deuda en una pasada FIFO por lote (aplicar_pagos_fifo).
+
+Cuerpo esperado (JSON), firmado con HMAC-SHA256 en la cabecera X-Firma:
+    {"id_transaccion": "...", "estado": "APROBADA", "monto": "45000",
+     "id_unidad": 123, "fecha": "2024-03-05T10:15:00-03:00"}
+"""
+import hashlib
+import hmac
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CatEstadoTx, CatMetodoPago, CatPasarela, Pago, PasarelaTx, Unidad
+from .services import TAMANO_LOTE, aplicar_pagos_fifo, bloqueo_unidades, crear_pagos
+
+ESTADO_APROBADA = 'APROBADA'
+
+
+class NotificacionInvalida(ValueError):
+    """La notificación no se puede aceptar (firma o contenido inválido)."""
+
+
+def firmar(secreto, cuerpo):
+    """Firma HMAC-SHA256 (hex) del cuerpo crudo de la notificación."""
+    return hmac.new(secreto.encode(), cuerpo, hashlib.sha256).hexdigest()
+
+
+def pasarela_por_codigo(codigo):
+    """CatPasarela con su secreto configurado, o None si no está habilitada."""
+    if codigo not in getattr(settings, 'PASARELAS_SECRETOS', {}):
+        return None
+    return CatPasarela.objects.filter(codigo=codigo).first()
+
+
+def registrar_notificacion(pasarela, cuerpo, firma):
+    """
+    Verifica y guarda una notificación de la pasarela. Es idempotente: si la
+    transacción ya existe y no se ha procesado, solo se actualizan su estado
+    y payload. Una transacción ya APROBADA (o convertida en Pago) no se modifica.
+
+    Devuelve (PasarelaTx o None, creada).
+    """
+    esperada = firmar(settings.PASARELAS_SECRETOS[pasarela.codigo], cuerpo)
+    if not hmac.compare_digest(esperada, firma or ''):
+        raise NotificacionInvalida("Firma inválida")
+
+    try:
+        datos = json.loads(cuerpo)
+        id_tx_externa = str(datos['id_transaccion'])[:120]
+        estado, _ = CatEstadoTx.objects.get_or_create(codigo=str(datos['estado']).upper()[:30])
+    except (ValueError, KeyError, TypeError):
+        raise NotificacionInvalida("Cuerpo inválido: se espera JSON con id_transaccion y estado")
+
+    try:
+        monto = Decimal(str(datos.get('monto'))).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        monto = None
+    if monto is not None and not (monto.is_finite() and abs(monto) < 10 ** 10):
+        monto = None  # Pago.monto admite 12 dígitos con 2 decimales
+
+    # Una unidad inexistente no se rechaza (la pasarela reintentaría): la
+    # transacción se guarda sin unidad y el aplicador la descarta con su motivo
+    id_unidad = datos.get('id_unidad')
+    if not (isinstance(id_unidad, int) and Unidad.objects.filter(pk=id_unidad).exists()):
+        id_unidad = None
+
+    try:
+        with transaction.atomic():
+            tx = PasarelaTx.objects.create(
+                id_pasarela=pasarela,
+                id_tx_externa=id_tx_externa,
+                id_estado_tx=estado,
+                id_unidad_id=id_unidad,
+                monto=monto,
+                payload_json=datos
+            )
+        return tx, True
+    except IntegrityError:
+        # Reintento o cambio de estado de una transacción ya recibida
+        # Una transacción ya APROBADA no cambia (llegan notificaciones desordenadas)
+        PasarelaTx.objects.filter(
+            id_pasarela=pasarela,
+            id_tx_externa=id_tx_externa,
+            procesado_at__isnull=True
+        ).exclude(id_estado_tx=estado).exclude(id_estado_tx__codigo=ESTADO_APROBADA).update(
+            id_estado_tx=estado,
+            id_unidad_id=id_unidad,
+            monto=monto,
+            payload_json=datos,
+            updated_at=timezone.now()
+        )
+        return None, False
+
+
+def aplicar_transacciones_aprobadas(tamano_lote=TAMANO_LOTE):
+    """
+    Crea los Pagos de las transacciones APROBADAS sin procesar y los aplica a
+    la deuda, en lotes de 'tamano_lote' (una transacción de base de datos por
+    lote). Devuelve la cantidad de transacciones procesadas.
+    """
+    aprobada, _ = CatEstadoTx.objects.get_or_create(codigo=ESTADO_APROBADA)
+    procesadas = 0
+
+    pendientes = PasarelaTx.objects.filter(
+        id_estado_tx=aprobada,
+        procesado_at__isnull=True
+    ).order_by('id_pasarela_tx')
+
+    while True:
+        # El lote candidato se lee antes de abrir la transacción: los bloqueos de
+        # sus unidades se toman antes que ella (ver services.bloqueo_unidades).
+        # La unidad de una transacción APROBADA ya no cambia.
+        candidatas = list(pendientes.values_list('id_pasarela_tx', 'id_unidad_id')[:tamano_lote])
+        if not candidatas:
+            return procesadas
+
+        with bloqueo_unidades([id_unidad for _, id_unidad in candidatas if id_unidad]), transaction.atomic():
+            # skip_locked: varios aplicadores en paralelo no toman el mismo lote
+            # (en SQLite no aplica: la base completa se bloquea al escribir)
+            lote = list(pendientes.select_for_update(skip_locked=True).filter(
+                pk__in=[id_tx for id_tx, _ in candidatas]
+            ).select_related('id_pasarela'))
+            if not lote:
+                # Otro aplicador ya tomó estas transacciones
+                return procesadas
+
+            _aplicar_lote(lote)
+            procesadas += len(lote)
+
+
+def _aplicar_lote(lote):
+    ahora = timezone.now()
+    metodos = {}
+    pagos = []
+    con_pago = []
+
+    for tx in lote:
+        tx.procesado_at = ahora
+        tx.updated_at = ahora  # bulk_update no aplica auto_now
+        if tx.id_unidad_id is None:
+            tx.mensaje = "Unidad inexistente en la notificación"
+            continue
+        if tx.monto is None or tx.monto <= 0:
+            tx.mensaje = "Monto inválido en la notificación"
+            continue
+
+        codigo = tx.id_pasarela.codigo
+        if codigo not in metodos:
+            metodos[codigo], _ = CatMetodoPago.objects.get_or_create(
+                codigo=codigo, defaults={'nombre': codigo.title()}
+            )
+
+        fecha = parse_datetime(str((tx.payload_json or {}).get('fecha', ''))) or tx.created_at
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+
+        pago = Pago(
+            id_unidad_id=tx.id_unidad_id,
+            fecha_pago=fecha,
+            monto=tx.monto,
+            id_metodo_pago=metodos[codigo],
+            tipo=Pago.TipoPago.NORMAL,
+            ref_externa=tx.id_tx_externa,
+            observacion=f"Pago en línea ({codigo})"
+        )
+        pagos.append(pago)
+        con_pago.append((tx, pago))
+
+    if pagos:
+        crear_pagos(pagos)
+        aplicar_pagos_fifo(pagos)
+        for tx, pago in con_pago:
+            tx.id_pago = pago
+
+    PasarelaTx.objects.bulk_update(
+        lote, ['id_pago', 'procesado_at', 'mensaje', 'updated_at'], batch_size=TAMANO_LOTE
+    )
+
+
+def procesar_continuamente(una_vez=False, intervalo=1.0, al_procesar=None):
+    """
+    Bucle del aplicador: procesa lo pendiente y espera 'intervalo' segundos
+    cuando no hay nada. Con una_vez=True termina al vaciar la cola.
+    'al_procesar(cantidad)' se llama después de cada ronda con transacciones.
+    Devuelve el total procesado.
+    """
+    total = 0
+    while True:
+        cantidad = aplicar_transacciones_aprobadas()
+        total += cantidad
+        if cantidad and al_procesar:
+            al_procesar(cantidad)
+        if una_vez:
+            return total
+        if not cantidad:
+            time.sleep(intervalo)
@@ -0,0 +1,129 @@
+"""
+Escritor mínimo de PDF (una página A4, texto en Helvetica) y render de
+comprobantes de pago, sin dependencias externas.
+
+Este módulo no importa Django: sus funciones se ejecutan en procesos de un
+pool (ver comprobantes.py) y reciben solo datos simples (dicts, str).
+
+La salida es determinista (sin fechas de creación ni IDs aleatorios): el
+mismo comprobante genera siempre los mismos bytes, por eso el almacén puede
+direccionar cada archivo por el hash de su contenido.
+"""
+import hashlib
+import os
+import tempfile
+
+# Tamaño A4 en puntos y márgenes
+ANCHO_PAGINA, ALTO_PAGINA = 595, 842
+MARGEN = 56
+INTERLINEADO = 16
+
+
+def _texto_pdf(texto):
+    """Escapa un texto para un string literal de PDF (WinAnsi: sirve para tildes y ñ)."""
+    datos = texto.encode('cp1252', errors='replace')
+    return datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def generar_pdf(lineas, titulo=None):
+    """
+    PDF de una página con 'lineas' de texto (las que no caben se omiten).
+    'titulo' va arriba en un tamaño mayor. Devuelve los bytes del archivo.
+    """
+    contenido = [b'BT']
+    y = ALTO_PAGINA - MARGEN
+    if titulo:
+        contenido.append(b'/F2 16 Tf %d %d Td (%s) Tj' % (MARGEN, y, _texto_pdf(titulo)))
+        contenido.append(b'/F1 11 Tf 0 -%d Td' % (INTERLINEADO * 2))
+        y -= INTERLINEADO * 2
+    else:
+        contenido.append(b'/F1 11 Tf %d %d Td' % (MARGEN, y))
+
+    for linea in lineas:
+        if y < MARGEN:
+            break
+        contenido.append(b'(%s) Tj 0 -%d Td' % (_texto_pdf(linea), INTERLINEADO))
+        y -= INTERLINEADO
+    contenido.append(b'ET')
+    flujo = b'\n'.join(contenido)
+
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> >>' % (ANCHO_PAGINA, ALTO_PAGINA),
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(flujo), flujo),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+    ]
+
+    salida = bytearray(b'%PDF-1.4\n')
+    posiciones = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += b'%d 0 obj\n%s\nendobj\n' % (numero, objeto)
+
+    inicio_xref = len(salida)
+    salida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+    for posicion in posiciones:
+        salida += b'%010d 00000 n \n' % posicion
+    salida += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref)
+    return bytes(salida)
+
+
+def guardar_por_contenido(datos, directorio, extension='.pdf'):
+    """
+    Guarda 'datos' en el almacén direccionado por contenido: el nombre es el
+    SHA-256 de los bytes, repartido en subcarpetas (ab/cd/abcd....pdf).
+    Si el archivo ya existe no se vuelve a escribir.
+    Devuelve la ruta relativa al directorio.
+    """
+    huella = hashlib.sha256(datos).hexdigest()
+    relativa = os.path.join(huella[:2], huella[2:4], huella + extension)
+    destino = os.path.join(directorio, relativa)
+
+    if not os.path.exists(destino):
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # Escritura atómica: otro proceso nunca ve un archivo a medio escribir
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(datos)
+        os.replace(temporal, destino)
+    return relativa
+
+
+def _lineas_comprobante(comprobante):
+    lineas = [
+        f"Folio: {comprobante['folio']}",
+        f"Condominio: {comprobante['condominio']}",
+        f"Unidad: {comprobante['unidad']}",
+        f"Fecha de pago: {comprobante['fecha_pago']}",
+        f"Método de pago: {comprobante['metodo']}",
+        f"Monto pagado: ${comprobante['monto']}",
+    ]
+    if comprobante['referencia']:
+        lineas.append(f"Referencia: {comprobante['referencia']}")
+    lineas.append("")
+    if comprobante['aplicaciones']:
+        lineas.append("Aplicado a:")
+        lineas += [f"    Periodo {periodo}: ${monto}" for periodo, monto in comprobante['aplicaciones']]
+    if comprobante['saldo_favor']:
+        lineas.append(f"Saldo a favor: ${comprobante['saldo_favor']}")
+    return lineas
+
+
+def renderizar_comprobantes(comprobantes, directorio):
+    """
+    Tarea del pool: genera y guarda el PDF de cada comprobante (dicts con los
+    datos ya formateados). Devuelve [(id_pago, ruta relativa)].
+    """
+    return [
+        (
+            comprobante['id_pago'],
+            guardar_por_contenido(
+                generar_pdf(_lineas_comprobante(comprobante), titulo="Comprobante de Pago"),
+                directorio
+            )
+        )
+        for comprobante in comprobantes
+    ]
@@ -0,0 +1,154 @@
+"""
+Núcleo de distribución (prorrateo) de montos entre unidades.
+
+Toda la aritmética se hace en enteros (unidades menores: pesos, centavos,
+millonésimas de factor) y el redondeo usa el método del "resto mayor"
+(largest remainder): cada unidad recibe la parte entera de su cuota y las
+unidades sobrantes se asignan a las de mayor resto. Así las partes suman
+EXACTAMENTE el total, cosa que no ocurre al redondear cada unidad por separado.
+
+Si NumPy está instalado se usa para vectores grandes; si no, se usa Python puro
+(el resultado es idéntico en ambos casos).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+# Los factores se guardan con 6 decimales (ProrrateoFactorUnidad.factor)
+DECIMALES_FACTOR = 6
+ESCALA_FACTOR = 10 ** DECIMALES_FACTOR
+
+# Desde cuántas unidades conviene usar NumPy
+UMBRAL_NUMPY = 2000
+
+# Límite para que los productos quepan en int64 al usar NumPy
+_MAX_INT64 = 2 ** 63 - 1
+
+
+def a_unidades_menores(monto, decimales):
+    """Convierte un monto (Decimal, int o str) a entero en unidades menores."""
+    return int(Decimal(monto).scaleb(decimales).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _a_enteros(valores, decimales):
+    """
+    a_unidades_menores para una lista de Decimal o int.
+
+    En el caso normal (los factores se guardan con 6 decimales) cada valor
+    queda entero con una multiplicación y int() no pierde nada. Se comprueba
+    de una vez con las sumas: con valores no negativos int() solo puede
+    truncar hacia abajo, así que las sumas coinciden solo si ningún valor
+    tenía más decimales. Si no, se redondea valor por valor.
+    """
+    escala = 10 ** decimales
+    enteros = [int(valor * escala) for valor in valores]
+    if not enteros or (min(valores) >= 0 and sum(valores) * escala == sum(enteros)):
+        return enteros
+    return [int(Decimal(valor).scaleb(decimales).to_integral_value(ROUND_HALF_UP)) for valor in valores]
+
+
+def factores_a_pesos(factores):
+    """
+    Factores (hasta 6 decimales) como enteros en millonésimas, listos para
+    distribuir_monto(..., pesos=...). Sirve para guardarlos en caché junto
+    al vector de factores y no convertirlos en cada cierre.
+    """
+    return _a_enteros(factores, DECIMALES_FACTOR)
+
+
+def _a_decimales(partes, decimales):
+    """Convierte enteros en unidades menores de vuelta a Decimal."""
+    if decimales == 0:
+        return list(map(Decimal, partes))
+    return [Decimal(parte).scaleb(-decimales) for parte in partes]
+
+
+def distribuir_enteros(total, pesos, usar_numpy=None):
+    """
+    Reparte el entero 'total' en proporción a la lista de enteros 'pesos'
+    (no negativos). Devuelve una lista de enteros que suma exactamente 'total'.
+
+    Los empates en el resto se resuelven por orden de aparición, así que el
+    resultado es determinista.
+    """
+    if not pesos:
+        return []
+
+    suma_pesos = sum(pesos)
+    if suma_pesos <= 0:
+        if any(peso < 0 for peso in pesos):
+            raise ValueError("Los pesos de prorrateo no pueden ser negativos.")
+        # Sin pesos no hay base para repartir
+        return [0] * len(pesos)
+
+    if usar_numpy is None:
+        usar_numpy = np is not None and len(pesos) >= UMBRAL_NUMPY
+    if usar_numpy and np is not None and abs(total) * max(pesos) <= _MAX_INT64:
+        return _distribuir_numpy(total, pesos, suma_pesos)
+
+    if min(pesos) < 0:
+        raise ValueError("Los pesos de prorrateo no pueden ser negativos.")
+
+    productos = [total * peso for peso in pesos]
+    partes = [producto // suma_pesos for producto in productos]
+
+    faltante = total - sum(partes)
+    if faltante:
+        # Índices ordenados por resto descendente. El ordenamiento de Python es
+        # estable también con reverse=True: ante empates gana la primera posición.
+        restos = [producto % suma_pesos for producto in productos]
+        orden = sorted(range(len(pesos)), key=restos.__getitem__, reverse=True)
+        for i in orden[:faltante]:
+            partes[i] += 1
+
+    return partes
+
+
+def _distribuir_numpy(total, pesos, suma_pesos):
+    """Versión vectorizada de distribuir_enteros (mismo resultado)."""
+    vector = np.asarray(pesos, dtype=np.int64)
+    if vector.min() < 0:
+        raise ValueError("Los pesos de prorrateo no pueden ser negativos.")
+
+    productos = vector * np.int64(total)
+    partes = productos // suma_pesos
+    restos = productos % suma_pesos
+
+    faltante = int(total - int(partes.sum()))
+    if faltante:
+        # lexsort ordena por la última clave primero: resto desc, luego posición
+        orden = np.lexsort((np.arange(len(vector)), -restos))
+        partes[orden[:faltante]] += 1
+
+    return partes.tolist()
+
+
+def distribuir_monto(total, factores, decimales=0, usar_numpy=None, pesos=None):
+    """
+    Reparte el monto 'total' según 'factores' (Decimal con hasta 6 decimales).
+    Los factores no necesitan sumar 1: se usan como proporciones.
+    'pesos' son los mismos factores ya convertidos con factores_a_pesos (si
+    se tienen en caché); con ellos 'factores' no se usa.
+
+    Devuelve una lista de Decimal con 'decimales' decimales, en el mismo orden
+    que 'factores', cuya suma es exactamente 'total' redondeado a 'decimales'.
+    """
+    total_menor = a_unidades_menores(total, decimales)
+    if pesos is None:
+        pesos = factores_a_pesos(factores)
+
+    partes = distribuir_enteros(total_menor, pesos, usar_numpy=usar_numpy)
+    return _a_decimales(partes, decimales)
+
+
+def normalizar_factores(pesos, usar_numpy=None):
+    """
+    Convierte pesos arbitrarios (m2, pesos por tipo, etc.) en factores con
+    6 decimales que suman exactamente 1.
+    """
+    pesos_enteros = _a_enteros(pesos, DECIMALES_FACTOR)
+    partes = distribuir_enteros(ESCALA_FACTOR, pesos_enteros, usar_numpy=usar_numpy)
+    return _a_decimales(partes, DECIMALES_FACTOR)
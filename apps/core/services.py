@@ -1,64 +1,324 @@
+import hashlib
+import random
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date
 from decimal import Decimal
-from django.db import transaction
-from django.db.models import Sum
+from itertools import accumulate
+from django.core.cache import cache, caches
+from django.db import OperationalError, connections, transaction
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, FilteredRelation, IntegerField, Max, Min, OuterRef, Q, Subquery,
+    Sum, Value, When
+)
+from django.db.models.functions import Round
+from django.utils import timezone
 from .models import (
-    Unidad, ProrrateoRegla, ProrrateoFactorUnidad, CatConceptoCargo,
+    Condominio, Unidad, ProrrateoRegla, ProrrateoFactorUnidad, CatConceptoCargo,
     Gasto, Cobro, CobroDetalle, CargoUnidad, CatCobroEstado, Pago, PagoAplicacion, CatEstadoTx,
-    CatMetodoPago
+    CatMetodoPago, ResumenPeriodo, SaldoFavor, CuentaCorrienteUnidad
 )
+from .prorrateo import distribuir_monto, factores_a_pesos, normalizar_factores
 
-def calcular_factores_prorrateo(prorrateo_regla: ProrrateoRegla):
+# Tamaño de lote para las escrituras masivas (bulk_create / bulk_update).
+# Mantiene acotado el número de parámetros por sentencia (SQLite tiene un límite).
+TAMANO_LOTE = 500
+
+# Fases que informa generar_cierre_mensual a su callback de progreso, en orden
+FASES_CIERRE = ('calculo', 'cobros', 'cargos', 'detalles', 'saldos_favor')
+
+# Decimales de los montos cobrados.
+# En Chile se usa peso entero (0); para USD u otras monedas serían 2.
+DECIMALES_MONEDA = 0
+
+# Segundos que se guarda en caché una vista previa de cierre
+TIEMPO_CACHE_PREVIEW = 600
+
+# Segundos que se guardan en caché los indicadores del dashboard (corto: no
+# se invalidan, solo se dejan vencer)
+TIEMPO_CACHE_DASHBOARD = 60
+
+# Segundos que se guarda en caché el resumen de un periodo cerrado (la caché
+# se invalida al recalcular el resumen; el plazo es solo un respaldo)
+TIEMPO_CACHE_RESUMEN = 60 * 60 * 24
+
+# Vectores de factores [(id_unidad, factor)] ya calculados, por
+# (id_prorrateo, huella_factores). Es una caché del proceso: como la huella
+# vigente se lee desde la regla en la base de datos, un vector de una huella
+# antigua simplemente deja de usarse. Junto a cada vector se guardan sus
+# factores como enteros (prorrateo.factores_a_pesos) cuando se reparte con él.
+_vectores_factores = {}
+_pesos_factores = {}
+MAX_VECTORES_EN_CACHE = 64
+
+# Código del concepto de cargo que reparte el cierre mensual
+CONCEPTO_GASTO_COMUN = 'GASTO_COMUN'
+
+# Interés por mora: los cobros de un periodo vencen el día DIA_VENCIMIENTO del
+# mes siguiente y desde ahí devengan TASA_INTERES_MENSUAL (interés simple, mes de 30 días)
+DIA_VENCIMIENTO = 10
+TASA_INTERES_MENSUAL = Decimal('0.015')
+
+def calcular_vector_factores(prorrateo_regla: ProrrateoRegla, unidades=None):
     """
-    Calcula y guarda los factores de prorrateo para cada unidad
-    según el criterio definido en la regla.
+    Calcula (sin guardar nada) el factor de cada unidad según el criterio
+    de la regla. Devuelve una lista de tuplas (id_unidad, factor), ordenada
+    por id_unidad, lista para crear los ProrrateoFactorUnidad en bloque.
+
+    Los atributos de las unidades se traen en UNA consulta (values_list) y
+    los factores se obtienen normalizando el vector de pesos de una vez
+    (ver prorrateo.normalizar_factores), así que siempre suman exactamente 1.
+    'unidades' permite pasar filas ya leídas con _unidades_para_factores.
     """
+    if unidades is None:
+        unidades = _unidades_para_factores(prorrateo_regla)
 
-    condominio = prorrateo_regla.id_condominio
-    criterio = prorrateo_regla.criterio
+    if not unidades:
+        return []
+
+    ids, coeficientes, metros2, tipos = zip(*unidades)
+    pesos = _pesos_por_criterio(prorrateo_regla, coeficientes, metros2, tipos)
+
+    if not any(pesos):
+        raise ValueError(
+            f"No hay base para prorratear con el criterio '{prorrateo_regla.get_criterio_display()}': "
+            "todas las unidades tienen peso 0."
+        )
+
+    return list(zip(ids, normalizar_factores(pesos)))
+
+def _unidades_para_factores(prorrateo_regla):
+    """
+    Columnas de las unidades del condominio que usan los criterios de prorrateo,
+    ordenadas por id_unidad (una consulta).
+    """
+    return list(
+        Unidad.objects.filter(id_grupo__id_condominio_id=prorrateo_regla.id_condominio_id)
+        .order_by('id_unidad')
+        .values_list('id_unidad', 'coef_prop', 'metros2', 'id_unidad_tipo__codigo')
+    )
 
-    # Obtenemos todas las unidades del condominio
-    unidades = Unidad.objects.filter(id_grupo__id_condominio=condominio)
+def _huella_parametros(prorrateo_regla):
+    """Huella corta de los parámetros de la regla que influyen en los factores."""
+    pesos = [
+        f"{peso:.6f}" if peso is not None else None
+        for peso in (prorrateo_regla.peso_vivienda, prorrateo_regla.peso_bodega, prorrateo_regla.peso_estacionamiento)
+    ]
+    return hashlib.sha1(repr((str(prorrateo_regla.criterio), pesos)).encode()).hexdigest()[:12]
 
-    if not unidades.exists():
-        return 0
+def _huella_de_factores(prorrateo_regla, unidades):
+    """
+    Huella de los insumos de los factores: parámetros de la regla + filas de
+    las unidades (ver _unidades_para_factores). Formato '<parametros>-<unidades>'.
+    """
+    return f"{_huella_parametros(prorrateo_regla)}-{hashlib.sha1(repr(unidades).encode()).hexdigest()}"
+
+def _huella_vigente(prorrateo_regla):
+    """
+    True si los factores guardados de la regla siguen al día: hay huella (no
+    fue invalidada por un cambio de Unidad/Grupo) y la regla no cambió de
+    criterio ni de pesos desde que se calcularon.
+    """
+    huella = prorrateo_regla.huella_factores
+    return bool(huella) and huella.startswith(f"{_huella_parametros(prorrateo_regla)}-")
+
+def _guardar_vector_en_cache(prorrateo_regla, vector):
+    if len(_vectores_factores) >= MAX_VECTORES_EN_CACHE:
+        # Descartamos el más antiguo (los dict conservan el orden de inserción)
+        antigua = next(iter(_vectores_factores))
+        del _vectores_factores[antigua]
+        _pesos_factores.pop(antigua, None)
+    clave = (prorrateo_regla.pk, prorrateo_regla.huella_factores)
+    _vectores_factores[clave] = vector
+    _pesos_factores.pop(clave, None)
+
+def _pesos_de_factores(prorrateo_regla, factores):
+    """
+    Los factores como enteros para distribuir_monto. Si 'factores' es el
+    vector en caché de la regla, se convierten una sola vez y se guardan con
+    él: los cierres y previsualizaciones siguientes no vuelven a convertirlos.
+    """
+    clave = (prorrateo_regla.pk, prorrateo_regla.huella_factores)
+    if _vectores_factores.get(clave) is not factores:
+        return factores_a_pesos([factor for _, factor in factores])
+
+    pesos = _pesos_factores.get(clave)
+    if pesos is None:
+        pesos = _pesos_factores[clave] = factores_a_pesos([factor for _, factor in factores])
+    return pesos
+
+def obtener_factores(prorrateo_regla: ProrrateoRegla):
+    """
+    Vector [(id_unidad, factor)] de la regla, ordenado por id_unidad.
+
+    Si la huella de la regla está vigente se usa la caché del proceso (sin
+    consultas) o, si no está, los factores guardados (una consulta). Si la
+    huella no está vigente, se recalculan y guardan (calcular_factores_prorrateo).
+    Nunca devuelve factores calculados con unidades o parámetros antiguos.
+    """
+    if _huella_vigente(prorrateo_regla):
+        vector = _vectores_factores.get((prorrateo_regla.pk, prorrateo_regla.huella_factores))
+        if vector is not None:
+            return vector
 
-    factores = []
+        vector = list(
+            ProrrateoFactorUnidad.objects.filter(id_prorrateo=prorrateo_regla)
+            .order_by('id_unidad_id')  # Orden fijo: el redondeo es determinista entre re-cierres
+            .values_list('id_unidad_id', 'factor')
+        )
+        if vector:
+            _guardar_vector_en_cache(prorrateo_regla, vector)
+            return vector
+
+    calcular_factores_prorrateo(prorrateo_regla)
+    return _vectores_factores.get((prorrateo_regla.pk, prorrateo_regla.huella_factores), [])
 
-    # Limpiamos factores anteriores si existen (para evitar duplicados o inconsistencias al recalcular)
-    ProrrateoFactorUnidad.objects.filter(id_prorrateo=prorrateo_regla).delete()
+def invalidar_factores_condominio(*condominio_ids):
+    """
+    Marca como desactualizados los factores de todas las reglas de los
+    condominios indicados. Lo llaman las señales de Unidad y Grupo; quien
+    modifique unidades con operaciones masivas (bulk/update) debe llamarlo.
+    """
+    ids = {condominio_id for condominio_id in condominio_ids if condominio_id}
+    if ids:
+        ProrrateoRegla.objects.filter(id_condominio_id__in=ids, huella_factores__isnull=False).update(
+            huella_factores=None
+        )
+
+def _pesos_por_criterio(prorrateo_regla, coeficientes, metros2, tipos):
+    """
+    Peso (sin normalizar) de cada unidad según el criterio de la regla.
+    Recibe las columnas de las unidades como secuencias paralelas.
+    """
+    criterio = prorrateo_regla.criterio
+    Criterio = ProrrateoRegla.CriterioProrrateo
 
-    if criterio == ProrrateoRegla.CriterioProrrateo.COEF_PROP:
+    if criterio == Criterio.COEF_PROP:
         # Distribución según Coeficiente de Propiedad (Alícuota)
-        # Simplemente copiamos el coef_prop de la unidad al factor
-        for unidad in unidades:
-            factores.append(ProrrateoFactorUnidad(
-                id_prorrateo=prorrateo_regla,
-                id_unidad=unidad,
-                factor=unidad.coef_prop
-            ))
+        return coeficientes
+
+    if criterio == Criterio.POR_M2:
+        # Unidades sin metros2 registrados no pagan por este criterio
+        return [m2 or 0 for m2 in metros2]
+
+    if criterio in (Criterio.IGUALITARIO, Criterio.MONTO_FIJO):
+        # Partes iguales (en MONTO_FIJO lo que se reparte es 'monto_total')
+        return [1] * len(coeficientes)
+
+    if criterio == Criterio.POR_TIPO:
+        # Peso según el tipo de unidad; si la regla no define un peso, vale 1
+        pesos_clase = {
+            'vivienda': prorrateo_regla.peso_vivienda,
+            'bodega': prorrateo_regla.peso_bodega,
+            'estacionamiento': prorrateo_regla.peso_estacionamiento,
+        }
+        peso_por_tipo = {}
+        for codigo in set(tipos):
+            peso = pesos_clase[clase_tipo_unidad(codigo)]
+            peso_por_tipo[codigo] = peso if peso is not None else 1
+        return [peso_por_tipo[codigo] for codigo in tipos]
+
+    raise ValueError(f"Criterio de prorrateo no soportado: {criterio}")
+
+def clase_tipo_unidad(codigo_tipo):
+    """
+    Clase de la unidad para el criterio POR_TIPO según el código de su tipo
+    (CatUnidadTipo): 'bodega', 'estacionamiento' o 'vivienda' (por defecto).
+    """
+    codigo = (codigo_tipo or '').upper()
+    if codigo.startswith('BOD'):
+        return 'bodega'
+    if codigo.startswith('EST'):
+        return 'estacionamiento'
+    return 'vivienda'
+
+def monto_a_distribuir(prorrateo_regla, total_gastos):
+    """
+    Monto que reparte la regla: el total de gastos del periodo, salvo en
+    MONTO_FIJO con 'monto_total' definido, donde se reparte ese monto.
+    """
+    if (
+        prorrateo_regla is not None
+        and prorrateo_regla.criterio == ProrrateoRegla.CriterioProrrateo.MONTO_FIJO
+        and prorrateo_regla.monto_total is not None
+    ):
+        return prorrateo_regla.monto_total
+    return total_gastos
+
+@transaction.atomic
+def calcular_factores_prorrateo(prorrateo_regla: ProrrateoRegla):
+    """
+    Calcula y guarda los factores de prorrateo para cada unidad
+    según el criterio definido en la regla, junto con su huella
+    (ProrrateoRegla.huella_factores) y el vector en la caché del proceso.
+
+    No borra y re-inserta todo: compara en memoria el vector nuevo con los
+    factores guardados y solo inserta, actualiza o elimina las filas que
+    cambian, en lotes de TAMANO_LOTE.
+
+    Devuelve un reporte de cambios: 'total' (factores vigentes), 'creados',
+    'actualizados', 'eliminados' y 'sin_cambios'.
+    """
+    unidades = _unidades_para_factores(prorrateo_regla)
+    vector = calcular_vector_factores(prorrateo_regla, unidades)
+
+    # Factores guardados: {id_unidad: (id_factor, factor)}, una consulta
+    guardados = {
+        id_unidad: (id_factor, factor)
+        for id_factor, id_unidad, factor in ProrrateoFactorUnidad.objects.filter(
+            id_prorrateo=prorrateo_regla
+        ).values_list('id_factor', 'id_unidad_id', 'factor')
+    }
 
-    elif criterio == ProrrateoRegla.CriterioProrrateo.IGUALITARIO:
-        # Distribución Igualitaria (1 / N)
-        cantidad_unidades = unidades.count()
-        if cantidad_unidades > 0:
-            factor_igual = Decimal(1) / Decimal(cantidad_unidades)
-            # Redondeamos a 6 decimales para guardar
-            factor_igual = round(factor_igual, 6)
+    nuevos = []
+    actualizados = []
+    for id_unidad, factor in vector:
+        guardado = guardados.pop(id_unidad, None)
+        if guardado is None:
+            nuevos.append(ProrrateoFactorUnidad(id_prorrateo=prorrateo_regla, id_unidad_id=id_unidad, factor=factor))
+        elif guardado[1] != factor:
+            actualizados.append(ProrrateoFactorUnidad(id_factor=guardado[0], factor=factor))
 
-            for unidad in unidades:
-                factores.append(ProrrateoFactorUnidad(
-                    id_prorrateo=prorrateo_regla,
-                    id_unidad=unidad,
-                    factor=factor_igual
-                ))
+    # Lo que quedó en 'guardados' son unidades que ya no están en el condominio
+    eliminados = [id_factor for id_factor, _ in guardados.values()]
+    for inicio in range(0, len(eliminados), TAMANO_LOTE):
+        ProrrateoFactorUnidad.objects.filter(id_factor__in=eliminados[inicio:inicio + TAMANO_LOTE]).delete()
 
-    # TODO: Implementar otros criterios (POR_M2, POR_TIPO, MONTO_FIJO) si es necesario
-    # Por ahora el MVP probablemente usa COEF_PROP que es lo legal estándar
+    _guardar_en_lotes(ProrrateoFactorUnidad, nuevos, actualizados, ['factor'], 'factores')
 
-    # Guardamos masivamente
-    ProrrateoFactorUnidad.objects.bulk_create(factores)
+    prorrateo_regla.huella_factores = _huella_de_factores(prorrateo_regla, unidades)
+    ProrrateoRegla.objects.filter(pk=prorrateo_regla.pk).update(huella_factores=prorrateo_regla.huella_factores)
+    _guardar_vector_en_cache(prorrateo_regla, vector)
 
-    return len(factores)
+    return {
+        'total': len(vector),
+        'creados': len(nuevos),
+        'actualizados': len(actualizados),
+        'eliminados': len(eliminados),
+        'sin_cambios': len(vector) - len(nuevos) - len(actualizados),
+    }
+
+def ejecutar_con_reintentos(funcion, reintentos=5, espera_base=0.2):
+    """
+    Ejecuta funcion() y, si SQLite responde 'database is locked' (otro proceso
+    tiene el bloqueo de escritura), reintenta con backoff exponencial.
+    Devuelve (resultado, intentos). Debe llamarse fuera de una transacción.
+    """
+    intentos = 0
+    while True:
+        intentos += 1
+        try:
+            return funcion(), intentos
+        except OperationalError as e:
+            if 'database is locked' not in str(e) or intentos > reintentos:
+                raise
+            # Descartamos la conexión y esperamos antes de reintentar (con algo de azar
+            # para que los procesos no vuelvan a chocar al mismo tiempo)
+            connections.close_all()
+            time.sleep(espera_base * (2 ** (intentos - 1)) + random.uniform(0, espera_base))
 
 def crear_regla_gasto_comun_default(condominio):
     """
@@ -66,36 +326,163 @@ def crear_regla_gasto_comun_default(condominio):
     si no existe.
     """
     concepto_gc, _ = CatConceptoCargo.objects.get_or_create(
-        codigo='GASTO_COMUN',
+        codigo=CONCEPTO_GASTO_COMUN,
         defaults={'nombre': 'Gasto Común'}
     )
 
-    regla, created = ProrrateoRegla.objects.get_or_create(
+    # Con reglas por vigencia puede haber varias: si ya hay alguna, no creamos otra
+    regla = ProrrateoRegla.objects.filter(
         id_condominio=condominio,
         id_concepto_cargo=concepto_gc,
-        tipo=ProrrateoRegla.TipoProrrateo.ORDINARIO,
-        defaults={
-            'criterio': ProrrateoRegla.CriterioProrrateo.COEF_PROP,
-            'vigente_desde': '2023-01-01', # Fecha arbitraria inicial
-            'descripcion': 'Regla base de Gasto Común por Coeficiente de Propiedad'
-        }
-    )
+        tipo=ProrrateoRegla.TipoProrrateo.ORDINARIO
+    ).order_by('vigente_desde').first()
 
-    if created:
+    if regla is None:
+        regla = ProrrateoRegla.objects.create(
+            id_condominio=condominio,
+            id_concepto_cargo=concepto_gc,
+            tipo=ProrrateoRegla.TipoProrrateo.ORDINARIO,
+            criterio=ProrrateoRegla.CriterioProrrateo.COEF_PROP,
+            vigente_desde=date(2023, 1, 1), # Fecha arbitraria inicial
+            descripcion='Regla base de Gasto Común por Coeficiente de Propiedad'
+        )
         calcular_factores_prorrateo(regla)
 
     return regla
 
-@transaction.atomic
-def generar_cierre_mensual(condominio, periodo):
+def _primer_dia_periodo(periodo):
+    return date(int(periodo[:4]), int(periodo[4:]), 1)
+
+def _esta_vigente(prorrateo_regla, fecha):
+    return prorrateo_regla.vigente_desde <= fecha and (
+        prorrateo_regla.vigente_hasta is None or prorrateo_regla.vigente_hasta >= fecha
+    )
+
+def regla_vigente(condominio, periodo, concepto=CONCEPTO_GASTO_COMUN, tipo=ProrrateoRegla.TipoProrrateo.ORDINARIO):
+    """
+    Regla de prorrateo en vigor para el periodo (YYYYMM) y el concepto (código
+    de CatConceptoCargo), o None. Una regla rige un periodo si está vigente el
+    primer día del mes: una regla que empieza a mitad de mes rige desde el
+    periodo siguiente. Si hay reglas superpuestas, gana la de inicio más reciente.
+
+    Una consulta, resuelta con el índice ix_prorrateo_vigencia. Para resolver
+    muchos periodos de una vez, usar VigenciaReglas.
+    """
+    fecha = _primer_dia_periodo(periodo)
+    return ProrrateoRegla.objects.filter(
+        id_condominio=condominio,
+        id_concepto_cargo__codigo=concepto,
+        tipo=tipo,
+        vigente_desde__lte=fecha
+    ).filter(
+        Q(vigente_hasta__isnull=True) | Q(vigente_hasta__gte=fecha)
+    ).order_by('-vigente_desde').first()
+
+def _verificar_sin_reglas_gasto_comun(condominio, periodo):
+    """
+    Para un periodo sin regla vigente: si el condominio tiene reglas de Gasto
+    Común (que rigen otros periodos) es un error; solo sin ninguna regla se
+    usa la regla por defecto. Lo comparten el cierre y su vista previa.
+    """
+    if ProrrateoRegla.objects.filter(
+        id_condominio=condominio,
+        id_concepto_cargo__codigo=CONCEPTO_GASTO_COMUN,
+        tipo=ProrrateoRegla.TipoProrrateo.ORDINARIO
+    ).exists():
+        raise ValueError(f"No hay una regla de prorrateo de Gasto Común vigente para el periodo {periodo}.")
+
+class VigenciaReglas:
+    """
+    Reglas de prorrateo de un condominio cargadas en memoria (una consulta),
+    para resolver la regla vigente de muchos periodos sin consultar por cada uno.
+
+    Por cada (concepto, tipo) guarda las reglas ordenadas por vigente_desde
+    (único por concepto y tipo) y busca con bisect: la candidata es la última
+    que empezó a más tardar ese día, la misma que pone primero el orden de
+    regla_vigente(). O(log n) por periodo.
+    """
+
+    def __init__(self, reglas):
+        self._reglas = {}
+        for regla in sorted(reglas, key=lambda regla: (regla.vigente_desde, regla.id_prorrateo)):
+            clave = (regla.id_concepto_cargo.codigo, regla.tipo)
+            self._reglas.setdefault(clave, []).append(regla)
+        self._inicios = {
+            clave: [regla.vigente_desde for regla in reglas]
+            for clave, reglas in self._reglas.items()
+        }
+        # Fin de vigencia más lejano entre las primeras k+1 reglas (sin fin = date.max)
+        self._fin_maximo = {
+            clave: list(accumulate((regla.vigente_hasta or date.max for regla in reglas), max))
+            for clave, reglas in self._reglas.items()
+        }
+
+    @classmethod
+    def del_condominio(cls, condominio):
+        return cls(
+            ProrrateoRegla.objects.filter(id_condominio=condominio).select_related('id_concepto_cargo')
+        )
+
+    def regla_para(self, periodo, concepto=CONCEPTO_GASTO_COMUN, tipo=ProrrateoRegla.TipoProrrateo.ORDINARIO):
+        """Regla vigente para el periodo y concepto (o None)."""
+        clave = (concepto, tipo)
+        inicios = self._inicios.get(clave)
+        if not inicios:
+            return None
+
+        fecha = _primer_dia_periodo(periodo)
+        i = bisect_right(inicios, fecha)
+        if i == 0:
+            return None
+
+        reglas = self._reglas[clave]
+        if _esta_vigente(reglas[i - 1], fecha):
+            return reglas[i - 1]
+
+        # La última en empezar ya terminó: solo puede regir una anterior más
+        # larga (reglas superpuestas), y si ninguna llega a 'fecha' no hay regla
+        if self._fin_maximo[clave][i - 1] < fecha:
+            return None
+        for j in range(i - 2, -1, -1):
+            if _esta_vigente(reglas[j], fecha):
+                return reglas[j]
+        return None
+
+def generar_cierre_mensual(condominio, periodo, incremental=False, progreso=None, reglas=None):
     """
     Genera los cobros mensuales (Gastos Comunes) para un periodo dado.
     1. Suma todos los gastos del periodo.
     2. Obtiene la regla de prorrateo (Gasto Común) vigente.
-    3. Distribuye el total de gastos entre las unidades.
-    4. Crea los registros de Cobro y CobroDetalle.
+    3. Distribuye el total de gastos entre las unidades (en memoria).
+    4. Crea o actualiza los registros de Cobro, CargoUnidad y CobroDetalle
+       con operaciones masivas (bulk), en lotes de TAMANO_LOTE.
+    5. Consume los saldos a favor de las unidades contra los cobros emitidos
+       y deja al día la CuentaCorrienteUnidad de cada unidad.
+
+    Lo existente del periodo se lee con una consulta por tabla y se escribe
+    con operaciones masivas en lotes de TAMANO_LOTE, que el motor puede partir
+    más (SQLite admite 999 parámetros por sentencia: un bulk_create de Cobro
+    inserta 71 filas por consulta). Así las consultas crecen como
+    O(unidades / lote), no una por unidad: en SQLite, unas 34 con 100 unidades
+    y 61 con 1000 (manage.py bench_cierre).
+    Es idempotente: re-ejecutarlo actualiza los mismos registros.
+
+    Con incremental=True (re-cierre) solo se escriben las unidades cuyo monto o
+    regla cambió; el resto de los cobros, cargos y detalles no se tocan.
+
+    'progreso' es un callable opcional progreso(fase, procesadas, total) que se
+    invoca al terminar cada fase y cada lote escrito (ver FASES_CIERRE).
+
+    'reglas' es un VigenciaReglas opcional: al cerrar varios periodos seguidos
+    evita una consulta por periodo para resolver la regla vigente.
     """
+    # Los bloqueos de unidad van ANTES de la transacción (ver bloqueo_unidades):
+    # el paso 5 aplica pagos igual que registrar_pago
+    with bloqueo_unidades(unidades_del_condominio(condominio)), transaction.atomic():
+        return _generar_cierre_mensual(condominio, periodo, incremental, progreso, reglas)
 
+def _generar_cierre_mensual(condominio, periodo, incremental, progreso, reglas):
+    """Cuerpo de generar_cierre_mensual, dentro de su transacción."""
     # 1. Sumar gastos del periodo
     # TODO: Filtrar solo gastos no anulados si existiera estado
     total_gastos = Gasto.objects.filter(
@@ -108,147 +495,1172 @@ def generar_cierre_mensual(condominio, periodo):
         # O simplemente generamos cobros en 0.
         pass
 
-    # 2. Obtener regla de prorrateo vigente
-    # Asumimos una única regla ordinaria por defecto por ahora
-    # En un sistema real, buscaríamos la regla activa para la fecha del periodo
-    regla_prorrateo = ProrrateoRegla.objects.filter(
-        id_condominio=condominio,
-        tipo=ProrrateoRegla.TipoProrrateo.ORDINARIO
-    ).first()
+    # 2. Obtener la regla de prorrateo (Gasto Común ordinario) vigente en el periodo
+    if reglas is not None:
+        regla_prorrateo = reglas.regla_para(periodo)
+    else:
+        regla_prorrateo = regla_vigente(condominio, periodo)
 
     if not regla_prorrateo:
-        # Si no existe, intentamos crear la default
+        _verificar_sin_reglas_gasto_comun(condominio, periodo)
+        # Si no existe ninguna, creamos la default
         regla_prorrateo = crear_regla_gasto_comun_default(condominio)
 
-    # Aseguramos que existan factores
-    if not ProrrateoFactorUnidad.objects.filter(id_prorrateo=regla_prorrateo).exists():
-        calcular_factores_prorrateo(regla_prorrateo)
-
-    factores = ProrrateoFactorUnidad.objects.filter(id_prorrateo=regla_prorrateo)
+    # Factores al día de la regla: desde la caché del proceso si la huella
+    # sigue vigente; si una unidad cambió, se recalculan antes de usarlos
+    factores = obtener_factores(regla_prorrateo)
 
     # Estado inicial del cobro (ej: 'EMITIDO' o 'BORRADOR')
     # Vamos a asumir 'BORRADOR' o 'POR_PAGAR'.
     # Creemos el estado si no existe
     estado_pendiente, _ = CatCobroEstado.objects.get_or_create(codigo='PENDIENTE')
+    estado_pagado, _ = CatCobroEstado.objects.get_or_create(codigo='PAGADO')
 
-    cobros_generados = []
+    # 3. Calcular en memoria el monto de cada unidad
+    monto_total = monto_a_distribuir(regla_prorrateo, total_gastos)
+    montos = _calcular_montos(monto_total, factores, _pesos_de_factores(regla_prorrateo, factores))
+    factor_por_unidad = dict(factores)
 
-    # 3. Iterar por cada unidad y generar su cobro
-    for factor_obj in factores:
-        unidad = factor_obj.id_unidad
-        factor = factor_obj.factor
+    if progreso:
+        progreso('calculo', len(montos), len(montos))
 
-        # Monto a cobrar a esta unidad
-        monto_prorrateado = total_gastos * factor
-        # Redondear (en Chile se usa peso entero, en otros lados 2 decimales)
-        # Usaremos 0 decimales para pesos (CLP) o 2 para USD según configuración,
-        # por defecto del modelo es 2 decimales.
-        monto_prorrateado = round(monto_prorrateado, 0)
+    # 4a. Cobros (Cabecera): una consulta para leer los existentes del periodo
+    cobros = {
+        cobro.id_unidad_id: cobro
+        for cobro in _cobros_mensuales_del_periodo(condominio, periodo)
+    }
 
-        # Crear el Cobro (Cabecera)
-        # Usamos update_or_create para permitir re-generar el cierre (idempotencia básica)
-        cobro, created = Cobro.objects.update_or_create(
-            id_unidad=unidad,
-            periodo=periodo,
-            tipo=Cobro.TipoCobro.MENSUAL,
-            defaults={
-                'id_cobro_estado': estado_pendiente,
-                'id_prorrateo': regla_prorrateo,
-                'total_cargos': monto_prorrateado, # Por ahora solo este cargo
-                'saldo': monto_prorrateado,        # Asumiendo 0 pagos previos
-                'observacion': f"Cierre Mensual {periodo}"
-            }
+    # En modo incremental, una unidad se omite si su cobro ya tiene el mismo
+    # monto calculado con la misma regla.
+    unidades_a_escribir = [
+        id_unidad for id_unidad, monto in montos.items()
+        if not (
+            incremental
+            and id_unidad in cobros
+            and cobros[id_unidad].total_cargos == monto
+            and cobros[id_unidad].id_prorrateo_id == regla_prorrateo.id_prorrateo
         )
+    ]
 
-        # Crear el Detalle (Cargo por Gasto Común)
-        # Primero creamos el CargoUnidad (Registro histórico del cargo)
-        cargo_uni, _ = CargoUnidad.objects.update_or_create(
-            id_unidad=unidad,
-            periodo=periodo,
-            id_concepto_cargo=regla_prorrateo.id_concepto_cargo,
-            defaults={
-                'monto': monto_prorrateado,
-                'detalle': f"Gasto Común Prorrateado (Factor: {factor:.6f})"
-            }
+    cobros_nuevos = []
+    cobros_actualizados = []
+    for id_unidad in unidades_a_escribir:
+        monto = montos[id_unidad]
+        cobro = cobros.get(id_unidad)
+        if cobro is None:
+            cobro = Cobro(
+                id_unidad_id=id_unidad, id_condominio=condominio,
+                periodo=periodo, tipo=Cobro.TipoCobro.MENSUAL
+            )
+            cobros_nuevos.append(cobro)
+        else:
+            cobros_actualizados.append(cobro)
+
+        cobro.id_prorrateo = regla_prorrateo
+        cobro.total_cargos = monto  # Por ahora solo este cargo
+        cobro.observacion = f"Cierre Mensual {periodo}"
+        # Registramos con qué datos se calculó el monto
+        cobro.base_total_gastos = monto_total
+        cobro.base_factor = factor_por_unidad[id_unidad]
+
+    # Si el re-cierre bajó un cobro por debajo de lo ya pagado, el exceso
+    # vuelve a los pagos como saldo a favor (se consume en el paso 5)
+    _liberar_sobrepagos(cobros_actualizados)
+
+    for cobro in cobros_nuevos + cobros_actualizados:
+        # El saldo respeta lo que ya se haya pagado de este cobro
+        _recalcular_saldo_cobro(cobro, estado_pendiente, estado_pagado)
+
+    _guardar_en_lotes(
+        Cobro, cobros_nuevos, cobros_actualizados,
+        [
+            'id_cobro_estado', 'id_prorrateo', 'total_cargos', 'total_pagado', 'saldo', 'observacion',
+            'base_total_gastos', 'base_factor'
+        ],
+        'cobros', progreso
+    )
+
+    if cobros_nuevos:
+        # Releemos los cobros para tener los IDs de los recién creados
+        # (no todos los motores devuelven la PK en bulk_create).
+        cobros = {
+            cobro.id_unidad_id: cobro
+            for cobro in _cobros_mensuales_del_periodo(condominio, periodo)
+        }
+
+    # 4b. CargoUnidad (Registro histórico del cargo)
+    concepto_id = regla_prorrateo.id_concepto_cargo_id
+    cargos_qs = CargoUnidad.objects.filter(
+        id_unidad__id_grupo__id_condominio=condominio,
+        periodo=periodo,
+        id_concepto_cargo_id=concepto_id
+    ).order_by('id_cargo_uni')
+
+    cargos = {}
+    for cargo in cargos_qs:
+        # Si hubiera duplicados, nos quedamos con el primero (igual que antes)
+        cargos.setdefault(cargo.id_unidad_id, cargo)
+
+    if incremental:
+        # Una unidad omitida a la que le falte su cargo se vuelve a escribir completa
+        escribir = set(unidades_a_escribir)
+        unidades_a_escribir += [
+            id_unidad for id_unidad in montos
+            if id_unidad not in escribir and id_unidad not in cargos
+        ]
+
+    cargos_nuevos = []
+    cargos_actualizados = []
+    for id_unidad in unidades_a_escribir:
+        cargo = cargos.get(id_unidad)
+        if cargo is None:
+            cargo = CargoUnidad(id_unidad_id=id_unidad, periodo=periodo, id_concepto_cargo_id=concepto_id)
+            cargos_nuevos.append(cargo)
+        else:
+            cargos_actualizados.append(cargo)
+
+        cargo.monto = montos[id_unidad]
+        cargo.detalle = f"Gasto Común Prorrateado (Factor: {factor_por_unidad[id_unidad]:.6f})"
+
+    _guardar_en_lotes(CargoUnidad, cargos_nuevos, cargos_actualizados, ['monto', 'detalle'], 'cargos', progreso)
+
+    if cargos_nuevos:
+        cargos = {}
+        for cargo in cargos_qs.all():
+            cargos.setdefault(cargo.id_unidad_id, cargo)
+
+    # 4c. CobroDetalle (línea de Gasto Común dentro del cobro)
+    detalles_existentes = {
+        (detalle.id_cobro_id, detalle.id_cargo_uni_id): detalle
+        for detalle in CobroDetalle.objects.filter(
+            id_cobro__id_unidad__id_grupo__id_condominio=condominio,
+            id_cobro__periodo=periodo,
+            id_cobro__tipo=Cobro.TipoCobro.MENSUAL,
+            tipo=CobroDetalle.TipoDetalle.CARGO_COMUN
         )
+    }
+
+    detalles_nuevos = []
+    detalles_actualizados = []
+    for id_unidad in unidades_a_escribir:
+        cobro = cobros[id_unidad]
+        cargo = cargos[id_unidad]
+        detalle = detalles_existentes.get((cobro.id_cobro, cargo.id_cargo_uni))
+        if detalle is None:
+            detalle = CobroDetalle(
+                id_cobro_id=cobro.id_cobro,
+                tipo=CobroDetalle.TipoDetalle.CARGO_COMUN,
+                id_cargo_uni_id=cargo.id_cargo_uni
+            )
+            detalles_nuevos.append(detalle)
+        else:
+            detalles_actualizados.append(detalle)
+
+        detalle.monto = montos[id_unidad]
+        detalle.glosa = "Gasto Común del Periodo"
+
+    _guardar_en_lotes(CobroDetalle, detalles_nuevos, detalles_actualizados, ['monto', 'glosa'], 'detalles', progreso)
+
+    # 5. Saldos a favor de las unidades: se consumen de inmediato contra la deuda
+    # (incluidos los cobros recién emitidos)
+    cobros_con_abono = aplicar_saldos_a_favor(condominio)
+    for cobro in cobros_con_abono:
+        if cobros.get(cobro.id_unidad_id) is not None and cobros[cobro.id_unidad_id].id_cobro == cobro.id_cobro:
+            cobros[cobro.id_unidad_id] = cobro
+    if progreso:
+        progreso('saldos_favor', len(cobros_con_abono), len(cobros_con_abono))
 
-        # Luego el detalle en el cobro
-        CobroDetalle.objects.update_or_create(
-            id_cobro=cobro,
-            tipo=CobroDetalle.TipoDetalle.CARGO_COMUN,
-            id_cargo_uni=cargo_uni,
-            defaults={
-                'monto': monto_prorrateado,
-                'glosa': "Gasto Común del Periodo"
-            }
+    reconstruir_cuentas_corrientes(condominio)
+
+    # Las escrituras masivas no disparan señales: actualizamos el resumen aquí
+    actualizar_resumen_periodo(condominio.id_condominio, periodo)
+
+    return [cobros[id_unidad] for id_unidad in montos]
+
+def _guardar_en_lotes(modelo, nuevos, actualizados, campos, fase, progreso=None):
+    """
+    Inserta 'nuevos' y actualiza 'actualizados' (solo 'campos') en lotes de
+    TAMANO_LOTE, informando el avance de la fase después de cada lote.
+    """
+    total = len(nuevos) + len(actualizados)
+    procesados = 0
+
+    for inicio in range(0, len(nuevos), TAMANO_LOTE):
+        lote = nuevos[inicio:inicio + TAMANO_LOTE]
+        modelo.objects.bulk_create(lote)
+        procesados += len(lote)
+        if progreso:
+            progreso(fase, procesados, total)
+
+    for inicio in range(0, len(actualizados), TAMANO_LOTE):
+        lote = actualizados[inicio:inicio + TAMANO_LOTE]
+        modelo.objects.bulk_update(lote, campos)
+        procesados += len(lote)
+        if progreso:
+            progreso(fase, procesados, total)
+
+    if progreso and total == 0:
+        progreso(fase, 0, 0)
+
+def _calcular_montos(total_gastos, factores, pesos=None):
+    """
+    Distribuye el total entre las unidades. Recibe [(id_unidad, factor)]
+    (y opcionalmente esos factores ya como enteros, ver _pesos_de_factores)
+    y devuelve {id_unidad: monto}.
+
+    Usa el núcleo de prorrateo (aritmética entera + resto mayor), así que la
+    suma de los montos es exactamente el total de gastos.
+    """
+    partes = distribuir_monto(
+        total_gastos,
+        [factor for _, factor in factores],
+        decimales=DECIMALES_MONEDA,
+        pesos=pesos
+    )
+    return {id_unidad: monto for (id_unidad, _), monto in zip(factores, partes)}
+
+def previsualizar_cierre(condominio, periodo):
+    """
+    Calcula en memoria, SIN escribir nada, cómo quedaría el cierre del periodo:
+    monto por unidad, residuo de redondeo y diferencia contra los cobros que
+    ya existan.
+
+    El resultado se guarda en caché con una huella de los insumos (gastos,
+    regla, factores y cobros existentes), así que mientras no cambien, las
+    vistas previas repetidas solo cuestan las consultas de la huella.
+
+    Lanza ValueError, como el cierre, si el condominio tiene reglas de Gasto
+    Común pero ninguna rige el periodo.
+    """
+    total_gastos, huella_gastos = _huella_gastos(condominio, periodo)
+
+    regla_prorrateo = regla_vigente(condominio, periodo)
+    if not regla_prorrateo:
+        _verificar_sin_reglas_gasto_comun(condominio, periodo)
+
+    factores = None
+    if regla_prorrateo and _huella_vigente(regla_prorrateo):
+        # Los factores se leen (o toman de la caché) solo si hace falta
+        huella_factores = regla_prorrateo.huella_factores
+    else:
+        # Sin reglas o con factores desactualizados: los calculamos en memoria tal
+        # como lo haría el cierre (regla por defecto: Coeficiente de Propiedad),
+        # sin guardarlos.
+        regla_memoria = regla_prorrateo or ProrrateoRegla(
+            id_condominio=condominio,
+            criterio=ProrrateoRegla.CriterioProrrateo.COEF_PROP
         )
+        unidades = _unidades_para_factores(regla_memoria)
+        factores = calcular_vector_factores(regla_memoria, unidades)
+        huella_factores = _huella_de_factores(regla_memoria, unidades)
 
-        cobros_generados.append(cobro)
+    huella_cobros = _cobros_mensuales_del_periodo(condominio, periodo).aggregate(
+        cantidad=Count('id_cobro'), suma=Sum('total_cargos'), ultimo=Max('id_cobro')
+    )
 
-    return cobros_generados
+    huella = hashlib.sha1(repr((
+        huella_gastos,
+        regla_prorrateo.id_prorrateo if regla_prorrateo else None,
+        regla_prorrateo.criterio if regla_prorrateo else None,
+        regla_prorrateo.monto_total if regla_prorrateo else None,
+        huella_factores,
+        huella_cobros,
+    )).encode()).hexdigest()
+
+    clave = f"cierre_preview:{condominio.id_condominio}:{periodo}:{huella}"
+    preview = cache.get(clave)
+    if preview is not None:
+        return preview
+
+    if factores is None:
+        factores = obtener_factores(regla_prorrateo)
+
+    monto_total = monto_a_distribuir(regla_prorrateo, total_gastos)
+    montos = _calcular_montos(monto_total, factores, _pesos_de_factores(regla_prorrateo, factores))
+
+    codigos = dict(
+        Unidad.objects.filter(id_grupo__id_condominio=condominio)
+        .values_list('id_unidad', 'codigo')
+    )
+    montos_actuales = dict(
+        _cobros_mensuales_del_periodo(condominio, periodo).values_list('id_unidad_id', 'total_cargos')
+    )
+
+    filas = []
+    for id_unidad, factor in factores:
+        monto = montos[id_unidad]
+        monto_actual = montos_actuales.get(id_unidad)
+        filas.append({
+            'id_unidad': id_unidad,
+            'codigo': codigos.get(id_unidad, ''),
+            'factor': factor,
+            'monto': monto,
+            'monto_actual': monto_actual,
+            'diferencia': monto - monto_actual if monto_actual is not None else None,
+        })
+    filas.sort(key=lambda fila: fila['codigo'])
+
+    total_distribuido = sum(montos.values(), Decimal(0))
+    preview = {
+        'periodo': periodo,
+        'total_gastos': total_gastos,
+        'criterio': regla_prorrateo.get_criterio_display() if regla_prorrateo else 'Coeficiente de Propiedad',
+        'filas': filas,
+        'total_distribuido': total_distribuido,
+        # Diferencia por redondeo entre el total y lo distribuido
+        # (con el método del resto mayor debería ser siempre 0)
+        'residuo': monto_total - total_distribuido,
+        'ya_cerrado': bool(montos_actuales),
+        'cantidad_cambios': sum(1 for fila in filas if fila['diferencia'] != 0),
+    }
+
+    cache.set(clave, preview, TIEMPO_CACHE_PREVIEW)
+    return preview
+
+def _unidades_simulacion(condominio, regla=None):
+    """
+    Atributos de las unidades para el simulador: (filas, codigos), donde
+    'filas' tiene el formato de _unidades_para_factores.
+
+    Se guardan en caché con la huella de factores de 'regla' en la clave: la
+    huella está en la base de datos y se borra al cambiar una Unidad o Grupo,
+    así que ningún proceso usa filas antiguas (la caché por defecto es local
+    de cada proceso). Sin huella vigente se leen de la base sin caché. El
+    código de la unidad no es parte de la huella: como solo se muestra, un
+    cambio de código puede tardar hasta TIEMPO_CACHE_PREVIEW en verse.
+    """
+    clave = None
+    if regla is not None and _huella_vigente(regla):
+        clave = f"simulacion_unidades:{condominio.id_condominio}:{regla.huella_factores}"
+        datos = cache.get(clave)
+        if datos is not None:
+            return datos
+
+    filas = list(
+        Unidad.objects.filter(id_grupo__id_condominio=condominio)
+        .order_by('id_unidad')
+        .values_list('id_unidad', 'coef_prop', 'metros2', 'id_unidad_tipo__codigo', 'codigo')
+    )
+    datos = ([fila[:4] for fila in filas], {fila[0]: fila[4] for fila in filas})
+    if clave:
+        cache.set(clave, datos, TIEMPO_CACHE_PREVIEW)
+    return datos
+
+def simular_prorrateo(condominio, periodo, criterios=None, parametros=None):
+    """
+    Simulador "¿qué pasaría si?": calcula en memoria, SIN escribir nada, cuánto
+    pagaría cada unidad con los gastos del periodo bajo varios criterios de
+    prorrateo, y la diferencia contra el criterio de la regla vigente.
+
+    'criterios' es una lista de códigos de CriterioProrrateo (por defecto, todos).
+    'parametros' permite probar pesos o monto distintos a los de la regla
+    vigente: claves 'peso_vivienda', 'peso_bodega', 'peso_estacionamiento' y
+    'monto_total'.
+
+    Las unidades se leen de la caché (ver _unidades_simulacion); cada criterio
+    es un cálculo vectorial sobre las mismas filas.
+    """
+    Criterio = ProrrateoRegla.CriterioProrrateo
+    criterios = [criterio for criterio in (criterios or Criterio.values) if criterio in Criterio.values]
+
+    total_gastos, _ = _huella_gastos(condominio, periodo)
+    regla_actual = regla_vigente(condominio, periodo)
+    criterio_actual = regla_actual.criterio if regla_actual else Criterio.COEF_PROP
+    if criterio_actual not in criterios:
+        criterios.insert(0, criterio_actual)
+
+    unidades, codigos = _unidades_simulacion(condominio, regla_actual)
+
+    # Pesos y monto de la regla vigente, salvo los que se quieran probar
+    valores = {
+        campo: getattr(regla_actual, campo) if regla_actual else None
+        for campo in ('peso_vivienda', 'peso_bodega', 'peso_estacionamiento', 'monto_total')
+    }
+    valores.update({campo: valor for campo, valor in (parametros or {}).items() if valor is not None})
+
+    montos_por_criterio = {}
+    errores = {}
+    for criterio in criterios:
+        regla = ProrrateoRegla(id_condominio=condominio, criterio=criterio, **valores)
+        try:
+            factores = calcular_vector_factores(regla, unidades)
+        except ValueError as e:
+            errores[criterio] = str(e)
+            continue
+        montos_por_criterio[criterio] = _calcular_montos(monto_a_distribuir(regla, total_gastos), factores)
+
+    evaluados = [criterio for criterio in criterios if criterio in montos_por_criterio]
+    base = montos_por_criterio.get(criterio_actual, {})
+
+    filas = []
+    for id_unidad, *_ in unidades:
+        actual = base.get(id_unidad)
+        # Un par (monto, diferencia contra el criterio actual) por criterio evaluado
+        valores = []
+        for criterio in evaluados:
+            monto = montos_por_criterio[criterio][id_unidad]
+            valores.append((monto, monto - actual if actual is not None else None))
+        filas.append({
+            'id_unidad': id_unidad,
+            'codigo': codigos.get(id_unidad, ''),
+            'valores': valores,
+        })
+    filas.sort(key=lambda fila: fila['codigo'])
+
+    etiquetas = dict(Criterio.choices)
+    return {
+        'periodo': periodo,
+        'total_gastos': total_gastos,
+        'criterio_actual': criterio_actual,
+        'criterios': [{'codigo': criterio, 'nombre': etiquetas[criterio]} for criterio in evaluados],
+        'errores': [{'codigo': criterio, 'nombre': etiquetas[criterio], 'error': error} for criterio, error in errores.items()],
+        'totales': [sum(montos_por_criterio[criterio].values(), Decimal(0)) for criterio in evaluados],
+        'filas': filas,
+    }
+
+def _huella_gastos(condominio, periodo):
+    """
+    Total de gastos del periodo y una huella (suma, cantidad, último id)
+    que cambia si se agrega, modifica o elimina un gasto.
+    """
+    resumen = Gasto.objects.filter(
+        id_condominio=condominio,
+        periodo=periodo
+    ).aggregate(total=Sum('total'), cantidad=Count('id_gasto'), ultimo=Max('id_gasto'))
+
+    total_gastos = resumen['total'] or Decimal(0)
+    return total_gastos, (total_gastos, resumen['cantidad'], resumen['ultimo'])
+
+def _recalcular_saldo_cobro(cobro, estado_pendiente, estado_pagado):
+    """
+    Recalcula el saldo del cobro a partir de sus totales, descontando lo ya pagado,
+    y ajusta el estado. No guarda el cobro.
+    """
+    total = cobro.total_cargos - cobro.total_descuentos + cobro.total_interes
+    cobro.saldo = max(total - cobro.total_pagado, Decimal(0))
+
+    if cobro.saldo == 0 and cobro.total_pagado > 0:
+        cobro.id_cobro_estado = estado_pagado
+    else:
+        cobro.id_cobro_estado = estado_pendiente
+
+def _liberar_sobrepagos(cobros):
+    """
+    Para los cobros cuyo total quedó bajo lo ya pagado (un re-cierre que bajó
+    el monto), devuelve el exceso a los pagos que lo cubrieron como SaldoFavor.
+
+    Las aplicaciones se recortan desde la más reciente (y se eliminan si
+    quedan en 0), así cada pago sigue sumando su monto entre lo aplicado y su
+    saldo a favor. Ajusta total_pagado en memoria; no guarda los cobros.
+    """
+    excesos = {}
+    for cobro in cobros:
+        total = max(cobro.total_cargos - cobro.total_descuentos + cobro.total_interes, Decimal(0))
+        if cobro.total_pagado > total:
+            excesos[cobro.id_cobro] = [cobro, cobro.total_pagado - total]
+    if not excesos:
+        return
+
+    devuelto = {}  # id_pago -> (id_unidad, monto)
+    recortadas = []
+    eliminadas = []
+    for aplicacion in PagoAplicacion.objects.select_for_update().filter(
+        id_cobro_id__in=excesos
+    ).select_related('id_pago').order_by('-aplicado_at', '-id_pago_aplic'):
+        cobro, exceso = excesos[aplicacion.id_cobro_id]
+        monto = min(exceso, aplicacion.monto_aplicado)
+        if monto <= 0:
+            continue
+
+        excesos[aplicacion.id_cobro_id][1] -= monto
+        cobro.total_pagado -= monto
+        aplicacion.monto_aplicado -= monto
+        (eliminadas if aplicacion.monto_aplicado == 0 else recortadas).append(aplicacion)
+
+        id_unidad, previo = devuelto.get(aplicacion.id_pago_id, (aplicacion.id_pago.id_unidad_id, Decimal(0)))
+        devuelto[aplicacion.id_pago_id] = (id_unidad, previo + monto)
+
+    _guardar_en_lotes(PagoAplicacion, [], recortadas, ['monto_aplicado'], 'saldos_favor')
+    if eliminadas:
+        PagoAplicacion.objects.filter(pk__in=[aplicacion.pk for aplicacion in eliminadas]).delete()
+
+    # SaldoFavor es uno por pago: si el pago ya tenía, se le suma
+    existentes = {
+        saldo.id_pago_id: saldo
+        for saldo in SaldoFavor.objects.select_for_update().filter(id_pago_id__in=devuelto)
+    }
+    ahora = timezone.now()
+    nuevos = []
+    for id_pago, (id_unidad, monto) in devuelto.items():
+        saldo = existentes.get(id_pago)
+        if saldo is None:
+            nuevos.append(SaldoFavor(
+                id_unidad_id=id_unidad,
+                id_pago_id=id_pago,
+                monto_original=monto,
+                monto_disponible=monto
+            ))
+        else:
+            saldo.monto_original += monto
+            saldo.monto_disponible += monto
+            saldo.actualizado_at = ahora  # bulk_update no aplica auto_now
+    _guardar_en_lotes(
+        SaldoFavor, nuevos, list(existentes.values()),
+        ['monto_original', 'monto_disponible', 'actualizado_at'], 'saldos_favor'
+    )
+
+def _cobros_mensuales_del_periodo(condominio, periodo):
+    """
+    Cobros mensuales de todas las unidades del condominio para el periodo.
+    """
+    return Cobro.objects.filter(
+        id_unidad__id_grupo__id_condominio=condominio,
+        periodo=periodo,
+        tipo=Cobro.TipoCobro.MENSUAL
+    )
 
-@transaction.atomic
 def registrar_pago(unidad, monto, metodo_pago, fecha_pago, observacion=None):
     """
     Registra un pago y lo aplica a la deuda más antigua (FIFO).
+
+    Dos pagos simultáneos de la misma unidad no pueden aplicarse sobre el
+    mismo saldo: los cobros pendientes se bloquean (ver bloqueo_unidades).
     """
-    # 1. Crear el registro de Pago
-    pago = Pago.objects.create(
-        id_unidad=unidad,
-        monto=monto,
-        id_metodo_pago=metodo_pago,
-        fecha_pago=fecha_pago,
-        observacion=observacion,
-        tipo=Pago.TipoPago.NORMAL
+    with bloqueo_unidades([unidad.pk]), transaction.atomic():
+        # 1. Crear el registro de Pago.
+        # Es la primera escritura de la transacción: en SQLite toma el bloqueo de
+        # escritura de la base ANTES de leer los saldos, así otro proceso que
+        # registre un pago espera a que este termine.
+        pago = Pago.objects.create(
+            id_unidad=unidad,
+            monto=monto,
+            id_metodo_pago=metodo_pago,
+            fecha_pago=fecha_pago,
+            observacion=observacion,
+            tipo=Pago.TipoPago.NORMAL
+        )
+
+        # 2. y 3. Aplicar el pago a las deudas (FIFO).
+        # Si sobra monto, queda como SaldoFavor para los cobros del próximo cierre.
+        aplicar_pagos_fifo([pago])
+
+    return pago
+
+def crear_pagos(pagos):
+    """
+    Inserta 'pagos' en bloque y deja la PK en cada uno (la necesitan
+    aplicar_pagos_fifo y quien enlace los pagos con su origen).
+
+    Si el motor no devuelve las PK en bulk_create (MySQL, por ejemplo), los
+    pagos con referencia externa se releen por (unidad, referencia) y los
+    demás se insertan uno por uno. Debe llamarse dentro de una transacción.
+    """
+    # bulk_create no pasa por Pago.save(): el condominio se copia aquí
+    sin_condominio = {pago.id_unidad_id for pago in pagos if pago.id_condominio_id is None}
+    if sin_condominio:
+        condominios = dict(
+            Unidad.objects.filter(pk__in=sin_condominio).values_list('id_unidad', 'id_grupo__id_condominio_id')
+        )
+        for pago in pagos:
+            if pago.id_condominio_id is None:
+                pago.id_condominio_id = condominios.get(pago.id_unidad_id)
+
+    if connections['default'].features.can_return_rows_from_bulk_insert:
+        Pago.objects.bulk_create(pagos, batch_size=TAMANO_LOTE)
+        return
+
+    # Se releen por referencia las que no se repiten en el bloque; el resto, uno por uno
+    repetidas = Counter((pago.id_unidad_id, pago.ref_externa) for pago in pagos)
+    releibles = []
+    for pago in pagos:
+        if pago.ref_externa and repetidas[(pago.id_unidad_id, pago.ref_externa)] == 1:
+            releibles.append(pago)
+        else:
+            pago.save(force_insert=True)
+    if not releibles:
+        return
+
+    Pago.objects.bulk_create(releibles, batch_size=TAMANO_LOTE)
+    # Si la misma (unidad, referencia) ya existía, el recién insertado es el de mayor id
+    ids = {
+        (id_unidad, referencia): id_pago
+        for id_pago, id_unidad, referencia in Pago.objects.filter(
+            id_unidad__in={pago.id_unidad_id for pago in releibles},
+            ref_externa__in={pago.ref_externa for pago in releibles}
+        ).order_by('id_pago').values_list('id_pago', 'id_unidad', 'ref_externa')
+    }
+    for pago in releibles:
+        pago.id_pago = ids[(pago.id_unidad_id, pago.ref_externa)]
+
+def reasignar_condominio_movimientos(ids_unidades):
+    """
+    Vuelve a copiar en cobros y pagos el condominio actual de las unidades
+    (tras mover una unidad de grupo, o un grupo de condominio).
+    """
+    condominio = Subquery(
+        Unidad.objects.filter(pk=OuterRef('id_unidad')).values('id_grupo__id_condominio')[:1]
     )
+    for modelo in (Cobro, Pago):
+        modelo.objects.filter(id_unidad__in=ids_unidades).update(id_condominio=condominio)
+
+def unidades_del_condominio(condominio):
+    """IDs de las unidades del condominio (queryset perezoso, para bloqueo_unidades)."""
+    return Unidad.objects.filter(id_grupo__id_condominio=condominio).values_list('id_unidad', flat=True)
+
+# Locks por unidad (dentro del proceso) para motores sin SELECT ... FOR UPDATE
+_locks_unidades = {}
+_lock_registro = threading.Lock()
+
+@contextmanager
+def bloqueo_unidades(ids_unidades):
+    """
+    Serializa la aplicación de pagos de las unidades indicadas.
 
-    monto_disponible = monto
+    En motores con SELECT ... FOR UPDATE (PostgreSQL, MySQL) no hace nada: el
+    bloqueo de filas lo toma aplicar_pagos_fifo. En SQLite ese bloqueo no
+    existe, así que usamos un lock por unidad dentro del proceso (entre
+    procesos, SQLite serializa las escrituras de la base completa).
+    Los locks se toman en orden de id para evitar bloqueos cruzados.
+
+    Orden de bloqueos: este bloqueo se toma SIEMPRE antes de abrir la
+    transacción (with bloqueo_unidades(...), transaction.atomic(): ...).
+    Tomarlo dentro de una transacción que ya escribió invierte el orden con
+    el bloqueo de escritura de SQLite, y un pago simultáneo de otro hilo
+    termina en "database is locked".
+
+    'ids_unidades' puede ser un queryset: solo se evalúa si hacen falta los locks.
+    """
+    if connections['default'].features.has_select_for_update:
+        yield
+        return
+
+    with _lock_registro:
+        locks = [_locks_unidades.setdefault(id_unidad, threading.Lock()) for id_unidad in sorted(set(ids_unidades))]
+
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+def aplicar_pagos_fifo(pagos):
+    """
+    Aplica pagos ya guardados a los cobros con saldo de sus unidades, del más
+    antiguo al más nuevo (FIFO). Los pagos de una misma unidad se aplican en
+    el orden de la lista. Debe llamarse dentro de una transacción, abierta
+    con el bloqueo_unidades de sus unidades ya tomado.
+
+    Lo que sobra de cada pago (la unidad no tenía más deuda) queda como
+    SaldoFavor, que se consume en el siguiente cierre (ver aplicar_saldos_a_favor).
+
+    Devuelve {id_pago: monto sin aplicar}.
+    """
+    sin_aplicar, _, pendientes = _aplicar_fifo([(pago, pago.monto) for pago in pagos])
+
+    saldos = []
+    for pago in pagos:
+        sobrante = sin_aplicar[pago.id_pago]
+        if sobrante > 0:
+            saldos.append(SaldoFavor(
+                id_unidad_id=pago.id_unidad_id,
+                id_pago=pago,
+                monto_original=sobrante,
+                monto_disponible=sobrante
+            ))
+    _guardar_en_lotes(SaldoFavor, saldos, [], [], 'saldos_favor')
+
+    # Cuenta corriente: los cobros pendientes ya están en memoria, no hace falta sumar
+    ultimo_pago = {}
+    for pago in pagos:
+        if pago.id_unidad_id not in ultimo_pago or pago.fecha_pago > ultimo_pago[pago.id_unidad_id]:
+            ultimo_pago[pago.id_unidad_id] = pago.fecha_pago
+    _guardar_cuentas_corrientes({
+        id_unidad: {
+            'saldo': sum((cobro.saldo for cobro in pendientes.get(id_unidad, [])), Decimal(0)),
+            'periodo_mas_antiguo': min(
+                (cobro.periodo for cobro in pendientes.get(id_unidad, []) if cobro.saldo > 0), default=None
+            ),
+            'ultimo_pago_at': fecha,
+        }
+        for id_unidad, fecha in ultimo_pago.items()
+    }, acumular_ultimo_pago=True)
+
+    return sin_aplicar
+
+def aplicar_saldos_a_favor(condominio):
+    """
+    Consume los saldos a favor de las unidades del condominio contra sus
+    cobros con saldo (FIFO, el saldo a favor más antiguo primero). Cada monto
+    consumido queda como PagoAplicacion del pago que originó el saldo.
+    No toca CuentaCorrienteUnidad: el cierre la recalcula a continuación.
+    Quien llama debe tener el bloqueo_unidades de las unidades del condominio.
+
+    Se hace en bloque: una consulta para los saldos a favor, una para los
+    cobros y escrituras masivas. Devuelve los cobros modificados.
+    """
+    saldos = list(SaldoFavor.objects.select_for_update().filter(
+        id_unidad__id_grupo__id_condominio=condominio,
+        monto_disponible__gt=0
+    ).select_related('id_pago').order_by('id_unidad_id', 'creado_at', 'id_saldo_favor'))
+    if not saldos:
+        return []
+
+    sin_aplicar, cobros_modificados, _ = _aplicar_fifo(
+        [(saldo.id_pago, saldo.monto_disponible) for saldo in saldos],
+        acumular=True
+    )
+
+    ahora = timezone.now()
+    consumidos = []
+    for saldo in saldos:
+        if sin_aplicar[saldo.id_pago_id] != saldo.monto_disponible:
+            saldo.monto_disponible = sin_aplicar[saldo.id_pago_id]
+            saldo.actualizado_at = ahora  # bulk_update no aplica auto_now
+            consumidos.append(saldo)
+    _guardar_en_lotes(SaldoFavor, [], consumidos, ['monto_disponible', 'actualizado_at'], 'saldos_favor')
+
+    return cobros_modificados
+
+def _aplicar_fifo(abonos, acumular=False):
+    """
+    Aplica cada (pago, monto) de 'abonos' a los cobros con saldo de la unidad
+    del pago, del más antiguo al más nuevo.
+
+    Los cobros pendientes de todas las unidades se leen y bloquean en UNA
+    consulta (select_for_update donde exista); las aplicaciones se calculan
+    en memoria y se escriben con un bulk_update de Cobro y un bulk_create de
+    PagoAplicacion (en lotes de TAMANO_LOTE).
+
+    Con acumular=True un pago puede tener ya una aplicación sobre el mismo
+    cobro (saldo a favor que vuelve a aplicarse): en ese caso se suma a ella.
+
+    Devuelve ({id_pago: monto sin aplicar}, [cobros modificados],
+    {id_unidad: [cobros que tenían saldo, ya con lo aplicado]}).
+    """
+    ids_unidades = {pago.id_unidad_id for pago, _ in abonos}
+    if not ids_unidades:
+        return {}, [], {}
 
     # 2. Buscar cobros con saldo > 0, ordenados por fecha de emisión (los más antiguos primero)
     # Asumimos que 'id_cobro' autoincremental refleja el orden cronológico de creación también,
     # o usamos 'emitido_at'.
-    cobros_pendientes = Cobro.objects.filter(
-        id_unidad=unidad,
+    pendientes = {}
+    for cobro in Cobro.objects.select_for_update().filter(
+        id_unidad_id__in=ids_unidades,
         saldo__gt=0
-    ).order_by('emitido_at', 'id_cobro')
+    ).order_by('id_unidad_id', 'emitido_at', 'id_cobro'):
+        pendientes.setdefault(cobro.id_unidad_id, []).append(cobro)
 
     estado_pagado, _ = CatCobroEstado.objects.get_or_create(codigo='PAGADO')
 
-    # 3. Aplicar pago a las deudas
-    for cobro in cobros_pendientes:
-        if monto_disponible <= 0:
-            break
-
-        saldo_cobro = cobro.saldo
+    # 3. Aplicar los pagos a las deudas, en memoria
+    cobros_modificados = {}
+    aplicaciones = {}
+    sin_aplicar = {}
+    for pago, monto_disponible in abonos:
+        for cobro in pendientes.get(pago.id_unidad_id, []):
+            if monto_disponible <= 0:
+                break
+            if cobro.saldo <= 0:
+                continue  # Ya lo cubrió un pago anterior de la lista
 
-        if monto_disponible >= saldo_cobro:
-            # Pagamos el cobro completo
-            monto_a_aplicar = saldo_cobro
-            monto_disponible -= saldo_cobro
+            # Pago completo del cobro o parcial (el estado sigue pendiente)
+            monto_a_aplicar = min(monto_disponible, cobro.saldo)
+            monto_disponible -= monto_a_aplicar
 
-            cobro.saldo = 0
+            cobro.saldo -= monto_a_aplicar
             cobro.total_pagado += monto_a_aplicar
-            cobro.id_cobro_estado = estado_pagado
-            cobro.save()
+            if cobro.saldo == 0:
+                cobro.id_cobro_estado = estado_pagado
+            cobros_modificados[cobro.id_cobro] = cobro
+
+            # Registro de aplicación
+            aplicaciones[(pago.id_pago, cobro.id_cobro)] = PagoAplicacion(
+                id_pago=pago,
+                id_cobro=cobro,
+                monto_aplicado=monto_a_aplicar
+            )
+
+        sin_aplicar[pago.id_pago] = monto_disponible
+
+    aplicaciones_sumadas = []
+    if acumular and aplicaciones:
+        for existente in PagoAplicacion.objects.filter(
+            id_pago_id__in={id_pago for id_pago, _ in aplicaciones},
+            id_cobro_id__in={id_cobro for _, id_cobro in aplicaciones}
+        ):
+            nueva = aplicaciones.pop((existente.id_pago_id, existente.id_cobro_id), None)
+            if nueva is not None:
+                existente.monto_aplicado += nueva.monto_aplicado
+                aplicaciones_sumadas.append(existente)
+
+    _guardar_en_lotes(
+        Cobro, [], list(cobros_modificados.values()), ['saldo', 'total_pagado', 'id_cobro_estado'], 'cobros'
+    )
+    _guardar_en_lotes(
+        PagoAplicacion, list(aplicaciones.values()), aplicaciones_sumadas, ['monto_aplicado'], 'aplicaciones'
+    )
+
+    # Las escrituras masivas no disparan señales: actualizamos el resumen aquí
+    if cobros_modificados:
+        condominio_por_unidad = dict(
+            Unidad.objects.filter(pk__in=ids_unidades).values_list('id_unidad', 'id_grupo__id_condominio_id')
+        )
+        periodos = {
+            (condominio_por_unidad.get(cobro.id_unidad_id), cobro.periodo)
+            for cobro in cobros_modificados.values()
+        }
+        for condominio_id, periodo in sorted(periodos, key=str):
+            if condominio_id:
+                actualizar_resumen_periodo(condominio_id, periodo, gastos=False)
+
+    return sin_aplicar, list(cobros_modificados.values()), pendientes
+
+def actualizar_resumen_periodo(condominio_id, periodo, gastos=True, cobros=True):
+    """
+    Recalcula la fila de ResumenPeriodo de UN condominio y periodo.
+    Con gastos=False o cobros=False solo se recalcula la otra parte
+    (por ejemplo, al guardar un Gasto no hace falta re-sumar los cobros).
+    Devuelve el resumen actualizado.
+
+    Todos los cambios que afectan el resumen (cierre, pagos, gastos) pasan por
+    aquí, así que aquí también se invalida el resumen en caché.
+    """
+    resumen, _ = ResumenPeriodo.objects.update_or_create(
+        id_condominio_id=condominio_id,
+        periodo=periodo,
+        defaults=_calcular_resumen(condominio_id, periodo, gastos, cobros)
+    )
+    # Al confirmar la transacción: antes, otra petición aún leería (y volvería
+    # a guardar en caché) la fila anterior
+    clave = _clave_resumen(condominio_id, periodo)
+    transaction.on_commit(lambda: caches['resumenes'].delete(clave))
+    return resumen
+
+def _clave_resumen(condominio_id, periodo):
+    return f"resumen_periodo:{condominio_id}:{periodo}"
+
+def obtener_resumen_periodo(condominio, periodo):
+    """
+    Devuelve el ResumenPeriodo del condominio y periodo (una sola fila).
+    Si todavía no existe (datos anteriores a esta tabla), lo calcula; solo
+    lo guarda si el periodo tiene movimientos, para no llenar la tabla de ceros.
+
+    El resumen de un periodo ya cerrado (con cobros) se guarda en caché: las
+    visitas repetidas al cierre a fin de mes no consultan la base.
+    """
+    clave = _clave_resumen(condominio.id_condominio, periodo)
+    resumen = caches['resumenes'].get(clave)
+    if resumen is not None:
+        return resumen
+
+    resumen = ResumenPeriodo.objects.filter(id_condominio=condominio, periodo=periodo).first()
+    if resumen is None:
+        valores = _calcular_resumen(condominio.id_condominio, periodo)
+        if valores['total_gastos'] or valores['cantidad_cobros']:
+            resumen = actualizar_resumen_periodo(condominio.id_condominio, periodo)
         else:
-            # Pago parcial del cobro
-            monto_a_aplicar = monto_disponible
-            monto_disponible = 0
+            resumen = ResumenPeriodo(id_condominio=condominio, periodo=periodo, **valores)
 
-            cobro.saldo -= monto_a_aplicar
-            cobro.total_pagado += monto_a_aplicar
-            # Estado sigue siendo pendiente/parcial, no cambiamos a PAGADO
-            cobro.save()
-
-        # Crear registro de aplicación
-        PagoAplicacion.objects.create(
-            id_pago=pago,
-            id_cobro=cobro,
-            monto_aplicado=monto_a_aplicar
+    if resumen.cantidad_cobros:
+        caches['resumenes'].set(clave, resumen, TIEMPO_CACHE_RESUMEN)
+    return resumen
+
+def _calcular_resumen(condominio_id, periodo, gastos=True, cobros=True):
+    """
+    Agregados de gastos y/o cobros mensuales del periodo, listos para ResumenPeriodo.
+
+    Una sola consulta sobre la fila del condominio: el total de gastos es una
+    subconsulta y los cobros del periodo se unen con un LEFT JOIN filtrado
+    (FilteredRelation), así un periodo sin cobros igual devuelve su fila.
+    """
+    consulta = Condominio.objects.filter(pk=condominio_id)
+    agregados = {}
+
+    if gastos:
+        agregados['total_gastos'] = Subquery(
+            Gasto.objects.filter(
+                id_condominio=OuterRef('pk'),
+                periodo=periodo
+            ).order_by().values('id_condominio').annotate(total=Sum('total')).values('total')
         )
 
-    # Si queda saldo a favor (monto_disponible > 0), queda como abono en el pago (no aplicado).
-    # En un sistema real, se generaría un 'Saldo a Favor' para futuros cobros.
-    # Aquí simplemente queda registrado el pago con monto mayor a lo aplicado.
+    if cobros:
+        consulta = consulta.annotate(cobros_periodo=FilteredRelation(
+            'grupo__unidad__cobro',
+            condition=Q(
+                grupo__unidad__cobro__periodo=periodo,
+                grupo__unidad__cobro__tipo=Cobro.TipoCobro.MENSUAL
+            )
+        ))
+        agregados.update(
+            total_cobrado=Sum('cobros_periodo__total_cargos'),
+            cantidad_cobros=Count('cobros_periodo'),
+            total_pagado=Sum('cobros_periodo__total_pagado'),
+            saldo_pendiente=Sum('cobros_periodo__saldo')
+        )
 
-    return pago
+    totales = consulta.values('pk').annotate(**agregados).first() or {}
+    return {
+        campo: totales.get(campo) if totales.get(campo) is not None else Decimal(0)
+        for campo in agregados
+    }
+
+def fecha_vencimiento(periodo):
+    """Fecha de vencimiento de los cobros del periodo (YYYYMM)."""
+    anio, mes = int(periodo[:4]), int(periodo[4:])
+    anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return date(anio, mes, DIA_VENCIMIENTO)
+
+def _ultimo_periodo_vencido(fecha_corte):
+    """Último periodo (YYYYMM) cuyos cobros ya están vencidos a la fecha de corte."""
+    anio, mes = fecha_corte.year, fecha_corte.month
+    # A la fecha de corte ya venció el periodo del mes anterior (si pasó el día
+    # de vencimiento) o el de dos meses atrás
+    retroceso = 1 if fecha_corte.day > DIA_VENCIMIENTO else 2
+    mes -= retroceso
+    if mes < 1:
+        anio, mes = anio - 1, mes + 12
+    return f"{anio:04d}{mes:02d}"
+
+@transaction.atomic
+def calcular_intereses_mora(condominio, fecha_corte, tasa_mensual=TASA_INTERES_MENSUAL):
+    """
+    Devenga el interés por mora de todos los cobros vencidos con saldo del
+    condominio a la fecha de corte.
+
+    Interés = capital impago x tasa_mensual x días de atraso / 30, donde el
+    capital impago es cargos - descuentos - pagado (sin contar intereses).
+    Cada cobro queda con UNA línea INTERES_MORA con el interés acumulado, y
+    total_interes / saldo se actualizan en la cabecera.
+
+    El cálculo se hace en la base de datos, en una sola pasada: un UPDATE para
+    todas las cabeceras (los días de atraso dependen solo del periodo), uno
+    para las líneas existentes y un bulk_create para las que faltan. La
+    cantidad de consultas no depende del número de cobros.
+
+    Es seguro re-ejecutarlo para la misma fecha: el interés es el acumulado a
+    esa fecha (no se suma otra vez) y solo se escriben los cobros que cambian.
+    El interés ya devengado nunca se rebaja (un pago posterior no reversa
+    intereses pasados).
+
+    Devuelve un diccionario con 'vencidos', 'actualizados' y 'total_interes'.
+    """
+    vencidos = Cobro.objects.filter(
+        id_unidad__id_grupo__id_condominio=condominio,
+        saldo__gt=0,
+        periodo__lte=_ultimo_periodo_vencido(fecha_corte)
+    )
+
+    periodos = sorted(set(vencidos.values_list('periodo', flat=True)))
+    if not periodos:
+        return {'vencidos': 0, 'actualizados': 0, 'total_interes': Decimal(0)}
+
+    estado_pendiente, _ = CatCobroEstado.objects.get_or_create(codigo='PENDIENTE')
+
+    # Días de atraso de cada periodo, como expresión SQL (CASE periodo WHEN ...)
+    dias_atraso = Case(
+        *[
+            When(periodo=periodo, then=Value((fecha_corte - fecha_vencimiento(periodo)).days))
+            for periodo in periodos
+        ],
+        output_field=IntegerField()
+    )
+    capital = F('total_cargos') - F('total_descuentos') - F('total_pagado')
+    interes = Round(
+        ExpressionWrapper(capital * Value(tasa_mensual) * dias_atraso / Value(30), output_field=DecimalField()),
+        DECIMALES_MONEDA
+    )
+
+    # 1. Cabeceras: solo las que tienen capital impago y cuyo interés sube
+    actualizados = vencidos.alias(capital=capital, interes=interes).filter(
+        capital__gt=0,
+        interes__gt=F('total_interes')
+    ).update(
+        total_interes=interes,
+        # Con capital impago el saldo sigue siendo positivo: cobro pendiente
+        saldo=capital + interes,
+        id_cobro_estado=estado_pendiente
+    )
+
+    glosa = f"Interés por mora al {fecha_corte:%d-%m-%Y}"
+    lineas_interes = CobroDetalle.objects.filter(
+        id_cobro__in=vencidos,
+        tipo=CobroDetalle.TipoDetalle.INTERES_MORA
+    )
+
+    # 2. Líneas INTERES_MORA existentes que quedaron desfasadas de su cabecera
+    lineas_interes.exclude(monto=F('id_cobro__total_interes')).update(
+        monto=Subquery(Cobro.objects.filter(pk=OuterRef('id_cobro')).values('total_interes')[:1]),
+        glosa=glosa
+    )
+
+    # 3. Líneas que faltan (primer devengo del cobro)
+    sin_linea = vencidos.filter(total_interes__gt=0).exclude(
+        id_cobro__in=lineas_interes.values('id_cobro')
+    ).values_list('id_cobro', 'total_interes')
+    CobroDetalle.objects.bulk_create(
+        [
+            CobroDetalle(
+                id_cobro_id=id_cobro, tipo=CobroDetalle.TipoDetalle.INTERES_MORA,
+                monto=monto, glosa=glosa
+            )
+            for id_cobro, monto in sin_linea.iterator()
+        ],
+        batch_size=TAMANO_LOTE
+    )
+
+    # Las escrituras masivas no disparan señales: actualizamos el resumen aquí
+    if actualizados:
+        for periodo in periodos:
+            actualizar_resumen_periodo(condominio.id_condominio, periodo, gastos=False)
+        reconstruir_cuentas_corrientes(condominio)
+
+    resumen = vencidos.aggregate(cantidad=Count('id_cobro'), total_interes=Sum('total_interes'))
+    return {
+        'vencidos': resumen['cantidad'],
+        'actualizados': actualizados,
+        'total_interes': resumen['total_interes'] or Decimal(0),
+    }
+
+def estado_cuentas_corrientes(condominio=None):
+    """
+    Calcula desde cero, con consultas agrupadas, el estado de cuenta de las
+    unidades (de un condominio o de todos):
+    {id_unidad: {'saldo', 'periodo_mas_antiguo', 'ultimo_pago_at'}}.
+    """
+    unidades = Unidad.objects.all()
+    if condominio is not None:
+        unidades = unidades.filter(id_grupo__id_condominio=condominio)
+
+    estado = {
+        id_unidad: {'saldo': Decimal(0), 'periodo_mas_antiguo': None, 'ultimo_pago_at': None}
+        for id_unidad in unidades.values_list('id_unidad', flat=True)
+    }
+
+    deudas = Cobro.objects.filter(id_unidad__in=unidades, saldo__gt=0).values('id_unidad').annotate(
+        total=Sum('saldo'), periodo=Min('periodo')
+    ).values_list('id_unidad', 'total', 'periodo')
+    for id_unidad, total, periodo in deudas:
+        estado[id_unidad]['saldo'] = total
+        estado[id_unidad]['periodo_mas_antiguo'] = periodo
+
+    ultimos_pagos = Pago.objects.filter(id_unidad__in=unidades).values('id_unidad').annotate(
+        ultimo=Max('fecha_pago')
+    ).values_list('id_unidad', 'ultimo')
+    for id_unidad, ultimo in ultimos_pagos:
+        estado[id_unidad]['ultimo_pago_at'] = ultimo
+
+    return estado
+
+def reconstruir_cuentas_corrientes(condominio=None, guardar=True):
+    """
+    Recalcula desde cero la CuentaCorrienteUnidad de las unidades (de un
+    condominio o de todos) y escribe solo las filas que cambian.
+    Con guardar=False no escribe nada (solo reporta).
+
+    Devuelve las diferencias encontradas: [(id_unidad, antes, después)],
+    donde 'antes' es None si la unidad no tenía fila.
+    """
+    return _guardar_cuentas_corrientes(estado_cuentas_corrientes(condominio), guardar=guardar)
+
+def _guardar_cuentas_corrientes(estado, acumular_ultimo_pago=False, guardar=True):
+    """
+    Escribe el 'estado' ({id_unidad: campos}) en CuentaCorrienteUnidad con
+    escrituras masivas, solo para las filas que cambian.
+
+    Con acumular_ultimo_pago=True 'ultimo_pago_at' solo avanza: se conserva la
+    fecha guardada si es posterior (un pago con fecha atrasada no la retrocede).
+    Si la unidad todavía no tiene fila, la fecha se busca en sus pagos.
+    """
+    if not estado:
+        return []
+
+    campos = ('saldo', 'periodo_mas_antiguo', 'ultimo_pago_at')
+    existentes = {
+        cuenta.id_unidad_id: cuenta
+        for cuenta in CuentaCorrienteUnidad.objects.filter(pk__in=list(estado))
+    }
+
+    if acumular_ultimo_pago:
+        sin_fila = [id_unidad for id_unidad in estado if id_unidad not in existentes]
+        anteriores = dict(Pago.objects.filter(id_unidad__in=sin_fila).values('id_unidad').annotate(
+            ultimo=Max('fecha_pago')
+        ).values_list('id_unidad', 'ultimo')) if sin_fila else {}
+
+        for id_unidad, valores in estado.items():
+            cuenta = existentes.get(id_unidad)
+            anterior = cuenta.ultimo_pago_at if cuenta else anteriores.get(id_unidad)
+            if anterior and (valores['ultimo_pago_at'] is None or anterior > valores['ultimo_pago_at']):
+                valores['ultimo_pago_at'] = anterior
+
+    ahora = timezone.now()
+    nuevas = []
+    cambiadas = []
+    diferencias = []
+    for id_unidad, valores in estado.items():
+        cuenta = existentes.get(id_unidad)
+        if cuenta is None:
+            nuevas.append(CuentaCorrienteUnidad(id_unidad_id=id_unidad, **valores))
+            diferencias.append((id_unidad, None, valores))
+            continue
+
+        antes = {campo: getattr(cuenta, campo) for campo in campos}
+        if antes == valores:
+            continue
+        for campo, valor in valores.items():
+            setattr(cuenta, campo, valor)
+        cuenta.actualizado_at = ahora  # bulk_update no aplica auto_now
+        cambiadas.append(cuenta)
+        diferencias.append((id_unidad, antes, valores))
+
+    if guardar:
+        _guardar_en_lotes(
+            CuentaCorrienteUnidad, nuevas, cambiadas, [*campos, 'actualizado_at'], 'cuentas_corrientes'
+        )
+    return diferencias
+
+def indicadores_dashboard(periodo, fecha_corte=None):
+    """
+    Indicadores de todos los condominios para el dashboard:
+    {id_condominio: {'total_gastos', 'total_cobrado', 'total_pagado',
+    'saldo_pendiente', 'unidades_morosas'}}.
+
+    Sale de las tablas de resumen en una sola consulta: la fila de
+    ResumenPeriodo del periodo (LEFT JOIN filtrado) y, como subconsulta
+    agrupada, las unidades con deuda vencida según CuentaCorrienteUnidad
+    (mismo criterio de vencimiento que los intereses de mora).
+    El resultado se guarda en caché TIEMPO_CACHE_DASHBOARD segundos.
+    """
+    vencido = _ultimo_periodo_vencido(fecha_corte or timezone.localdate())
+    clave = f"dashboard:{periodo}:{vencido}"
+    indicadores = cache.get(clave)
+    if indicadores is not None:
+        return indicadores
+
+    unidades_morosas = CuentaCorrienteUnidad.objects.filter(
+        id_unidad__id_grupo__id_condominio=OuterRef('pk'),
+        saldo__gt=0,
+        periodo_mas_antiguo__lte=vencido
+    ).order_by().values('id_unidad__id_grupo__id_condominio').annotate(cantidad=Count('pk')).values('cantidad')
+
+    campos = ('total_gastos', 'total_cobrado', 'total_pagado', 'saldo_pendiente')
+    filas = Condominio.objects.annotate(
+        resumen_actual=FilteredRelation('resumenperiodo', condition=Q(resumenperiodo__periodo=periodo))
+    ).values(
+        'id_condominio',
+        unidades_morosas=Subquery(unidades_morosas),
+        **{campo: F(f'resumen_actual__{campo}') for campo in campos}
+    )
+
+    indicadores = {
+        fila['id_condominio']: {
+            **{campo: fila[campo] if fila[campo] is not None else Decimal(0) for campo in campos},
+            'unidades_morosas': fila['unidades_morosas'] or 0,
+        }
+        for fila in filas
+    }
+    cache.set(clave, indicadores, TIEMPO_CACHE_DASHBOARD)
+    return indicadores
@@ -0,0 +1,128 @@
+"""
+Señales de la app 'core'.
+Mantienen al día las tablas derivadas (ResumenPeriodo) y la vigencia de los
+factores de prorrateo cuando se guardan o eliminan registros uno a uno
+(admin, formularios, servicios).
+Las operaciones masivas (bulk_create / bulk_update / QuerySet.update) NO
+disparan señales: los servicios que las usan actualizan el resumen ellos mismos.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Cobro, Gasto, Grupo, PagoAplicacion, Unidad
+from .services import actualizar_resumen_periodo, invalidar_factores_condominio, reasignar_condominio_movimientos
+
+
+def _condominio_de_unidad(id_unidad):
+    return Unidad.objects.filter(pk=id_unidad).values_list('id_grupo__id_condominio_id', flat=True).first()
+
+
+def _condominio_de_grupo(id_grupo):
+    return Grupo.objects.filter(pk=id_grupo).values_list('id_condominio_id', flat=True).first()
+
+
+# --- INICIO: Resumen por periodo ---
+
+@receiver(pre_save, sender=Gasto)
+def recordar_periodo_anterior_gasto(sender, instance, **kwargs):
+    """Si un gasto cambia de periodo, también hay que recalcular el periodo anterior."""
+    instance._periodo_anterior = None
+    if instance.pk:
+        instance._periodo_anterior = Gasto.objects.filter(pk=instance.pk).values_list(
+            'id_condominio_id', 'periodo'
+        ).first()
+
+
+@receiver(post_save, sender=Gasto)
+@receiver(post_delete, sender=Gasto)
+def actualizar_resumen_por_gasto(sender, instance, **kwargs):
+    actualizar_resumen_periodo(instance.id_condominio_id, instance.periodo, cobros=False)
+
+    anterior = getattr(instance, '_periodo_anterior', None)
+    if anterior and anterior != (instance.id_condominio_id, instance.periodo):
+        actualizar_resumen_periodo(*anterior, cobros=False)
+
+
+@receiver(post_save, sender=Cobro)
+@receiver(post_delete, sender=Cobro)
+def actualizar_resumen_por_cobro(sender, instance, **kwargs):
+    condominio_id = _condominio_de_unidad(instance.id_unidad_id)
+    if condominio_id:
+        actualizar_resumen_periodo(condominio_id, instance.periodo, gastos=False)
+
+
+@receiver(post_save, sender=PagoAplicacion)
+@receiver(post_delete, sender=PagoAplicacion)
+def actualizar_resumen_por_aplicacion(sender, instance, **kwargs):
+    cobro = Cobro.objects.filter(pk=instance.id_cobro_id).values_list(
+        'id_unidad__id_grupo__id_condominio_id', 'periodo'
+    ).first()
+    if cobro and cobro[0]:
+        actualizar_resumen_periodo(*cobro, gastos=False)
+
+# --- FIN: Resumen por periodo ---
+
+
+# --- INICIO: Invalidación de factores de prorrateo ---
+
+# Columnas de Unidad que usan los criterios de prorrateo
+CAMPOS_FACTORES_UNIDAD = ('id_grupo_id', 'coef_prop', 'metros2', 'id_unidad_tipo_id')
+
+
+@receiver(pre_save, sender=Unidad)
+def recordar_unidad_anterior(sender, instance, **kwargs):
+    """
+    Guarda el condominio anterior de la unidad y si cambió alguna columna que
+    influya en los factores (editar, por ejemplo, el rol SII no los invalida).
+    """
+    instance._condominio_anterior = None
+    instance._cambian_factores = True
+    if not instance.pk:
+        return
+
+    anterior = Unidad.objects.filter(pk=instance.pk).values_list(
+        'id_grupo__id_condominio_id', *CAMPOS_FACTORES_UNIDAD
+    ).first()
+    if anterior is None:
+        return
+
+    instance._condominio_anterior = anterior[0]
+    instance._cambian_factores = anterior[1:] != tuple(getattr(instance, campo) for campo in CAMPOS_FACTORES_UNIDAD)
+
+
+@receiver(post_save, sender=Unidad)
+def invalidar_factores_por_unidad(sender, instance, created, **kwargs):
+    if getattr(instance, '_cambian_factores', True):
+        condominio_id = _condominio_de_grupo(instance.id_grupo_id)
+        anterior = getattr(instance, '_condominio_anterior', None)
+        invalidar_factores_condominio(condominio_id, anterior)
+        # Cobros y pagos guardan una copia del condominio de la unidad
+        if not created and condominio_id != anterior:
+            reasignar_condominio_movimientos([instance.pk])
+
+
+@receiver(post_delete, sender=Unidad)
+def invalidar_factores_por_unidad_eliminada(sender, instance, **kwargs):
+    invalidar_factores_condominio(_condominio_de_grupo(instance.id_grupo_id))
+
+
+@receiver(pre_save, sender=Grupo)
+def recordar_condominio_anterior_grupo(sender, instance, **kwargs):
+    instance._condominio_anterior = _condominio_de_grupo(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Grupo)
+def invalidar_factores_por_grupo(sender, instance, created, **kwargs):
+    """Un grupo que cambia de condominio se lleva sus unidades."""
+    anterior = getattr(instance, '_condominio_anterior', None)
+    if not created and anterior != instance.id_condominio_id:
+        invalidar_factores_condominio(anterior, instance.id_condominio_id)
+        reasignar_condominio_movimientos(Unidad.objects.filter(id_grupo=instance).values('id_unidad'))
+
+
+@receiver(post_delete, sender=Grupo)
+def invalidar_factores_por_grupo_eliminado(sender, instance, **kwargs):
+    """Al borrar un grupo sus unidades quedan sin grupo (SET_NULL, sin señales)."""
+    invalidar_factores_condominio(instance.id_condominio_id)
+
+# --- FIN: Invalidación de factores de prorrateo ---
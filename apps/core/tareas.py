@@ -0,0 +1,248 @@
+"""
+Cola de tareas de cierre mensual guardada en la base de datos (sin broker externo).
+
+- La vista encola la tarea (encolar_cierre) y responde de inmediato.
+- 'manage.py run_worker' toma las tareas pendientes y las ejecuta.
+- El avance se publica en la caché 'progreso' (compartida entre procesos):
+  mientras el cierre escribe, su transacción todavía no es visible para otras
+  conexiones, así que no podemos informar el avance en la misma tabla.
+- Cada avance publicado es también el latido de la tarea: una tarea EN_PROCESO
+  sin latido por más de PLAZO_SIN_LATIDO (el worker murió o lo mataron) vuelve
+  a PENDIENTE. El cierre es atómico e idempotente, así que reintentarlo es seguro.
+"""
+import time
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TareaCierre
+from .services import FASES_CIERRE, ejecutar_con_reintentos, generar_cierre_mensual
+
+# Segundos que se conserva el avance publicado de una tarea
+TIEMPO_CACHE_PROGRESO = 60 * 60
+
+# Segundos sin latido tras los cuales una tarea EN_PROCESO se da por abandonada.
+# El cierre publica avance después de cada lote, así que un worker vivo late
+# mucho más seguido que esto.
+PLAZO_SIN_LATIDO = 10 * 60
+
+ESTADOS_ACTIVOS = (TareaCierre.EstadoTarea.PENDIENTE, TareaCierre.EstadoTarea.EN_PROCESO)
+
+
+def _clave_progreso(id_tarea):
+    return f"tarea_cierre:{id_tarea}"
+
+
+def _ultimo_latido(tarea):
+    avance = caches['progreso'].get(_clave_progreso(tarea.id_tarea))
+    if avance and avance.get('latido'):
+        return avance['latido']
+    return tarea.iniciado_at.timestamp() if tarea.iniciado_at else 0
+
+
+def recuperar_tareas_abandonadas(condominio=None, periodo=None):
+    """
+    Devuelve a PENDIENTE las tareas EN_PROCESO cuyo worker dejó de latir hace
+    más de PLAZO_SIN_LATIDO segundos (opcionalmente solo las del condominio y
+    periodo). Devuelve la cantidad de tareas recuperadas.
+    """
+    limite = timezone.now() - timedelta(seconds=PLAZO_SIN_LATIDO)
+    candidatas = TareaCierre.objects.filter(
+        estado=TareaCierre.EstadoTarea.EN_PROCESO,
+        iniciado_at__lt=limite
+    )
+    if condominio is not None:
+        candidatas = candidatas.filter(id_condominio=condominio, periodo=periodo)
+
+    recuperadas = 0
+    for tarea in candidatas:
+        if _ultimo_latido(tarea) >= limite.timestamp():
+            continue
+        # Condicionado por estado e inicio: si el worker terminó o alguien ya
+        # la recuperó entre medio, no se toca
+        recuperadas += TareaCierre.objects.filter(
+            pk=tarea.pk,
+            estado=TareaCierre.EstadoTarea.EN_PROCESO,
+            iniciado_at=tarea.iniciado_at
+        ).update(
+            estado=TareaCierre.EstadoTarea.PENDIENTE,
+            fase=None,
+            iniciado_at=None,
+            mensaje="El worker dejó de responder; la tarea volvió a la cola."
+        )
+        caches['progreso'].delete(_clave_progreso(tarea.id_tarea))
+    return recuperadas
+
+
+def tarea_activa(condominio, periodo):
+    """Tarea pendiente o en proceso para el condominio y periodo (o None)."""
+    return TareaCierre.objects.filter(
+        id_condominio=condominio,
+        periodo=periodo,
+        estado__in=ESTADOS_ACTIVOS
+    ).order_by('-id_tarea').first()
+
+
+def encolar_cierre(condominio, periodo, incremental=False, usuario=None):
+    """
+    Encola el cierre del periodo. Si ya hay una tarea activa para el mismo
+    condominio y periodo, la devuelve en vez de crear otra (si estaba
+    abandonada, antes la devuelve a la cola).
+    Devuelve (tarea, creada).
+    """
+    with transaction.atomic():
+        recuperar_tareas_abandonadas(condominio, periodo)
+        tarea = tarea_activa(condominio, periodo)
+        if tarea:
+            return tarea, False
+
+        tarea = TareaCierre.objects.create(
+            id_condominio=condominio,
+            periodo=periodo,
+            incremental=incremental,
+            solicitado_por=usuario if usuario and usuario.is_authenticated else None
+        )
+    return tarea, True
+
+
+def tomar_siguiente_tarea():
+    """
+    Reserva la tarea pendiente más antigua y la marca EN_PROCESO.
+    El UPDATE condicionado por estado evita que dos workers tomen la misma.
+    Antes devuelve a la cola las tareas abandonadas por otro worker.
+    """
+    recuperar_tareas_abandonadas()
+    while True:
+        tarea = TareaCierre.objects.filter(
+            estado=TareaCierre.EstadoTarea.PENDIENTE
+        ).order_by('creado_at', 'id_tarea').first()
+
+        if tarea is None:
+            return None
+
+        reservada = TareaCierre.objects.filter(
+            pk=tarea.pk,
+            estado=TareaCierre.EstadoTarea.PENDIENTE
+        ).update(
+            estado=TareaCierre.EstadoTarea.EN_PROCESO,
+            iniciado_at=timezone.now(),
+            fase=FASES_CIERRE[0]
+        )
+        if reservada:
+            tarea.refresh_from_db()
+            return tarea
+        # Otro worker la tomó primero: probamos con la siguiente
+
+
+def ejecutar_tarea(tarea):
+    """
+    Ejecuta el cierre de la tarea (ya reservada) y guarda el resultado.
+    """
+    cache_progreso = caches['progreso']
+
+    def progreso(fase, procesadas, total):
+        cache_progreso.set(
+            _clave_progreso(tarea.id_tarea),
+            {'fase': fase, 'procesadas': procesadas, 'total': total, 'latido': time.time()},
+            TIEMPO_CACHE_PROGRESO
+        )
+
+    def cerrar():
+        return generar_cierre_mensual(
+            tarea.id_condominio, tarea.periodo,
+            incremental=tarea.incremental, progreso=progreso
+        )
+
+    try:
+        cobros, _ = ejecutar_con_reintentos(cerrar)
+        tarea.estado = TareaCierre.EstadoTarea.COMPLETADA
+        tarea.fase = None
+        tarea.unidades_total = len(cobros)
+        tarea.unidades_procesadas = len(cobros)
+        tarea.mensaje = f"Cierre {tarea.periodo} generado: {len(cobros)} cobros."
+    except Exception as e:
+        tarea.estado = TareaCierre.EstadoTarea.ERROR
+        tarea.mensaje = f"Error al generar cierre: {e}"[:500]
+    except BaseException:
+        # Ctrl+C o fin del proceso: la transacción del cierre ya se deshizo,
+        # así que la tarea vuelve a la cola en vez de quedar EN_PROCESO
+        tarea.estado = TareaCierre.EstadoTarea.PENDIENTE
+        tarea.fase = None
+        tarea.iniciado_at = None
+        tarea.mensaje = "Worker detenido durante el cierre; la tarea volvió a la cola."
+        _guardar_resultado(tarea, terminada=False)
+        raise
+
+    _guardar_resultado(tarea)
+    return tarea
+
+
+def _guardar_resultado(tarea, terminada=True):
+    tarea.terminado_at = timezone.now() if terminada else None
+    tarea.save(update_fields=[
+        'estado', 'fase', 'unidades_total', 'unidades_procesadas', 'mensaje', 'iniciado_at', 'terminado_at'
+    ])
+    caches['progreso'].delete(_clave_progreso(tarea.id_tarea))
+
+
+def estado_tarea(tarea):
+    """
+    Estado de la tarea para el endpoint JSON: fase, unidades procesadas,
+    porcentaje de avance y segundos estimados para terminar (ETA).
+    """
+    datos = {
+        'id_tarea': tarea.id_tarea,
+        'periodo': tarea.periodo,
+        'estado': tarea.estado,
+        'fase': tarea.fase,
+        'unidades_procesadas': tarea.unidades_procesadas,
+        'unidades_total': tarea.unidades_total,
+        'porcentaje': 100 if tarea.estado == TareaCierre.EstadoTarea.COMPLETADA else 0,
+        'eta_segundos': None,
+        'mensaje': tarea.mensaje,
+    }
+
+    if tarea.estado != TareaCierre.EstadoTarea.EN_PROCESO:
+        return datos
+
+    avance = caches['progreso'].get(_clave_progreso(tarea.id_tarea))
+    if not avance:
+        return datos
+
+    fase, procesadas, total = avance['fase'], avance['procesadas'], avance['total']
+    indice_fase = FASES_CIERRE.index(fase) if fase in FASES_CIERRE else 0
+    fraccion_fase = procesadas / total if total else 1
+    fraccion = (indice_fase + fraccion_fase) / len(FASES_CIERRE)
+
+    datos['fase'] = fase
+    datos['unidades_procesadas'] = procesadas
+    datos['unidades_total'] = total
+    datos['porcentaje'] = round(fraccion * 100, 1)
+
+    if tarea.iniciado_at and fraccion > 0:
+        transcurrido = (timezone.now() - tarea.iniciado_at).total_seconds()
+        datos['eta_segundos'] = round(transcurrido * (1 - fraccion) / fraccion, 1)
+
+    return datos
+
+
+def procesar_cola(una_vez=False, intervalo=2.0, al_terminar=None):
+    """
+    Bucle del worker: ejecuta tareas mientras haya; si no hay, espera 'intervalo'
+    segundos (o termina si una_vez=True). Devuelve la cantidad de tareas ejecutadas.
+    """
+    ejecutadas = 0
+    while True:
+        tarea = tomar_siguiente_tarea()
+        if tarea is None:
+            if una_vez:
+                return ejecutadas
+            time.sleep(intervalo)
+            continue
+
+        ejecutar_tarea(tarea)
+        ejecutadas += 1
+        if al_terminar:
+            al_terminar(tarea)
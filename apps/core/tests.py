@@ -1,3 +1,1120 @@
-from django.test import TestCase
+import io
+import json
+import random
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .datos_sinteticos import generar_condominio
+from .models import (
+    CatCobroEstado, CatConceptoCargo, CatDocTipo, CatUnidadTipo, CatMetodoPago, CatPasarela, Cobro, CobroDetalle, ComprobantePago, Condominio, Gasto,
+    GastoCategoria, Grupo, Pago, PagoAplicacion, PasarelaTx, ProrrateoFactorUnidad, ProrrateoRegla, Proveedor, Remuneracion, SaldoFavor,
+    TareaCierre, Trabajador, Unidad
+)
+from .cartola import importar_cartola
+from .comprobantes import emitir_comprobantes, reservar_folios
+from .conciliacion import (
+    CONCILIADO, DUPLICADO, FALTA_EN_ARCHIVO, FALTA_EN_SISTEMA, MONTO_DISTINTO, conciliar_pagos
+)
+from .paginacion import codificar_cursor, decodificar_cursor, paginar_por_clave
+from .pasarela import aplicar_transacciones_aprobadas, firmar
+from .prorrateo import distribuir_enteros, distribuir_monto, normalizar_factores, np
+from .services import (
+    CONCEPTO_GASTO_COMUN, VigenciaReglas, calcular_factores_prorrateo, calcular_intereses_mora, calcular_vector_factores,
+    clase_tipo_unidad, generar_cierre_mensual, previsualizar_cierre, regla_vigente, registrar_pago
+)
+from .tareas import PLAZO_SIN_LATIDO, encolar_cierre, ejecutar_tarea, tomar_siguiente_tarea
+
+# Las pruebas nunca usan las cachés reales: 'progreso' y 'resumenes' viven en
+# disco (BASE_DIR/tmp) y las comparten los procesos de la aplicación.
+CACHES_PRUEBAS = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f"pruebas-{alias}"}
+    for alias in ('default', 'progreso', 'resumenes')
+}
+
+# Sin caché de resultados: el presupuesto de consultas mide el peor caso
+CACHES_SIN_CACHE = {
+    **CACHES_PRUEBAS,
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'resumenes': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def crear_unidad_con_deuda(montos, nombre='Condominio Test'):
+    """Crea una unidad con un cobro mensual pendiente por cada monto (periodos consecutivos)."""
+    condominio = Condominio.objects.create(nombre=nombre)
+    grupo = Grupo.objects.create(id_condominio=condominio, nombre='Torre A', tipo='Torre')
+    unidad = Unidad.objects.create(id_grupo=grupo, codigo='101', coef_prop=Decimal('1'))
+    pendiente, _ = CatCobroEstado.objects.get_or_create(codigo='PENDIENTE')
+
+    for mes, monto in enumerate(montos, start=1):
+        Cobro.objects.create(
+            id_unidad=unidad,
+            periodo=f"2024{mes:02d}",
+            id_cobro_estado=pendiente,
+            total_cargos=monto,
+            saldo=monto
+        )
+    return unidad
+
+
+# --- INICIO: Tests del núcleo de prorrateo ---
+
+class DistribuirEnterosTests(SimpleTestCase):
+    """Reparto por resto mayor (prorrateo.distribuir_enteros), en Python puro y con NumPy."""
+
+    def _casos_aleatorios(self, cantidad=200, largo=50):
+        azar = random.Random(7)
+        for _ in range(cantidad):
+            pesos = [azar.choice([0, 0, 1, azar.randint(1, 10 ** 6)]) for _ in range(azar.randint(1, largo))]
+            yield azar.randint(-10 ** 7, 10 ** 9), pesos
+
+    def test_las_partes_suman_el_total(self):
+        for total, pesos in self._casos_aleatorios():
+            if not any(pesos):
+                continue
+            with self.subTest(total=total, pesos=pesos):
+                self.assertEqual(sum(distribuir_enteros(total, pesos, usar_numpy=False)), total)
+
+    def test_empates_en_el_resto_van_a_la_primera_posicion(self):
+        self.assertEqual(distribuir_enteros(1, [1, 1], usar_numpy=False), [1, 0])
+        self.assertEqual(distribuir_enteros(2, [1, 1, 1], usar_numpy=False), [1, 1, 0])
+        # 10 en 1:2:3 -> 1.67, 3.33, 5: el sobrante va al mayor resto, no al primero
+        self.assertEqual(distribuir_enteros(10, [1, 2, 3], usar_numpy=False), [2, 3, 5])
+        self.assertEqual(distribuir_enteros(100, [1, 1, 1], usar_numpy=False), [34, 33, 33])
+
+    def test_pesos_cero(self):
+        self.assertEqual(distribuir_enteros(100, [0, 1, 0], usar_numpy=False), [0, 100, 0])
+        # Sin pesos no hay base para repartir: nadie recibe nada
+        self.assertEqual(distribuir_enteros(100, [0, 0], usar_numpy=False), [0, 0])
+        self.assertEqual(distribuir_enteros(100, [], usar_numpy=False), [])
+
+    def test_pesos_negativos(self):
+        for pesos in ([-1, 2], [-1, 1], [-1]):
+            for usar_numpy in (False, True):
+                with self.subTest(pesos=pesos, usar_numpy=usar_numpy):
+                    with self.assertRaises(ValueError):
+                        distribuir_enteros(100, pesos, usar_numpy=usar_numpy)
+
+    @skipIf(np is None, "NumPy no está instalado")
+    def test_numpy_igual_a_python(self):
+        casos = list(self._casos_aleatorios()) + list(self._casos_aleatorios(cantidad=5, largo=5000))
+        casos += [(2, [1, 1, 1]), (10, [1, 2, 3]), (100, [0, 0])]
+        for total, pesos in casos:
+            with self.subTest(total=total, largo=len(pesos)):
+                self.assertEqual(
+                    distribuir_enteros(total, pesos, usar_numpy=True),
+                    distribuir_enteros(total, pesos, usar_numpy=False)
+                )
+
+    def test_montos_y_factores_cuadran(self):
+        factores = normalizar_factores([Decimal('55.5'), Decimal('72.25'), Decimal('0'), Decimal('31')])
+        self.assertEqual(sum(factores), 1)
+
+        partes = distribuir_monto(Decimal('1000000.555'), factores, decimales=2)
+        self.assertEqual(sum(partes), Decimal('1000000.56'))
+        self.assertEqual(partes[2], 0)
+
+# --- FIN: Tests del núcleo de prorrateo ---
+
+
+# --- INICIO: Tests de Factores de Prorrateo ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class CriteriosProrrateoTests(TestCase):
+    """Pesos de cada criterio de prorrateo (calcular_vector_factores)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.condominio = Condominio.objects.create(nombre='Condominio Criterios')
+        grupo = Grupo.objects.create(id_condominio=cls.condominio, nombre='Torre A', tipo='Torre')
+        tipos = {
+            codigo: CatUnidadTipo.objects.create(codigo=codigo, nombre=codigo.title())
+            for codigo in ('DEPTO', 'BOD', 'EST-CUB')
+        }
+        # (código, tipo, metros2): la bodega sin metros2 no paga por POR_M2
+        for codigo, tipo, metros2 in [
+            ('101', 'DEPTO', Decimal('60')), ('102', 'DEPTO', Decimal('30')),
+            ('B-1', 'BOD', None), ('E-1', 'EST-CUB', Decimal('10')),
+        ]:
+            Unidad.objects.create(
+                id_grupo=grupo, codigo=codigo, id_unidad_tipo=tipos[tipo], metros2=metros2, coef_prop=Decimal('0.25')
+            )
+
+    def _factores(self, criterio, **pesos):
+        regla = ProrrateoRegla(id_condominio=self.condominio, criterio=criterio, **pesos)
+        return [factor for _, factor in calcular_vector_factores(regla)]
+
+    def test_por_m2(self):
+        factores = self._factores(ProrrateoRegla.CriterioProrrateo.POR_M2)
+        self.assertEqual(factores, [Decimal('0.6'), Decimal('0.3'), Decimal('0'), Decimal('0.1')])
+
+    def test_por_m2_sin_metros_registrados(self):
+        Unidad.objects.filter(id_grupo__id_condominio=self.condominio).update(metros2=None)
+        with self.assertRaises(ValueError):
+            self._factores(ProrrateoRegla.CriterioProrrateo.POR_M2)
+
+    def test_por_tipo(self):
+        factores = self._factores(
+            ProrrateoRegla.CriterioProrrateo.POR_TIPO,
+            peso_vivienda=Decimal('2'), peso_bodega=Decimal('0.5'), peso_estacionamiento=Decimal('0.5')
+        )
+        self.assertEqual(factores, [Decimal('0.4'), Decimal('0.4'), Decimal('0.1'), Decimal('0.1')])
+
+    def test_por_tipo_sin_peso_definido_vale_uno(self):
+        factores = self._factores(ProrrateoRegla.CriterioProrrateo.POR_TIPO, peso_bodega=Decimal('2'))
+        self.assertEqual(factores, [Decimal('0.2'), Decimal('0.2'), Decimal('0.4'), Decimal('0.2')])
+
+    def test_clase_segun_prefijo_del_codigo_de_tipo(self):
+        casos = {
+            'BOD': 'bodega', 'bodega': 'bodega', 'EST-CUB': 'estacionamiento', 'Estac': 'estacionamiento',
+            'DEPTO': 'vivienda', 'CASA': 'vivienda', 'DEPTO-BOD': 'vivienda', '': 'vivienda', None: 'vivienda',
+        }
+        for codigo, clase in casos.items():
+            with self.subTest(codigo=codigo):
+                self.assertEqual(clase_tipo_unidad(codigo), clase)
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class FactoresPorDiferenciaTests(TestCase):
+    """calcular_factores_prorrateo solo escribe las filas que cambian y las informa."""
+
+    def setUp(self):
+        self.condominio = Condominio.objects.create(nombre='Condominio Factores')
+        self.grupo = Grupo.objects.create(id_condominio=self.condominio, nombre='Torre A', tipo='Torre')
+        self.unidades = [
+            Unidad.objects.create(id_grupo=self.grupo, codigo=codigo, coef_prop=coef)
+            for codigo, coef in (('101', Decimal('0.5')), ('102', Decimal('0.3')), ('103', Decimal('0.2')))
+        ]
+        self.regla = ProrrateoRegla.objects.create(
+            id_condominio=self.condominio,
+            id_concepto_cargo=CatConceptoCargo.objects.create(codigo=CONCEPTO_GASTO_COMUN, nombre='Gasto Común'),
+            criterio=ProrrateoRegla.CriterioProrrateo.COEF_PROP, vigente_desde=date(2024, 1, 1)
+        )
+        self.assertEqual(self._calcular()['creados'], 3)
+
+    def _calcular(self):
+        return calcular_factores_prorrateo(ProrrateoRegla.objects.get(pk=self.regla.pk))
+
+    def _factores(self):
+        return dict(ProrrateoFactorUnidad.objects.filter(id_prorrateo=self.regla).values_list('id_unidad', 'factor'))
+
+    def test_sin_cambios(self):
+        ids = set(ProrrateoFactorUnidad.objects.values_list('id_factor', flat=True))
+
+        reporte = self._calcular()
+
+        self.assertEqual(
+            reporte, {'total': 3, 'creados': 0, 'actualizados': 0, 'eliminados': 0, 'sin_cambios': 3}
+        )
+        self.assertEqual(set(ProrrateoFactorUnidad.objects.values_list('id_factor', flat=True)), ids)
+
+    def test_cambio_de_coeficiente_actualiza_solo_esas_unidades(self):
+        primera, segunda, tercera = self.unidades
+        primera.coef_prop, segunda.coef_prop = Decimal('0.4'), Decimal('0.4')
+        primera.save()
+        segunda.save()
+
+        reporte = self._calcular()
+
+        self.assertEqual(
+            reporte, {'total': 3, 'creados': 0, 'actualizados': 2, 'eliminados': 0, 'sin_cambios': 1}
+        )
+        self.assertEqual(
+            self._factores(),
+            {primera.pk: Decimal('0.4'), segunda.pk: Decimal('0.4'), tercera.pk: Decimal('0.2')}
+        )
+
+    def test_unidad_agregada_y_unidad_quitada(self):
+        # Coeficiente 0: el resto de los factores no se re-escala
+        nueva = Unidad.objects.create(id_grupo=self.grupo, codigo='104', coef_prop=Decimal('0'))
+        self.assertEqual(
+            self._calcular(), {'total': 4, 'creados': 1, 'actualizados': 0, 'eliminados': 0, 'sin_cambios': 3}
+        )
+
+        # Sale del condominio (otro grupo): su factor se elimina
+        otro = Condominio.objects.create(nombre='Otro Condominio')
+        nueva.id_grupo = Grupo.objects.create(id_condominio=otro, nombre='Torre B', tipo='Torre')
+        nueva.save()
+        self.assertEqual(
+            self._calcular(), {'total': 3, 'creados': 0, 'actualizados': 0, 'eliminados': 1, 'sin_cambios': 3}
+        )
+        self.assertNotIn(nueva.pk, self._factores())
+
+# --- FIN: Tests de Factores de Prorrateo ---
+
+
+# --- INICIO: Tests de Pagos ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class RegistrarPagoTests(TestCase):
+
+    def setUp(self):
+        self.unidad = crear_unidad_con_deuda([Decimal('10000'), Decimal('20000')])
+        self.metodo = CatMetodoPago.objects.create(codigo='TRF', nombre='Transferencia')
+        self.fecha = timezone.make_aware(datetime(2024, 3, 5))
+
+    def test_aplica_primero_el_cobro_mas_antiguo(self):
+        pago = registrar_pago(self.unidad, Decimal('15000'), self.metodo, self.fecha)
+
+        enero, febrero = Cobro.objects.filter(id_unidad=self.unidad).order_by('periodo')
+        self.assertEqual(enero.saldo, 0)
+        self.assertEqual(enero.id_cobro_estado.codigo, 'PAGADO')
+        self.assertEqual(febrero.saldo, Decimal('15000'))
+        self.assertEqual(febrero.total_pagado, Decimal('5000'))
+        self.assertEqual(febrero.id_cobro_estado.codigo, 'PENDIENTE')
+        self.assertEqual(
+            list(PagoAplicacion.objects.filter(id_pago=pago).order_by('id_cobro').values_list('monto_aplicado', flat=True)),
+            [Decimal('10000'), Decimal('5000')]
+        )
+
+    def test_pago_mayor_a_la_deuda_no_sobre_aplica(self):
+        registrar_pago(self.unidad, Decimal('50000'), self.metodo, self.fecha)
+
+        self.assertFalse(Cobro.objects.filter(id_unidad=self.unidad, saldo__gt=0).exists())
+        self.assertEqual(
+            sum(PagoAplicacion.objects.values_list('monto_aplicado', flat=True)),
+            Decimal('30000')
+        )
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class RegistrarPagoConcurrenciaTests(TransactionTestCase):
+    """
+    Pagos simultáneos (hilos con su propia conexión) sobre la misma unidad:
+    lo aplicado nunca puede superar la deuda ni dejar saldos negativos.
+    """
+
+    PAGOS_SIMULTANEOS = 8
+
+    def test_pagos_en_paralelo_no_duplican_la_aplicacion(self):
+        unidad = crear_unidad_con_deuda([Decimal('10000'), Decimal('10000'), Decimal('10000')])
+        metodo = CatMetodoPago.objects.create(codigo='TRF', nombre='Transferencia')
+        fecha = timezone.make_aware(datetime(2024, 4, 5))
+
+        # Cada pago cubre la mitad de un cobro: 8 x 5000 = 40000 > 30000 de deuda
+        barrera = threading.Barrier(self.PAGOS_SIMULTANEOS)
+        errores = []
+
+        def pagar():
+            try:
+                barrera.wait()
+                registrar_pago(unidad, Decimal('5000'), metodo, fecha)
+            except Exception as e:  # pragma: no cover - se informa en el assert
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=pagar) for _ in range(self.PAGOS_SIMULTANEOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+
+        cobros = list(Cobro.objects.filter(id_unidad=unidad))
+        self.assertTrue(all(cobro.saldo == 0 for cobro in cobros))
+        self.assertTrue(all(cobro.total_pagado == cobro.total_cargos for cobro in cobros))
+        self.assertEqual(
+            sum(PagoAplicacion.objects.values_list('monto_aplicado', flat=True)),
+            Decimal('30000')
+        )
+
+    def test_pagos_en_paralelo_con_el_cierre(self):
+        """
+        registrar_pago y generar_cierre_mensual toman los bloqueos de unidad en
+        el mismo orden (antes de la transacción): corriendo a la vez sobre las
+        mismas unidades ninguno termina en "database is locked".
+        """
+        unidad = crear_unidad_con_deuda([Decimal('10000')])
+        condominio = unidad.id_grupo.id_condominio
+        metodo = CatMetodoPago.objects.create(codigo='TRF', nombre='Transferencia')
+        fecha = timezone.make_aware(datetime(2024, 4, 5))
+        # Deja 5000 a favor: el cierre los consume aplicando pagos
+        registrar_pago(unidad, Decimal('15000'), metodo, fecha)
+        Gasto.objects.create(
+            id_condominio=condominio, periodo='202404',
+            id_gasto_categ=GastoCategoria.objects.create(nombre='Mantención'),
+            id_doc_tipo=CatDocTipo.objects.create(codigo='FAC', nombre='Factura'),
+            fecha_emision=datetime(2024, 4, 10).date(), neto=Decimal('10000'), iva=0
+        )
+
+        barrera = threading.Barrier(self.PAGOS_SIMULTANEOS + 1)
+        errores = []
+
+        def en_hilo(funcion):
+            def ejecutar():
+                try:
+                    barrera.wait()
+                    funcion()
+                except Exception as e:  # pragma: no cover - se informa en el assert
+                    errores.append(e)
+                finally:
+                    connection.close()
+            return threading.Thread(target=ejecutar)
+
+        hilos = [en_hilo(lambda: generar_cierre_mensual(condominio, '202404'))]
+        hilos += [
+            en_hilo(lambda: registrar_pago(unidad, Decimal('2000'), metodo, fecha))
+            for _ in range(self.PAGOS_SIMULTANEOS)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+
+        for cobro in Cobro.objects.filter(id_unidad=unidad):
+            aplicado = sum(PagoAplicacion.objects.filter(id_cobro=cobro).values_list('monto_aplicado', flat=True))
+            self.assertEqual(cobro.total_pagado, aplicado)
+            self.assertEqual(cobro.saldo, cobro.total_cargos - cobro.total_pagado)
+        # Ningún peso se pierde ni se aplica dos veces
+        for pago in Pago.objects.filter(id_unidad=unidad):
+            aplicado = sum(PagoAplicacion.objects.filter(id_pago=pago).values_list('monto_aplicado', flat=True))
+            disponible = SaldoFavor.objects.filter(id_pago=pago).values_list('monto_disponible', flat=True).first() or 0
+            self.assertEqual(aplicado + disponible, pago.monto)
+
+# --- FIN: Tests de Pagos ---
+
+
+# --- INICIO: Tests de Cartola ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class ImportarCartolaTests(TestCase):
+
+    LINEAS = [
+        'fecha,monto,unidad,referencia',
+        '2024-03-05,15000,101,OP-1',
+        '2024-03-06,5000,101,',
+        '2024-03-07,20000,101,OP-2',
+    ]
+
+    def setUp(self):
+        self.unidad = crear_unidad_con_deuda([Decimal('10000'), Decimal('20000')])
+        self.metodo = CatMetodoPago.objects.create(codigo='TRF', nombre='Transferencia')
+
+    def _verificar_aplicaciones(self, resumen):
+        self.assertEqual(resumen['importadas'], 3)
+        self.assertEqual(resumen['monto_sin_aplicar'], Decimal('10000'))
+        # Cada pago quedó enlazado a sus aplicaciones y su saldo a favor
+        for pago in Pago.objects.filter(id_unidad=self.unidad):
+            aplicado = sum(PagoAplicacion.objects.filter(id_pago=pago).values_list('monto_aplicado', flat=True))
+            saldo = SaldoFavor.objects.filter(id_pago=pago).values_list('monto_original', flat=True).first() or 0
+            self.assertEqual(aplicado + saldo, pago.monto)
+        self.assertFalse(Cobro.objects.filter(id_unidad=self.unidad, saldo__gt=0).exists())
+
+    def test_importa_y_aplica_por_lote(self):
+        self._verificar_aplicaciones(importar_cartola(self.unidad.id_grupo.id_condominio, self.LINEAS, self.metodo))
+
+    def test_motor_sin_pk_en_bulk_create(self):
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            resumen = importar_cartola(self.unidad.id_grupo.id_condominio, self.LINEAS, self.metodo)
+        self._verificar_aplicaciones(resumen)
+
+# --- FIN: Tests de Cartola ---
+
+
+# --- INICIO: Tests de Conciliación ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class ConciliarPagosTests(TestCase):
+
+    LINEAS = [
+        'referencia,monto,fecha',
+        '1-23,1000,05-03-2024',       # conciliado con '000123'
+        'abc9,2500,2024-03-06',       # la referencia existe con otro monto
+        'DUP,700,2024-03-07',         # referencia de dos pagos del sistema
+        ',3000,2024-03-12',           # sin referencia: pago del 10-03 (dentro de la tolerancia)
+        '999,100,2024-03-08',         # no está en el sistema
+        '123,1000,2024-03-05',        # repetida en el archivo
+        ',4000,2024-03-10',           # sin referencia y sin pago
+    ]
+
+    def setUp(self):
+        unidad = crear_unidad_con_deuda([])
+        self.condominio = unidad.id_grupo.id_condominio
+        metodo = CatMetodoPago.objects.create(codigo='TRF', nombre='Transferencia')
+        otra = crear_unidad_con_deuda([], nombre='Otro Condominio')
+
+        for unidad_pago, dia, monto, referencia in [
+            (unidad, 5, '1000', '000123'),
+            (unidad, 6, '2000', 'ABC9'),
+            (unidad, 7, '700', 'DUP'),
+            (unidad, 7, '700', 'dup'),
+            (unidad, 10, '3000', None),
+            (unidad, 11, '500', 'X77'),          # no viene en el archivo
+            (otra, 5, '100', '999'),             # de otro condominio
+        ]:
+            Pago.objects.create(
+                id_unidad=unidad_pago, fecha_pago=timezone.make_aware(datetime(2024, 3, dia, 12)),
+                monto=Decimal(monto), id_metodo_pago=metodo, ref_externa=referencia
+            )
+        # Fuera del rango conciliado
+        Pago.objects.create(
+            id_unidad=unidad, fecha_pago=timezone.make_aware(datetime(2024, 4, 2, 12)),
+            monto=Decimal('800'), id_metodo_pago=metodo, ref_externa='FUERA'
+        )
+
+    def test_categorias(self):
+        diferencias = []
+
+        resultado = conciliar_pagos(
+            self.condominio, self.LINEAS, date(2024, 3, 1), date(2024, 3, 31),
+            diferencia=lambda categoria, datos: diferencias.append(
+                (categoria, datos['origen'], datos.get('referencia'))
+            )
+        )
+
+        self.assertEqual(resultado, {
+            'lineas': 7, 'pagos': 6, CONCILIADO: 2, MONTO_DISTINTO: 1,
+            DUPLICADO: 4, FALTA_EN_SISTEMA: 2, FALTA_EN_ARCHIVO: 1,
+        })
+        self.assertCountEqual(diferencias, [
+            (MONTO_DISTINTO, 'archivo', 'abc9'),
+            (DUPLICADO, 'sistema', 'DUP'),
+            (DUPLICADO, 'sistema', 'dup'),
+            (DUPLICADO, 'archivo', 'DUP'),
+            (DUPLICADO, 'archivo', '123'),
+            (FALTA_EN_SISTEMA, 'archivo', '999'),
+            (FALTA_EN_SISTEMA, 'archivo', ''),
+            (FALTA_EN_ARCHIVO, 'sistema', 'X77'),
+        ])
+
+    def test_sin_referencia_fuera_de_la_tolerancia(self):
+        lineas = ['referencia,monto,fecha', ',3000,2024-03-14']
+
+        resultado = conciliar_pagos(self.condominio, lineas, date(2024, 3, 1), date(2024, 3, 31))
+
+        self.assertEqual(resultado[CONCILIADO], 0)
+        self.assertEqual(resultado[FALTA_EN_SISTEMA], 1)
+
+# --- FIN: Tests de Conciliación ---
+
+
+# --- INICIO: Tests de Saldos a Favor en el Cierre ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class CierreSaldoFavorTests(TestCase):
+
+    def setUp(self):
+        self.unidad = crear_unidad_con_deuda([])
+        self.condominio = self.unidad.id_grupo.id_condominio
+        self.metodo = CatMetodoPago.objects.create(codigo='TRF', nombre='Transferencia')
+        self.fecha = timezone.make_aware(datetime(2024, 5, 20))
+        self.gasto = Gasto.objects.create(
+            id_condominio=self.condominio, periodo='202405',
+            id_gasto_categ=GastoCategoria.objects.create(nombre='Mantención'),
+            id_doc_tipo=CatDocTipo.objects.create(codigo='FAC', nombre='Factura'),
+            fecha_emision=datetime(2024, 5, 10).date(), neto=Decimal('10000'), iva=0
+        )
+
+    def test_cierre_consume_el_saldo_a_favor(self):
+        # Sin deuda, el pago completo queda como saldo a favor
+        pago = registrar_pago(self.unidad, Decimal('4000'), self.metodo, self.fecha)
+        self.assertEqual(SaldoFavor.objects.get(id_pago=pago).monto_disponible, Decimal('4000'))
+
+        generar_cierre_mensual(self.condominio, '202405')
+
+        cobro = Cobro.objects.get(id_unidad=self.unidad, periodo='202405')
+        self.assertEqual(cobro.total_pagado, Decimal('4000'))
+        self.assertEqual(cobro.saldo, Decimal('6000'))
+        self.assertEqual(SaldoFavor.objects.get(id_pago=pago).monto_disponible, 0)
+        self.assertEqual(PagoAplicacion.objects.get(id_pago=pago, id_cobro=cobro).monto_aplicado, Decimal('4000'))
+        self.assertEqual(self.unidad.cuenta_corriente.saldo, Decimal('6000'))
+
+    def test_re_cierre_que_baja_un_cobro_pagado_deja_el_exceso_a_favor(self):
+        generar_cierre_mensual(self.condominio, '202405')
+        pago = registrar_pago(self.unidad, Decimal('10000'), self.metodo, self.fecha)
+
+        self.gasto.neto = Decimal('6000')
+        self.gasto.save()
+        generar_cierre_mensual(self.condominio, '202405', incremental=True)
+
+        cobro = Cobro.objects.get(id_unidad=self.unidad, periodo='202405')
+        self.assertEqual(cobro.total_cargos, Decimal('6000'))
+        self.assertEqual(cobro.total_pagado, Decimal('6000'))
+        self.assertEqual(cobro.saldo, 0)
+        self.assertEqual(cobro.id_cobro_estado.codigo, 'PAGADO')
+
+        # El pago sigue sumando su monto: lo aplicado más su saldo a favor
+        saldo_favor = SaldoFavor.objects.get(id_pago=pago)
+        self.assertEqual(saldo_favor.monto_disponible, Decimal('4000'))
+        aplicado = sum(PagoAplicacion.objects.filter(id_pago=pago).values_list('monto_aplicado', flat=True))
+        self.assertEqual(aplicado + saldo_favor.monto_disponible, pago.monto)
+
+        # El saldo a favor se consume en el cierre siguiente
+        Gasto.objects.create(
+            id_condominio=self.condominio, periodo='202406', id_gasto_categ=self.gasto.id_gasto_categ,
+            id_doc_tipo=self.gasto.id_doc_tipo, fecha_emision=datetime(2024, 6, 10).date(),
+            neto=Decimal('10000'), iva=0
+        )
+        generar_cierre_mensual(self.condominio, '202406')
+        self.assertEqual(Cobro.objects.get(id_unidad=self.unidad, periodo='202406').saldo, Decimal('6000'))
+        self.assertEqual(SaldoFavor.objects.get(id_pago=pago).monto_disponible, 0)
+
+# --- FIN: Tests de Saldos a Favor en el Cierre ---
+
+
+# --- INICIO: Tests de Interés por Mora ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class InteresesMoraTests(TestCase):
+    # Al 15-04, con 1,5% mensual: 202401 vence el 10-02 (65 días, 10000 x 1,5% x 65/30 = 325),
+    # 202402 el 10-03 (36 días, 180), 202403 el 10-04 (5 días, 25) y 202404 aún no vence
+    FECHA_CORTE = date(2024, 4, 15)
+    INTERESES = {'202401': Decimal('325'), '202402': Decimal('180'), '202403': Decimal('25')}
+
+    def setUp(self):
+        self.unidad = crear_unidad_con_deuda([Decimal('10000')] * 4)
+        self.condominio = self.unidad.id_grupo.id_condominio
+
+    def _verificar_intereses(self):
+        for cobro in Cobro.objects.filter(id_unidad=self.unidad):
+            esperado = self.INTERESES.get(cobro.periodo, Decimal('0'))
+            with self.subTest(periodo=cobro.periodo):
+                self.assertEqual(cobro.total_interes, esperado)
+                self.assertEqual(cobro.saldo, cobro.total_cargos + esperado)
+                lineas = CobroDetalle.objects.filter(id_cobro=cobro, tipo=CobroDetalle.TipoDetalle.INTERES_MORA)
+                self.assertEqual(list(lineas.values_list('monto', flat=True)), [esperado] if esperado else [])
+
+    def test_re_ejecutar_la_misma_fecha_no_duplica(self):
+        primero = calcular_intereses_mora(self.condominio, self.FECHA_CORTE)
+        segundo = calcular_intereses_mora(self.condominio, self.FECHA_CORTE)
+
+        self.assertEqual(primero['actualizados'], 3)
+        self.assertEqual(segundo['actualizados'], 0)
+        self.assertEqual(segundo['total_interes'], primero['total_interes'])
+        self._verificar_intereses()
+
+    def test_comando_usa_la_fecha_local(self):
+        salida = io.StringIO()
+        with mock.patch(
+            'apps.core.management.commands.calcular_intereses.timezone.localdate', return_value=self.FECHA_CORTE
+        ):
+            call_command('calcular_intereses', stdout=salida)
+            call_command('calcular_intereses', stdout=salida)
+
+        self._verificar_intereses()
+
+# --- FIN: Tests de Interés por Mora ---
+
+
+# --- INICIO: Tests de Vigencia de Reglas ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class VigenciaReglasTests(TestCase):
+    """VigenciaReglas (en memoria) y regla_vigente (una consulta) eligen siempre la misma regla."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.condominio = Condominio.objects.create(nombre='Condominio Vigencias')
+        concepto = CatConceptoCargo.objects.create(codigo=CONCEPTO_GASTO_COMUN, nombre='Gasto Común')
+        ordinario, extra = ProrrateoRegla.TipoProrrateo.ORDINARIO, ProrrateoRegla.TipoProrrateo.EXTRA
+        vigencias = [
+            (ordinario, date(2023, 1, 1), None),                # abierta
+            (ordinario, date(2023, 6, 15), date(2023, 12, 31)),  # empieza a mitad de mes
+            (ordinario, date(2024, 1, 1), None),                 # abierta, reemplaza a la primera
+            (ordinario, date(2024, 3, 1), date(2024, 3, 31)),    # un mes, dentro de la anterior
+            (ordinario, date(2024, 6, 2), date(2024, 8, 1)),     # empieza después del día 1
+            (extra, date(2024, 2, 1), date(2024, 4, 30)),        # fuera de su rango no hay regla
+            (extra, date(2024, 9, 1), date(2024, 10, 1)),        # termina el día 1 del último mes
+        ]
+        for tipo, desde, hasta in vigencias:
+            ProrrateoRegla.objects.create(
+                id_condominio=cls.condominio, id_concepto_cargo=concepto, tipo=tipo,
+                criterio=ProrrateoRegla.CriterioProrrateo.IGUALITARIO, vigente_desde=desde, vigente_hasta=hasta
+            )
+
+    def test_mismo_resultado_que_regla_vigente(self):
+        reglas = VigenciaReglas.del_condominio(self.condominio)
+        periodos = [f"{anio}{mes:02d}" for anio in (2022, 2023, 2024, 2025) for mes in range(1, 13)]
+
+        for tipo in (ProrrateoRegla.TipoProrrateo.ORDINARIO, ProrrateoRegla.TipoProrrateo.EXTRA):
+            for periodo in periodos:
+                with self.subTest(tipo=tipo, periodo=periodo):
+                    self.assertEqual(
+                        reglas.regla_para(periodo, tipo=tipo),
+                        regla_vigente(self.condominio, periodo, tipo=tipo)
+                    )
+
+    def test_regla_superpuesta_que_ya_termino(self):
+        reglas = VigenciaReglas.del_condominio(self.condominio)
+        abierta = ProrrateoRegla.objects.get(vigente_desde=date(2024, 1, 1))
+
+        self.assertEqual(reglas.regla_para('202403').vigente_desde, date(2024, 3, 1))
+        # La última en empezar ya terminó: vuelve a regir la abierta
+        self.assertEqual(reglas.regla_para('202404'), abierta)
+        self.assertEqual(reglas.regla_para('202409'), abierta)
+        self.assertIsNone(reglas.regla_para('202212'))
+        self.assertIsNone(reglas.regla_para('202411', tipo=ProrrateoRegla.TipoProrrateo.EXTRA))
+
+    def test_sin_regla_vigente_la_vista_previa_falla_como_el_cierre(self):
+        mensaje = "No hay una regla de prorrateo de Gasto Común vigente para el periodo 202212."
+        with self.assertRaisesMessage(ValueError, mensaje):
+            generar_cierre_mensual(self.condominio, '202212')
+        with self.assertRaisesMessage(ValueError, mensaje):
+            previsualizar_cierre(self.condominio, '202212')
+
+        usuario = get_user_model().objects.create_user(
+            'admin@condominio.cl', 11111111, '1', 'Admin', 'Prueba', password='clave'
+        )
+        self.client.force_login(usuario)
+        respuesta = self.client.get(
+            reverse('cierre_preview', args=[self.condominio.id_condominio]) + '?periodo=202212', follow=True
+        )
+        self.assertRedirects(
+            respuesta, reverse('cierre_mensual', args=[self.condominio.id_condominio]) + '?periodo=202212'
+        )
+        self.assertContains(respuesta, mensaje)
+
+# --- FIN: Tests de Vigencia de Reglas ---
+
+
+# --- INICIO: Tests de la Cola de Cierres ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class ColaCierresTests(TestCase):
+
+    def setUp(self):
+        self.condominio = Condominio.objects.create(nombre='Condominio Cola')
+
+    def test_tarea_abandonada_vuelve_a_la_cola(self):
+        tarea = TareaCierre.objects.create(
+            id_condominio=self.condominio, periodo='202405',
+            estado=TareaCierre.EstadoTarea.EN_PROCESO,
+            iniciado_at=timezone.now() - timedelta(seconds=PLAZO_SIN_LATIDO + 60)
+        )
+
+        encolada, creada = encolar_cierre(self.condominio, '202405')
+        self.assertFalse(creada)
+        self.assertEqual(encolada.pk, tarea.pk)
+        self.assertEqual(encolada.estado, TareaCierre.EstadoTarea.PENDIENTE)
+        self.assertEqual(tomar_siguiente_tarea().pk, tarea.pk)
+
+    def test_tarea_en_proceso_reciente_no_se_toca(self):
+        TareaCierre.objects.create(
+            id_condominio=self.condominio, periodo='202405',
+            estado=TareaCierre.EstadoTarea.EN_PROCESO, iniciado_at=timezone.now()
+        )
+        self.assertIsNone(tomar_siguiente_tarea())
+
+    def test_interrupcion_devuelve_la_tarea_a_la_cola(self):
+        encolar_cierre(self.condominio, '202405')
+        tarea = tomar_siguiente_tarea()
+
+        with mock.patch('apps.core.tareas.generar_cierre_mensual', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                ejecutar_tarea(tarea)
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, TareaCierre.EstadoTarea.PENDIENTE)
+        self.assertIsNone(tarea.iniciado_at)
+
+# --- FIN: Tests de la Cola de Cierres ---
+
+
+# --- INICIO: Tests de Comprobantes ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class EmitirComprobantesTests(TestCase):
+    """
+    Dos emisores sobre los mismos pagos: cada pago queda con un solo
+    comprobante, ningún folio se repite y cada emisor cuenta solo lo que
+    insertó de verdad.
+
+    Se intercalan a mano (no con hilos): la base en memoria de las pruebas
+    responde "table is locked" a las lecturas concurrentes con una escritura.
+    """
+
+    PAGOS = 30
+
+    def setUp(self):
+        unidad = crear_unidad_con_deuda([])
+        metodo = CatMetodoPago.objects.create(codigo='TRF', nombre='Transferencia')
+        for i in range(self.PAGOS):
+            Pago.objects.create(
+                id_unidad=unidad, fecha_pago=timezone.make_aware(datetime(2024, 3, 1 + i % 28)),
+                monto=Decimal('1000'), id_metodo_pago=metodo
+            )
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+
+    def _emitir(self):
+        return emitir_comprobantes(Pago.objects.all(), procesos=1, directorio=self.directorio)
+
+    def test_otro_emisor_entre_la_lectura_y_el_insert(self):
+        """El segundo emisor termina primero: el lote del primero no inserta nada."""
+        emitidos = []
+        reservar = reservar_folios
+
+        def reservar_despues_del_otro(cantidad):
+            # El otro emisor corre una sola vez, con la reserva ya sin interceptar
+            with mock.patch('apps.core.comprobantes.reservar_folios', reservar):
+                if not emitidos:
+                    emitidos.append(self._emitir())
+            return reservar(cantidad)
+
+        with mock.patch('apps.core.comprobantes.reservar_folios', reservar_despues_del_otro), \
+                self.assertLogs('apps.core.comprobantes', 'WARNING') as log:
+            emitidos.append(self._emitir())
+
+        self.assertEqual(emitidos, [self.PAGOS, 0])
+        # Los folios que reservó el primero quedan como salto, informado en el log
+        self.assertIn('CP-0000000031', log.output[0])
+
+        folios = list(ComprobantePago.objects.values_list('folio', flat=True))
+        self.assertEqual(len(folios), self.PAGOS)
+        self.assertEqual(len(set(folios)), self.PAGOS)
+        self.assertEqual(ComprobantePago.objects.values('id_pago').distinct().count(), self.PAGOS)
+
+# --- FIN: Tests de Comprobantes ---
+
+
+# --- INICIO: Tests de Pasarela ---
+
+class PasarelaStub:
+    """
+    Pasarela de pago falsa: firma y envía notificaciones al webhook con el
+    cliente de pruebas, y puede re-enviarlas (como hacen las pasarelas reales
+    cuando no reciben respuesta a tiempo).
+    """
+
+    def __init__(self, cliente, codigo='STUB', secreto='secreto-de-prueba'):
+        self.cliente = cliente
+        self.codigo = codigo
+        self.secreto = secreto
+        self.enviadas = []
+
+    def notificar(self, id_transaccion, estado, monto, id_unidad, firma=None):
+        cuerpo = json.dumps({
+            'id_transaccion': id_transaccion,
+            'estado': estado,
+            'monto': str(monto),
+            'id_unidad': id_unidad,
+            'fecha': '2024-03-05T10:00:00+00:00',
+        }).encode()
+        self.enviadas.append(cuerpo)
+        return self._enviar(cuerpo, firma)
+
+    def reenviar_todo(self, semilla=0):
+        """Re-envía todas las notificaciones ya enviadas, en otro orden."""
+        cuerpos = list(self.enviadas)
+        random.Random(semilla).shuffle(cuerpos)
+        return [self._enviar(cuerpo) for cuerpo in cuerpos]
+
+    def _enviar(self, cuerpo, firma=None):
+        return self.cliente.post(
+            reverse('pasarela_webhook', args=[self.codigo]),
+            data=cuerpo,
+            content_type='application/json',
+            headers={'X-Firma': firma or firmar(self.secreto, cuerpo)}
+        )
+
+
+@override_settings(CACHES=CACHES_PRUEBAS, PASARELAS_SECRETOS={'STUB': 'secreto-de-prueba'})
+class PasarelaWebhookTests(TestCase):
+
+    def setUp(self):
+        CatPasarela.objects.create(codigo='STUB')
+        self.unidad = crear_unidad_con_deuda([Decimal('10000'), Decimal('10000')])
+        self.pasarela = PasarelaStub(self.client)
+
+    def test_reintentos_no_duplican_transacciones_ni_pagos(self):
+        # Ráfaga: cada transacción llega INICIADA y luego APROBADA
+        for i in range(100):
+            self.pasarela.notificar(f"TX-{i}", 'INICIADA', 100, self.unidad.id_unidad)
+            respuesta = self.pasarela.notificar(f"TX-{i}", 'APROBADA', 100, self.unidad.id_unidad)
+            self.assertEqual(respuesta.status_code, 200)
+
+        # La pasarela re-envía todo, desordenado: un INICIADA tardío no revierte la aprobación
+        for respuesta in self.pasarela.reenviar_todo():
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertTrue(respuesta.json()['duplicada'])
+
+        self.assertEqual(PasarelaTx.objects.count(), 100)
+        self.assertEqual(aplicar_transacciones_aprobadas(tamano_lote=30), 100)
+        self.assertEqual(aplicar_transacciones_aprobadas(), 0)
+
+        self.assertEqual(Pago.objects.count(), 100)
+        self.assertEqual(
+            set(Pago.objects.values_list('ref_externa', flat=True)),
+            {f"TX-{i}" for i in range(100)}
+        )
+        # 100 x 100 = 10000: cubre justo el primer cobro (FIFO)
+        enero, febrero = Cobro.objects.filter(id_unidad=self.unidad).order_by('periodo')
+        self.assertEqual(enero.saldo, 0)
+        self.assertEqual(febrero.saldo, Decimal('10000'))
+
+        # Un re-envío después de procesar tampoco crea nada
+        self.pasarela.reenviar_todo(semilla=1)
+        self.assertEqual(aplicar_transacciones_aprobadas(), 0)
+        self.assertEqual(Pago.objects.count(), 100)
+
+    def test_firma_invalida_se_rechaza(self):
+        respuesta = self.pasarela.notificar('TX-1', 'APROBADA', 100, self.unidad.id_unidad, firma='falsa')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(PasarelaTx.objects.exists())
+
+    def test_solo_se_aplican_las_aprobadas_con_unidad_valida(self):
+        self.pasarela.notificar('TX-OK', 'APROBADA', 500, self.unidad.id_unidad)
+        self.pasarela.notificar('TX-RECHAZADA', 'RECHAZADA', 500, self.unidad.id_unidad)
+        self.pasarela.notificar('TX-SIN-UNIDAD', 'APROBADA', 500, 999999)
+
+        self.assertEqual(aplicar_transacciones_aprobadas(), 2)
+
+        self.assertEqual(list(Pago.objects.values_list('ref_externa', flat=True)), ['TX-OK'])
+        sin_unidad = PasarelaTx.objects.get(id_tx_externa='TX-SIN-UNIDAD')
+        self.assertIsNone(sin_unidad.id_pago)
+        self.assertIsNotNone(sin_unidad.procesado_at)
+        self.assertIsNotNone(sin_unidad.mensaje)
+        self.assertIsNone(PasarelaTx.objects.get(id_tx_externa='TX-RECHAZADA').procesado_at)
+
+    def test_motor_sin_pk_en_bulk_create_enlaza_los_pagos(self):
+        for i in range(5):
+            self.pasarela.notificar(f"TX-{i}", 'APROBADA', 3000, self.unidad.id_unidad)
+
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            self.assertEqual(aplicar_transacciones_aprobadas(), 5)
+
+        for tx in PasarelaTx.objects.select_related('id_pago'):
+            self.assertEqual(tx.id_pago.ref_externa, tx.id_tx_externa)
+        self.assertEqual(
+            sum(PagoAplicacion.objects.values_list('monto_aplicado', flat=True)),
+            Decimal('15000')
+        )
+        self.assertEqual(SaldoFavor.objects.count(), 0)
+
+# --- FIN: Tests de Pasarela ---
+
+
+# --- INICIO: Tests de presupuesto de consultas por vista ---
+
+@override_settings(CACHES=CACHES_SIN_CACHE, PASARELAS_SECRETOS={'STUB': 'secreto-de-prueba'})
+class PresupuestoConsultasTests(TestCase):
+    """
+    Cantidad de consultas SQL de cada vista de core. Cada vista se mide con el
+    condominio sembrado y otra vez después de agregarle más filas: la cantidad
+    no debe cambiar (sin N+1) ni superar su presupuesto.
+
+    Al agregar una vista en views.py, agregarla también a PRESUPUESTOS.
+    """
+
+    # Nombre de la URL -> máximo de consultas (con login, incluye las 2 de sesión y usuario)
+    PRESUPUESTOS = {
+        'index': 4,
+        'gastos_list': 4,
+        'gasto_create': 6,
+        'cierre_mensual': 5,
+        'cierre_tarea_estado': 3,
+        'cierre_preview': 8,
+        'prorrateo_simulador': 3,
+        'prorrateo_simulador_datos': 6,
+        'cobros_list': 4,
+        'pagos_list': 4,
+        'pago_create': 5,
+        'cartola_importar': 4,
+        'pasarela_webhook': 5,
+        'trabajadores_list': 4,
+        'trabajador_create': 3,
+        'remuneraciones_list': 4,
+        'remuneracion_create': 5,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.condominio = generar_condominio(
+            'Condominio Presupuesto', grupos=2, unidades_por_grupo=10,
+            periodos=('202401', '202402'), gastos_por_periodo=5, semilla=1
+        )
+        cls.usuario = get_user_model().objects.create_user(
+            'admin@condominio.cl', 11111111, '1', 'Admin', 'Prueba', password='clave'
+        )
+        cls.metodo, _ = CatMetodoPago.objects.get_or_create(codigo='TRF', defaults={'nombre': 'Transferencia'})
+        cls.tarea = TareaCierre.objects.create(id_condominio=cls.condominio, periodo='202401')
+        CatPasarela.objects.create(codigo='STUB')
+        cls._agregar_filas(cls.condominio, 3)
+
+    @classmethod
+    def _agregar_filas(cls, condominio, cantidad):
+        """Agrega 'cantidad' filas más a cada listado (con todas sus relaciones)."""
+        categoria, _ = GastoCategoria.objects.get_or_create(nombre='Mantención')
+        doc_tipo, _ = CatDocTipo.objects.get_or_create(codigo='FAC', defaults={'nombre': 'Factura'})
+        unidades = list(Unidad.objects.filter(id_grupo__id_condominio=condominio)[:cantidad])
+        total = Trabajador.objects.count()
+
+        for i in range(cantidad):
+            proveedor = Proveedor.objects.create(rut_base=76000000 + total + i, rut_dv='K', nombre=f"Proveedor {total + i}")
+            Gasto.objects.create(
+                id_condominio=condominio, periodo='202402', id_gasto_categ=categoria, id_proveedor=proveedor,
+                id_doc_tipo=doc_tipo, fecha_emision=datetime(2024, 2, 10).date(), neto=Decimal('1000'), iva=0
+            )
+            Pago.objects.create(
+                id_unidad=unidades[i], fecha_pago=timezone.make_aware(datetime(2024, 2, 15)),
+                monto=Decimal('1000'), id_metodo_pago=cls.metodo
+            )
+            trabajador = Trabajador.objects.create(
+                id_condominio=condominio, tipo='Planta', rut_base=12000000 + total + i, rut_dv='5',
+                nombres='Nombre', apellidos=f"Apellido {total + i}", cargo='Conserje'
+            )
+            Remuneracion.objects.create(
+                id_trabajador=trabajador, periodo='202402', bruto=Decimal('500000'), liquido=Decimal('400000')
+            )
+
+    def setUp(self):
+        self.transacciones = 0
+
+    def _urls(self):
+        condominio = {'condominio_id': self.condominio.id_condominio}
+        return {
+            'index': reverse('index'),
+            'gastos_list': reverse('gastos_list', kwargs=condominio),
+            'gasto_create': reverse('gasto_create', kwargs=condominio),
+            'cierre_mensual': reverse('cierre_mensual', kwargs=condominio) + '?periodo=202401',
+            'cierre_tarea_estado': reverse(
+                'cierre_tarea_estado', kwargs={**condominio, 'id_tarea': self.tarea.id_tarea}
+            ),
+            'cierre_preview': reverse('cierre_preview', kwargs=condominio) + '?periodo=202402',
+            'prorrateo_simulador': reverse('prorrateo_simulador', kwargs=condominio) + '?periodo=202402',
+            'prorrateo_simulador_datos': reverse('prorrateo_simulador_datos', kwargs=condominio) + '?periodo=202402',
+            'cobros_list': reverse('cobros_list', kwargs={**condominio, 'periodo': '202401'}),
+            'pagos_list': reverse('pagos_list', kwargs=condominio),
+            'pago_create': reverse('pago_create', kwargs=condominio),
+            'cartola_importar': reverse('cartola_importar', kwargs=condominio),
+            'trabajadores_list': reverse('trabajadores_list', kwargs=condominio),
+            'trabajador_create': reverse('trabajador_create', kwargs=condominio),
+            'remuneraciones_list': reverse('remuneraciones_list', kwargs=condominio),
+            'remuneracion_create': reverse('remuneracion_create', kwargs=condominio),
+        }
+
+    def _contar_consultas(self):
+        """{nombre de la vista: cantidad de consultas}."""
+        self.client.force_login(self.usuario)
+        self.transacciones += 1
+        conteo = {}
+        for nombre, url in self._urls().items():
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200, nombre)
+            conteo[nombre] = len(consultas)
+
+        cuerpo = json.dumps({
+            'id_transaccion': f"TX-{self.transacciones}", 'estado': 'APROBADA', 'monto': '1000'
+        }).encode()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(
+                reverse('pasarela_webhook', kwargs={'codigo': 'STUB'}), data=cuerpo,
+                content_type='application/json', headers={'X-Firma': firmar('secreto-de-prueba', cuerpo)}
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        conteo['pasarela_webhook'] = len(consultas)
+        return conteo
+
+    def test_todas_las_vistas_tienen_presupuesto(self):
+        self.assertEqual(set(self._urls()) | {'pasarela_webhook'}, set(self.PRESUPUESTOS))
+
+    def test_consultas_dentro_del_presupuesto_y_sin_crecer_con_los_datos(self):
+        # Primera pasada sin medir: crea las filas de catálogo que las vistas
+        # obtienen con get_or_create (la segunda vez ya no hacen el INSERT)
+        self._contar_consultas()
+        antes = self._contar_consultas()
+        self._agregar_filas(self.condominio, 10)
+        despues = self._contar_consultas()
+
+        for nombre, maximo in self.PRESUPUESTOS.items():
+            with self.subTest(vista=nombre):
+                self.assertEqual(despues[nombre], antes[nombre], f"{nombre}: las consultas crecen con las filas (N+1)")
+                self.assertLessEqual(despues[nombre], maximo)
+
+# --- FIN: Tests de presupuesto de consultas por vista ---
+
+
+# --- INICIO: Tests de paginación por clave ---
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class PaginacionPorClaveTests(TestCase):
+    ORDEN = ('-fecha_pago', '-id_pago')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.unidad = crear_unidad_con_deuda([])
+        cls.condominio = cls.unidad.id_grupo.id_condominio
+        cls.metodo, _ = CatMetodoPago.objects.get_or_create(codigo='TRF', defaults={'nombre': 'Transferencia'})
+        # Varias filas con la misma fecha: el id desempata
+        for i in range(11):
+            Pago.objects.create(
+                id_unidad=cls.unidad, fecha_pago=timezone.make_aware(datetime(2024, 2, 1 + i // 3)),
+                monto=Decimal('1000'), id_metodo_pago=cls.metodo
+            )
+        # Pagos de otro condominio que el listado no debe mostrar
+        otra = crear_unidad_con_deuda([], nombre='Otro Condominio')
+        Pago.objects.create(
+            id_unidad=otra, fecha_pago=timezone.make_aware(datetime(2024, 2, 2)),
+            monto=Decimal('1000'), id_metodo_pago=cls.metodo
+        )
+
+    def _pagos(self):
+        return Pago.objects.filter(id_condominio=self.condominio)
+
+    def test_cursor_ida_y_vuelta(self):
+        pago = self._pagos().first()
+        campos = [Pago._meta.get_field('fecha_pago'), Pago._meta.get_field('id_pago')]
+
+        cursor = codificar_cursor(pago, self.ORDEN)
+
+        self.assertEqual(decodificar_cursor(cursor, campos), [pago.fecha_pago, pago.id_pago])
+
+    def test_cursor_invalido_es_none(self):
+        campos = [Pago._meta.get_field('fecha_pago'), Pago._meta.get_field('id_pago')]
+        for cursor in ('basura', '', codificar_cursor(self._pagos().first(), ('id_pago',)), 'WyJ4IiwieSJd'):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decodificar_cursor(cursor, campos))
+
+    def test_paginas_hacia_adelante_y_hacia_atras(self):
+        esperado = list(self._pagos().order_by(*self.ORDEN).values_list('id_pago', flat=True))
+
+        paginas = [paginar_por_clave(self._pagos(), self.ORDEN, {}, tamano=4)]
+        while paginas[-1].siguiente:
+            paginas.append(paginar_por_clave(self._pagos(), self.ORDEN, {'despues': paginas[-1].siguiente}, tamano=4))
+        self.assertEqual([len(pagina) for pagina in paginas], [4, 4, 3])
+        self.assertEqual([pago.id_pago for pagina in paginas for pago in pagina], esperado)
+
+        # Desde la última página, hacia atrás, vuelven las mismas páginas
+        atras = [paginas[-1]]
+        while atras[-1].anterior:
+            atras.append(paginar_por_clave(self._pagos(), self.ORDEN, {'antes': atras[-1].anterior}, tamano=4))
+        self.assertEqual(
+            [[pago.id_pago for pago in pagina] for pagina in atras[::-1]],
+            [[pago.id_pago for pago in pagina] for pagina in paginas]
+        )
+        self.assertIsNone(paginas[0].anterior)
+
+    def test_condominio_copiado_en_pagos_y_cobros(self):
+        self.assertEqual(self._pagos().count(), 11)
+        self.assertFalse(Pago.objects.filter(id_condominio__isnull=True).exists())
+
+        # Si el grupo cambia de condominio, sus cobros y pagos lo siguen
+        nuevo = Condominio.objects.create(nombre='Condominio Nuevo')
+        pendiente = CatCobroEstado.objects.get(codigo='PENDIENTE')
+        Cobro.objects.create(id_unidad=self.unidad, periodo='202401', id_cobro_estado=pendiente)
+        grupo = self.unidad.id_grupo
+        grupo.id_condominio = nuevo
+        grupo.save()
+
+        self.assertEqual(Pago.objects.filter(id_condominio=nuevo).count(), 11)
+        self.assertEqual(Cobro.objects.filter(id_unidad=self.unidad).get().id_condominio, nuevo)
+
+# --- FIN: Tests de paginación por clave ---
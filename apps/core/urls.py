@@ -6,9 +6,15 @@ urlpatterns = [
     path('condominio/<int:condominio_id>/gastos/', views.gastos_list_view, name='gastos_list'),
     path('condominio/<int:condominio_id>/gastos/nuevo/', views.gasto_create_view, name='gasto_create'),
     path('condominio/<int:condominio_id>/cierre/', views.cierre_mensual_view, name='cierre_mensual'),
+    path('condominio/<int:condominio_id>/cierre/preview/', views.cierre_preview_view, name='cierre_preview'),
+    path('condominio/<int:condominio_id>/cierre/tareas/<int:id_tarea>/', views.cierre_tarea_estado_view, name='cierre_tarea_estado'),
+    path('condominio/<int:condominio_id>/prorrateo/simulador/', views.prorrateo_simulador_view, name='prorrateo_simulador'),
+    path('condominio/<int:condominio_id>/prorrateo/simulador/datos/', views.prorrateo_simulador_datos_view, name='prorrateo_simulador_datos'),
     path('condominio/<int:condominio_id>/cobros/<str:periodo>/', views.cobros_list_view, name='cobros_list'),
     path('condominio/<int:condominio_id>/pagos/', views.pagos_list_view, name='pagos_list'),
     path('condominio/<int:condominio_id>/pagos/nuevo/', views.pago_create_view, name='pago_create'),
+    path('condominio/<int:condominio_id>/pagos/cartola/', views.cartola_importar_view, name='cartola_importar'),
+    path('pasarelas/<str:codigo>/webhook/', views.pasarela_webhook_view, name='pasarela_webhook'),
     path('condominio/<int:condominio_id>/trabajadores/', views.trabajadores_list_view, name='trabajadores_list'),
     path('condominio/<int:condominio_id>/trabajadores/nuevo/', views.trabajador_create_view, name='trabajador_create'),
     path('condominio/<int:condominio_id>/remuneraciones/', views.remuneraciones_list_view, name='remuneraciones_list'),
@@ -1,14 +1,34 @@
 # apps/core/views.py
+import io
+from decimal import Decimal, InvalidOperation
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.urls import reverse
 from django.contrib import messages
-from django.db.models import Sum
+from django.utils import timezone
 
 # --- IMPORTANTE: Importamos los modelos para poder buscar datos ---
-from .models import Condominio, Gasto, Cobro, Pago, Trabajador, Remuneracion
-from .forms import GastoForm, PagoForm, TrabajadorForm, RemuneracionForm
-from .services import generar_cierre_mensual, registrar_pago
+from .models import Condominio, Gasto, Cobro, Pago, ProrrateoRegla, Trabajador, Remuneracion, TareaCierre
+from .cartola import CartolaInvalida, importar_cartola
+from .pasarela import NotificacionInvalida, pasarela_por_codigo, registrar_notificacion
+from .paginacion import paginar_por_clave
+from .forms import CartolaForm, GastoForm, PagoForm, TrabajadorForm, RemuneracionForm
+from .services import (
+    indicadores_dashboard, obtener_resumen_periodo, previsualizar_cierre, registrar_pago, simular_prorrateo
+)
+from .tareas import encolar_cierre, estado_tarea
+
+
+def _periodo_desde_request(request):
+    """Periodo (YYYYMM) del parámetro GET 'periodo'; si falta o no es válido, el mes actual."""
+    periodo = request.GET.get('periodo', '')
+    if len(periodo) == 6 and periodo.isdigit() and 1 <= int(periodo[4:]) <= 12:
+        return periodo
+    return timezone.localdate().strftime('%Y%m')
 
 # --- INICIO: Vistas del Dashboard ---
 
@@ -16,15 +36,24 @@ from .services import generar_cierre_mensual, registrar_pago
 def index_view(request):
     """
     Vista principal (Dashboard).
-    Ahora recupera los condominios de la base de datos.
+    Recupera los condominios con sus indicadores del periodo (gastos,
+    cobrado, recaudado, saldo pendiente y unidades morosas).
     """
-    
+    # Periodo del dashboard: el del GET (YYYYMM) o el mes actual
+    periodo = _periodo_desde_request(request)
+
     # 1. Buscamos TODOS los condominios en la base de datos
-    lista_condominios = Condominio.objects.all()
+    lista_condominios = list(Condominio.objects.all())
 
-    # 2. Preparamos el contexto con el usuario Y la lista
+    # 2. Indicadores de todos los condominios: una consulta (o la caché)
+    indicadores = indicadores_dashboard(periodo)
+    for condo in lista_condominios:
+        condo.indicadores = indicadores.get(condo.id_condominio)
+
+    # 3. Preparamos el contexto con el usuario Y la lista
     contexto = {
         'usuario': request.user,
+        'periodo': periodo,
         'mis_condominios': lista_condominios  # <--- Enviamos la lista al HTML
     }
     
@@ -42,9 +71,18 @@ def gastos_list_view(request, condominio_id):
     # 1. Obtenemos el condominio o devolvemos 404 si no existe
     condominio = get_object_or_404(Condominio, pk=condominio_id)
 
-    # 2. Obtenemos los gastos asociados a ese condominio
-    #    Ordenamos por fecha de emisión descendente (los más recientes primero)
-    gastos = Gasto.objects.filter(id_condominio=condominio).order_by('-fecha_emision')
+    # 2. Obtenemos los gastos asociados a ese condominio, de a una página
+    #    Ordenamos por fecha de emisión descendente (los más recientes primero);
+    #    id_gasto desempata para que el cursor de la página sea estable.
+    #    select_related: la tabla muestra categoría, proveedor y tipo de documento
+    #    (sin él serían 3 consultas extra por fila)
+    gastos = paginar_por_clave(
+        Gasto.objects.filter(id_condominio=condominio).select_related(
+            'id_gasto_categ', 'id_proveedor', 'id_doc_tipo'
+        ),
+        ('-fecha_emision', '-id_gasto'),
+        request.GET
+    )
 
     # 3. Preparamos el contexto
     contexto = {
@@ -93,47 +131,123 @@ def cierre_mensual_view(request, condominio_id):
     """
     condominio = get_object_or_404(Condominio, pk=condominio_id)
 
-    # Periodo por defecto: mes actual o último con movimientos
-    # Por simplicidad para el MVP, usaremos un parámetro GET o un hardcode temporal,
-    # o idealmente un selector de fechas.
-    # Vamos a tomar el parametro 'periodo' del GET, o '202311' como ejemplo.
-    periodo = request.GET.get('periodo', '202311') # TODO: Calcular dinámicamente
+    # Periodo: el del GET (YYYYMM) o el mes actual
+    periodo = _periodo_desde_request(request)
 
-    # Resumen de gastos
-    total_gastos = Gasto.objects.filter(
-        id_condominio=condominio,
-        periodo=periodo
-    ).aggregate(Sum('total'))['total__sum'] or 0
-
-    # Verificar si ya hay cobros generados
-    cobros_existentes = Cobro.objects.filter(
-        id_unidad__id_grupo__id_condominio=condominio,
-        periodo=periodo,
-        tipo=Cobro.TipoCobro.MENSUAL
-    )
-    ya_cerrado = cobros_existentes.exists()
-    total_cobrado = cobros_existentes.aggregate(Sum('total_cargos'))['total_cargos__sum'] or 0
+    # Resumen del periodo (gastos y cobros): una sola fila de ResumenPeriodo
+    resumen = obtener_resumen_periodo(condominio, periodo)
+    ya_cerrado = resumen.cantidad_cobros > 0
 
     if request.method == 'POST':
-        # Generar el cierre
-        try:
-            generar_cierre_mensual(condominio, periodo)
-            messages.success(request, f"Cierre mensual {periodo} generado exitosamente.")
-            return redirect('cobros_list', condominio_id=condominio.id_condominio, periodo=periodo)
-        except Exception as e:
-            messages.error(request, f"Error al generar cierre: {str(e)}")
+        # El cierre se ejecuta en segundo plano (manage.py run_worker): aquí solo lo encolamos.
+        # Si el periodo ya estaba cerrado, solo re-escribimos las unidades que cambiaron
+        tarea, creada = encolar_cierre(condominio, periodo, incremental=ya_cerrado, usuario=request.user)
+        if creada:
+            messages.success(request, f"Cierre mensual {periodo} en cola. Puedes seguir su avance aquí.")
+        else:
+            messages.info(request, f"Ya hay un cierre {periodo} en curso para este condominio.")
+        return redirect(f"{reverse('cierre_mensual', args=[condominio.id_condominio])}?periodo={periodo}")
+
+    # Última tarea de cierre del periodo (para mostrar su avance o resultado)
+    tarea = TareaCierre.objects.filter(
+        id_condominio=condominio,
+        periodo=periodo
+    ).order_by('-id_tarea').first()
 
     contexto = {
         'condominio': condominio,
         'periodo': periodo,
-        'total_gastos': total_gastos,
+        'total_gastos': resumen.total_gastos,
         'ya_cerrado': ya_cerrado,
-        'total_cobrado': total_cobrado,
-        'cantidad_cobros': cobros_existentes.count()
+        'total_cobrado': resumen.total_cobrado,
+        'cantidad_cobros': resumen.cantidad_cobros,
+        'tarea': tarea,
+        'tarea_activa': tarea is not None and tarea.estado in (
+            TareaCierre.EstadoTarea.PENDIENTE, TareaCierre.EstadoTarea.EN_PROCESO
+        )
     }
 
     return render(request, 'core/cierre_mensual.html', contexto)
 
+@login_required
+def cierre_tarea_estado_view(request, condominio_id, id_tarea):
+    """
+    Endpoint JSON con el avance de una tarea de cierre (fase, unidades procesadas, ETA).
+    La página de cierre lo consulta periódicamente.
+    """
+    tarea = get_object_or_404(TareaCierre, pk=id_tarea, id_condominio_id=condominio_id)
+    return JsonResponse(estado_tarea(tarea))
+
+@login_required
+def cierre_preview_view(request, condominio_id):
+    """
+    Vista previa del cierre mensual: muestra cómo se distribuirían los gastos
+    entre las unidades sin generar ni modificar ningún cobro.
+    """
+    condominio = get_object_or_404(Condominio, pk=condominio_id)
+    periodo = _periodo_desde_request(request)
+
+    try:
+        preview = previsualizar_cierre(condominio, periodo)
+    except ValueError as e:
+        # Mismo error que daría el cierre (ej: ninguna regla rige el periodo)
+        messages.error(request, f"No se puede previsualizar el cierre: {e}")
+        return redirect(f"{reverse('cierre_mensual', args=[condominio.id_condominio])}?periodo={periodo}")
+
+    contexto = {
+        'condominio': condominio,
+        'periodo': periodo,
+        'preview': preview
+    }
+
+    return render(request, 'core/cierre_preview.html', contexto)
+
+def _simulacion_desde_request(request, condominio):
+    """Lee periodo, criterios y parámetros del GET y ejecuta el simulador."""
+    periodo = _periodo_desde_request(request)
+    parametros = {}
+    for campo in ('peso_vivienda', 'peso_bodega', 'peso_estacionamiento', 'monto_total'):
+        valor = request.GET.get(campo)
+        if valor:
+            try:
+                parametros[campo] = Decimal(valor)
+            except InvalidOperation:
+                pass  # Valor inválido: se usa el de la regla vigente
+    return simular_prorrateo(condominio, periodo, request.GET.getlist('criterio'), parametros)
+
+@login_required
+def prorrateo_simulador_view(request, condominio_id):
+    """
+    Simulador de prorrateo: compara lo que pagaría cada unidad con distintos
+    criterios (ej. antes de votar en asamblea un cambio de criterio).
+    No genera ni modifica ningún cobro.
+
+    La página solo trae el formulario; la tabla (miles de unidades x criterios)
+    la arma el navegador con los datos de prorrateo_simulador_datos_view.
+    """
+    condominio = get_object_or_404(Condominio, pk=condominio_id)
+    periodo = _periodo_desde_request(request)
+
+    contexto = {
+        'condominio': condominio,
+        'periodo': periodo,
+        'criterios_disponibles': ProrrateoRegla.CriterioProrrateo.choices,
+        # Sin selección se simulan todos los criterios
+        'criterios_seleccionados': request.GET.getlist('criterio') or ProrrateoRegla.CriterioProrrateo.values,
+        'parametros': request.GET,
+    }
+    return render(request, 'core/prorrateo_simulador.html', contexto)
+
+@login_required
+def prorrateo_simulador_datos_view(request, condominio_id):
+    """
+    Endpoint JSON del simulador de prorrateo (mismos parámetros GET que la vista).
+    """
+    condominio = get_object_or_404(Condominio, pk=condominio_id)
+    simulacion = _simulacion_desde_request(request, condominio)
+    # DjangoJSONEncoder serializa los Decimal como texto (sin perder precisión)
+    return JsonResponse(simulacion)
+
 @login_required
 def cobros_list_view(request, condominio_id, periodo):
     """
@@ -141,10 +255,15 @@ def cobros_list_view(request, condominio_id, periodo):
     """
     condominio = get_object_or_404(Condominio, pk=condominio_id)
 
-    cobros = Cobro.objects.filter(
-        id_unidad__id_grupo__id_condominio=condominio,
-        periodo=periodo
-    ).select_related('id_unidad', 'id_cobro_estado').order_by('id_unidad__codigo')
+    cobros = paginar_por_clave(
+        Cobro.objects.filter(
+            id_condominio=condominio,
+            periodo=periodo
+        ).select_related('id_unidad', 'id_cobro_estado'),
+        # Por id de unidad (y no por código) para que ix_cobro_condominio_periodo sirva el orden
+        ('id_unidad', 'id_cobro'),
+        request.GET
+    )
 
     contexto = {
         'condominio': condominio,
@@ -198,9 +317,13 @@ def pagos_list_view(request, condominio_id):
     """
     condominio = get_object_or_404(Condominio, pk=condominio_id)
 
-    pagos = Pago.objects.filter(
-        id_unidad__id_grupo__id_condominio=condominio
-    ).select_related('id_unidad', 'id_metodo_pago').order_by('-fecha_pago')
+    pagos = paginar_por_clave(
+        Pago.objects.filter(
+            id_condominio=condominio
+        ).select_related('id_unidad', 'id_metodo_pago'),
+        ('-fecha_pago', '-id_pago'),
+        request.GET
+    )
 
     contexto = {
         'condominio': condominio,
@@ -209,6 +332,68 @@ def pagos_list_view(request, condominio_id):
 
     return render(request, 'core/pagos_list.html', contexto)
 
+# Líneas rechazadas que se muestran en pantalla (el resto solo se cuenta)
+MAX_RECHAZADAS_EN_PANTALLA = 200
+
+@login_required
+def cartola_importar_view(request, condominio_id):
+    """
+    Sube una cartola bancaria (CSV) y la importa como pagos.
+    El archivo se procesa línea a línea desde el upload (ver cartola.py).
+    """
+    condominio = get_object_or_404(Condominio, pk=condominio_id)
+    resumen = None
+    rechazadas = []
+
+    if request.method == 'POST':
+        form = CartolaForm(request.POST, request.FILES)
+        if form.is_valid():
+            data = form.cleaned_data
+
+            def rechazada(numero, fila, motivo):
+                if len(rechazadas) < MAX_RECHAZADAS_EN_PANTALLA:
+                    rechazadas.append({'linea': numero, 'motivo': motivo, **fila})
+
+            archivo = io.TextIOWrapper(data['archivo'].file, encoding=data['codificacion'], newline='')
+            try:
+                resumen = importar_cartola(condominio, archivo, data['id_metodo_pago'], rechazada=rechazada)
+                messages.success(request, f"Cartola importada: {resumen['importadas']} pagos registrados.")
+            except (CartolaInvalida, UnicodeDecodeError) as e:
+                rechazadas = []
+                messages.error(request, f"No se pudo importar la cartola: {e}")
+    else:
+        form = CartolaForm()
+
+    contexto = {
+        'form': form,
+        'condominio': condominio,
+        'resumen': resumen,
+        'rechazadas': rechazadas,
+        'rechazadas_ocultas': resumen['rechazadas'] - len(rechazadas) if resumen else 0,
+    }
+    return render(request, 'core/cartola_importar.html', contexto)
+
+@csrf_exempt
+@require_POST
+def pasarela_webhook_view(request, codigo):
+    """
+    Recibe las notificaciones de una pasarela de pago (sin sesión: se
+    autentican con la firma HMAC de la cabecera X-Firma).
+    Solo guarda la transacción y responde; el Pago se crea después, en lote
+    ('manage.py procesar_pasarela'). Un reintento de la misma transacción
+    también responde 200, para que la pasarela no siga reenviándolo.
+    """
+    pasarela = pasarela_por_codigo(codigo)
+    if pasarela is None:
+        return JsonResponse({'ok': False, 'error': 'Pasarela no habilitada'}, status=404)
+
+    try:
+        _, creada = registrar_notificacion(pasarela, request.body, request.headers.get('X-Firma'))
+    except NotificacionInvalida as e:
+        return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+
+    return JsonResponse({'ok': True, 'duplicada': not creada})
+
 # --- FIN: Vistas de Pagos ---
 
 
@@ -259,7 +444,10 @@ def remuneraciones_list_view(request, condominio_id):
     """
     condominio = get_object_or_404(Condominio, pk=condominio_id)
     # Filtramos por trabajadores del condominio
-    remuneraciones = Remuneracion.objects.filter(id_trabajador__id_condominio=condominio).order_by('-periodo')
+    # select_related: la tabla muestra el nombre del trabajador de cada fila
+    remuneraciones = Remuneracion.objects.filter(
+        id_trabajador__id_condominio=condominio
+    ).select_related('id_trabajador').order_by('-periodo')
 
     contexto = {
         'condominio': condominio,
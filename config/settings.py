@@ -86,6 +86,44 @@ DATABASES = {
 }
 
 
+# Caché
+# 'default' es la caché local de cada proceso (vistas previas).
+# 'progreso' se guarda en disco para que el worker de cierres (run_worker) y los
+# procesos web compartan el avance de las tareas.
+# 'resumenes' (resumen de periodos cerrados) también es compartida: el worker
+# la invalida al cerrar y los procesos web la leen.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'progreso': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'tmp' / 'progreso',
+    },
+    'resumenes': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'tmp' / 'resumenes',
+    },
+}
+
+
+# Pasarelas de pago
+# Secreto compartido con cada pasarela (por CatPasarela.codigo) para verificar la
+# firma HMAC de sus notificaciones. Una pasarela sin secreto no acepta webhooks.
+# En producción leerlos desde variables de entorno, nunca dejarlos en el código.
+
+PASARELAS_SECRETOS = {}
+
+
+# Comprobantes de pago (PDF)
+# Se guardan en un almacén direccionado por contenido: COMPROBANTES_ROOT/ab/cd/<sha256>.pdf.
+# ComprobantePago.url_pdf guarda COMPROBANTES_URL + esa ruta relativa.
+
+COMPROBANTES_ROOT = BASE_DIR / 'media' / 'comprobantes'
+COMPROBANTES_URL = '/media/comprobantes/'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 